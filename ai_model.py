@@ -1,30 +1,25 @@
-from typing import Dict, Any
-from openai import OpenAI
+import json
+from typing import Dict, Any, List, Iterator, Optional
 import os
 import dotenv
-import google.generativeai as genai
+import preanalysis
+import prompt_builder
+import providers
 
 dotenv.load_dotenv()
 
-# Initialize OpenAI client
-openai_client = OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
+# "auto" routes every call to the healthiest provider; "gemini" or "gpt-4o" prefers one
+model = os.getenv("LLM_MODEL", providers.AUTO)
 
-# Initialize Gemini
-genai.configure(api_key=os.getenv('GOOGLE_API_KEY'))
-gemini_model = genai.GenerativeModel("gemini-2.5-flash-lite")
+# Bump whenever build_prompt changes so cached analyses of the old prompt are not reused
+PROMPT_VERSION = "2"
 
-model = "gemini"
-def analyze_chess_game(game_data: Dict[Any, Any], model=model) -> str:
-    """
-    Analyzes a chess game using either GPT-4 or Gemini
-    Args:
-        game_data: Dictionary containing game information
-        model: "gpt-4o" for GPT-4 or "gemini" for Google's Gemini
-    """
-    prompt = f"""
-    Analyze this chess game and provide a response in EXACTLY this format with NO deviations. Sort by date in descending order:
+def estimate_tokens(text: str) -> int:
+    """Rough token count for budgeting (about four characters per token)"""
+    return len(text) // 4 + 1
 
-    • Opening: [Opening name with ECO code if available]
+# Response format shared by the single-game and batch prompts
+ANALYSIS_FORMAT = """    • Opening: [Opening name with ECO code if available]
     • Key Moments:
       - [Move number + notation] [Brief description of the key moment]
       - [Move number + notation] [Brief description of the key moment]
@@ -33,13 +28,64 @@ def analyze_chess_game(game_data: Dict[Any, Any], model=model) -> str:
     • Recommendations:
       - [Specific move or position] [Concrete improvement suggestion]
       - [Specific move or position] [Concrete improvement suggestion]
-      - [Specific move or position] [Concrete improvement suggestion]
+      - [Specific move or position] [Concrete improvement suggestion]"""
 
-    Chess Game Details:
-    White: {game_data['white_player']} ({game_data['white_rating']})
+def build_game_details(game_data: Dict[Any, Any], detail: str = None) -> str:
+    """
+    Formats the players, result and moves of one game for a prompt
+    detail picks how much of the PGN is sent (see prompt_builder.DETAIL_LEVELS)
+    Pre-analyzed games send the opening and the engine's critical positions instead of the full PGN
+    """
+    detail = prompt_builder.check_detail(detail or prompt_builder.PROMPT_DETAIL)
+    players = f"""    White: {game_data['white_player']} ({game_data['white_rating']})
     Black: {game_data['black_player']} ({game_data['black_rating']})
-    Result: {game_data['result']}
-    PGN: {game_data['pgn']}
+    Result: {game_data['result']}"""
+    if game_data.get('opening'):
+        players += f"""
+    Opening (already classified, use as-is): {game_data['opening']} ({game_data['eco']})"""
+    moments = game_data.get('critical_moments')
+    if not moments:
+        if detail == "full":
+            return f"""{players}
+    PGN: {game_data['pgn']}"""
+        return f"""{players}
+    Moves: {prompt_builder.format_moves(game_data['pgn'], detail)}"""
+    labels = [moment['move'].split(" ", 1)[0] for moment in moments]
+    clocks = prompt_builder.moment_clocks(game_data['pgn'], labels) if detail != "moves" else {}
+    lines = []
+    for label, moment in zip(labels, moments):
+        line = f"      - {preanalysis.format_moment(moment)}"
+        if label in clocks:
+            line += f" Clock: {clocks[label]}"
+        lines.append(line)
+    positions = "\n".join(lines)
+    return f"""{players}
+    Opening moves: {game_data.get('opening_moves', '')}
+    Critical positions (local engine, evaluations in pawns from White's view; use these as the Key Moments):
+{positions}"""
+
+def estimate_game_tokens(game_data: Dict[Any, Any]) -> Dict[str, int]:
+    """Estimated prompt tokens of one game's details at every detail level"""
+    return {
+        detail: estimate_tokens(build_game_details(game_data, detail))
+        for detail in prompt_builder.DETAIL_LEVELS
+    }
+
+def prompt_version(preanalyzed: bool = False, detail: str = None) -> str:
+    """Version tag of the prompt a game is sent with, used in analysis cache keys"""
+    detail = detail or prompt_builder.PROMPT_DETAIL
+    version = PROMPT_VERSION if detail == "full" else f"{PROMPT_VERSION}+{detail}"
+    return f"{version}+critical{preanalysis.MOMENTS_VERSION}" if preanalyzed else version
+
+def build_prompt(game_data: Dict[Any, Any], detail: str = None) -> str:
+    """Builds the analysis prompt for a single game"""
+    return f"""
+    Analyze this chess game and provide a response in EXACTLY this format with NO deviations. Sort by date in descending order:
+
+{ANALYSIS_FORMAT}
+
+    Chess Game Details:
+{build_game_details(game_data, detail)}
 
     Important formatting rules:
     1. Use EXACT bullet points and indentation shown above
@@ -52,25 +98,108 @@ def analyze_chess_game(game_data: Dict[Any, Any], model=model) -> str:
     
     """
 
+def build_batch_prompt(games: List[Dict[Any, Any]], detail: str = None) -> str:
+    """
+    Builds one prompt that asks for the analysis of several games
+    The instructions are sent once and the answer is requested as JSON keyed by game id
+    """
+    details = "\n\n".join(
+        f"    Game id: g{index}\n{build_game_details(game_data, detail)}"
+        for index, game_data in enumerate(games)
+    )
+    return f"""
+    Analyze each of the following chess games. For every game write an analysis in EXACTLY this format with NO deviations:
+
+{ANALYSIS_FORMAT}
+
+    Chess Games:
+{details}
+
+    Important formatting rules:
+    1. Reply with a JSON array only, one object per game: [{{"id": "g0", "analysis": "..."}}, ...]
+    2. Inside each analysis use EXACT bullet points and indentation shown above, with \\n line breaks
+    3. Use the player names instead of colors
+    4. Include move numbers and notation in Key Moments
+    5. Be specific with positions in Recommendations
+    6. No additional sections or text outside the JSON
+
+    """
+
+def parse_batch_response(text: str, count: int) -> Optional[List[str]]:
+    """
+    Splits a batch response back into per-game analyses
+    Returns None when the response is not a JSON array covering every game
+    """
+    text = (text or "").strip()
+    # Models often wrap JSON in a markdown code fence
+    if text.startswith("```"):
+        text = text.split("\n", 1)[1] if "\n" in text else ""
+        text = text.rsplit("```", 1)[0]
     try:
-        if model == "gpt-4o":
-            completion = openai_client.chat.completions.create(
-                model=model,
-                messages=[
-                    {"role": "system", "content": "You are a chess analysis assistant. Follow the format EXACTLY."},
-                    {"role": "user", "content": prompt}
-                ]
-            )
-            return completion.choices[0].message.content
-        elif model == "gemini":
-            response = gemini_model.generate_content(prompt)
-            return response.text
-        else:
-            return f"Error: Unsupported model {model}. Use 'gpt-4o' or 'gemini'."
-    except Exception as e:
-        return f"API is busy, please try again later or reduce the number of days to analyze"
-    
+        items = json.loads(text)
+    except ValueError:
+        return None
+    if not isinstance(items, list):
+        return None
 
+    analyses: List[Optional[str]] = [None] * count
+    for item in items:
+        if not isinstance(item, dict):
+            return None
+        game_id, analysis = str(item.get("id", "")), item.get("analysis")
+        if not game_id.startswith("g") or not game_id[1:].isdigit() or not isinstance(analysis, str):
+            return None
+        index = int(game_id[1:])
+        if index < count:
+            analyses[index] = analysis.strip()
+    if any(analysis is None or not analysis for analysis in analyses):
+        return None
+    return analyses
 
+def complete(prompt: str, model=model) -> str:
+    """
+    Sends a prompt to the chosen provider, failing over to the others, and returns the response text
+    Raises providers.UnsupportedModelError or providers.NoProviderAvailable (both AnalysisError)
+    """
+    return providers.get_router().complete(prompt, model)
 
+def stream_complete(prompt: str, model=model) -> Iterator[str]:
+    """
+    Like complete, but yields the response text in chunks as the provider produces them
+    Fails over only until the first chunk arrives
+    """
+    return providers.get_router().stream(prompt, model)
 
+def request_analysis(game_data: Dict[Any, Any], model=model, prompt: str = None) -> str:
+    """
+    Sends one game to the chosen provider and returns the analysis text
+    Provider errors are raised to the caller as providers.AnalysisError
+    Args:
+        game_data: Dictionary containing game information
+        model: "auto", or "gpt-4o" / "gemini" to try that provider first
+        prompt: Prebuilt prompt, built from game_data when omitted
+    """
+    return complete(prompt or build_prompt(game_data), model)
+
+def stream_analysis(game_data: Dict[Any, Any], model=model, prompt: str = None) -> Iterator[str]:
+    """Like request_analysis, but yields the analysis text chunk by chunk"""
+    return stream_complete(prompt or build_prompt(game_data), model)
+
+def request_batch_analysis(games: List[Dict[Any, Any]], model=model, prompt: str = None) -> Optional[List[str]]:
+    """
+    Analyzes several games with a single provider call
+    Returns the analyses in the order of games, or None when the response cannot be split per game
+    Provider errors are raised to the caller
+    """
+    response = complete(prompt or build_batch_prompt(games), model)
+    return parse_batch_response(response, len(games))
+
+def analyze_chess_game(game_data: Dict[Any, Any], model=model) -> str:
+    """
+    Analyzes a chess game with the healthiest provider, failing over between Gemini and GPT-4
+    Raises providers.AnalysisError when no provider could answer
+    Args:
+        game_data: Dictionary containing game information
+        model: "auto", or "gpt-4o" / "gemini" to try that provider first
+    """
+    return request_analysis(game_data, model, build_prompt(game_data))
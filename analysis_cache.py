@@ -0,0 +1,143 @@
+import os
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Optional
+import ai_model
+import metrics
+from db import get_connection
+
+# How many analyses are kept in memory
+ANALYSIS_CACHE_SIZE = int(os.getenv("ANALYSIS_CACHE_SIZE", 1024))
+# SQLite file backing the in-memory cache; set to an empty string to keep analyses in memory only
+ANALYSIS_CACHE_PATH = os.getenv("ANALYSIS_CACHE_PATH", "analysis_cache.db")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS analyses (
+    cache_key TEXT PRIMARY KEY,
+    analysis TEXT NOT NULL,
+    created_at REAL NOT NULL
+)
+"""
+
+
+def normalize_pgn(pgn: str) -> str:
+    """Collapses whitespace so the same game hashes the same whether it came from the API or chessdb.csv"""
+    return " ".join(pgn.split())
+
+
+def cache_key(pgn: str, model: str, prompt_version: str = None) -> str:
+    """Content address of an analysis: hash of (normalized PGN, model, prompt version)"""
+    prompt_version = prompt_version or ai_model.prompt_version()
+    payload = "\x1f".join([normalize_pgn(pgn), model, prompt_version])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def is_cacheable(analysis: Any) -> bool:
+    """Only analysis texts are kept: a failed game holds its AnalysisError (or None when skipped)"""
+    return isinstance(analysis, str) and bool(analysis.strip())
+
+
+class AnalysisCache:
+    """
+    Size-bounded LRU cache of LLM analyses with an optional SQLite tier
+    Memory misses fall through to disk and are promoted back into memory
+    """
+
+    def __init__(self, max_entries: int = ANALYSIS_CACHE_SIZE, path: Optional[str] = ANALYSIS_CACHE_PATH):
+        self.max_entries = max_entries
+        self.path = path or None
+        self._entries: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._schema_ready = False
+        self.hits = 0
+        self.misses = 0
+
+    def _connection(self):
+        conn = get_connection(self.path)
+        if not self._schema_ready:
+            with self._lock:
+                if not self._schema_ready:
+                    conn.execute(_SCHEMA)
+                    conn.commit()
+                    self._schema_ready = True
+        return conn
+
+    def _remember(self, key: str, analysis: str) -> None:
+        with self._lock:
+            self._entries[key] = analysis
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get(self, key: str) -> Optional[str]:
+        """Returns the cached analysis for a key, or None"""
+        with self._lock:
+            analysis = self._entries.get(key)
+            if analysis is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                metrics.incr("analysis_cache.hits")
+                return analysis
+
+        if self.path:
+            row = self._connection().execute(
+                "SELECT analysis FROM analyses WHERE cache_key = ?", (key,)
+            ).fetchone()
+            if row is not None:
+                self._remember(key, row["analysis"])
+                with self._lock:
+                    self.hits += 1
+                metrics.incr("analysis_cache.hits")
+                return row["analysis"]
+
+        with self._lock:
+            self.misses += 1
+        metrics.incr("analysis_cache.misses")
+        return None
+
+    def contains(self, key: str) -> bool:
+        """Whether a key is cached; unlike get, it is not counted as a hit or miss"""
+        with self._lock:
+            if key in self._entries:
+                return True
+        if self.path:
+            return self._connection().execute(
+                "SELECT 1 FROM analyses WHERE cache_key = ?", (key,)
+            ).fetchone() is not None
+        return False
+
+    def put(self, key: str, analysis: str) -> None:
+        """Stores a successful analysis; failures are ignored"""
+        if not is_cacheable(analysis):
+            return
+        self._remember(key, analysis)
+        if self.path:
+            conn = self._connection()
+            conn.execute(
+                "INSERT OR REPLACE INTO analyses (cache_key, analysis, created_at) VALUES (?, ?, ?)",
+                (key, analysis, time.time())
+            )
+            conn.commit()
+
+    def clear(self) -> None:
+        """Forgets the in-memory entries (the disk tier is kept)"""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+_default_cache: Optional[AnalysisCache] = None
+_default_cache_lock = threading.Lock()
+
+
+def get_analysis_cache() -> AnalysisCache:
+    """Returns the process-wide analysis cache shared by the UI and the CLI"""
+    global _default_cache
+    if _default_cache is None:
+        with _default_cache_lock:
+            if _default_cache is None:
+                _default_cache = AnalysisCache()
+    return _default_cache
@@ -0,0 +1,355 @@
+import os
+import time
+import queue
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Iterable, Iterator, Tuple, Callable, Optional, Union
+import ai_model
+import metrics
+import preanalysis
+import prompt_builder
+from analysis_cache import AnalysisCache, cache_key, get_analysis_cache
+from providers import AnalysisError, NoProviderConfigured, UnsupportedModelError
+from rate_limit import backoff_delay
+from singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+# How many games are analyzed at the same time
+LLM_CONCURRENCY = int(os.getenv("LLM_CONCURRENCY", 4))
+# How many times a failed provider call is retried before giving up on a game
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", 3))
+# Input token budget of a multi-game prompt; 0 keeps one game per request
+LLM_BATCH_TOKEN_BUDGET = int(os.getenv("LLM_BATCH_TOKEN_BUDGET", 0))
+# Upper bound on games packed into one request
+LLM_BATCH_MAX_GAMES = int(os.getenv("LLM_BATCH_MAX_GAMES", 8))
+
+# An analysis, or the AnalysisError of a game no provider could answer
+Outcome = Union[str, AnalysisError]
+
+# Default of AnalysisEngine._annotate's result: run the local engine inline
+_NOT_COMPUTED = object()
+
+# In-flight provider calls keyed by analysis cache key, shared by every engine in the process,
+# so users searching the same player at the same time wait for one call instead of making their own
+_in_flight = SingleFlight()
+
+
+class AnalysisEngine:
+    """
+    Analyzes many games concurrently; each call goes to the healthiest provider within its
+    request and token budgets (see providers.ProviderRouter)
+    Calls that no provider could answer are retried with jittered exponential backoff
+    Games already in the analysis cache are answered without calling the provider, and
+    a game another engine is already analyzing waits for that call instead of making its own
+    With a batch token budget, several games are packed into each provider call
+    With pre-analysis, a local engine picks the critical positions first and games
+    without any are answered locally instead of by the LLM
+    prompt_detail sets how much of each PGN is sent (moves only, moves plus critical clocks, full)
+    With an on_partial callback, single-game analyses are streamed and the text received so far
+    is passed on after every chunk
+    """
+
+    def __init__(self, model: str = ai_model.model, max_workers: int = LLM_CONCURRENCY,
+                 max_retries: int = LLM_MAX_RETRIES, cache: AnalysisCache = None,
+                 batch_token_budget: int = LLM_BATCH_TOKEN_BUDGET, batch_max_games: int = LLM_BATCH_MAX_GAMES,
+                 preanalyze: bool = preanalysis.PREANALYSIS_ENABLED, preanalysis_depth: int = preanalysis.PREANALYSIS_DEPTH,
+                 prompt_detail: str = prompt_builder.PROMPT_DETAIL):
+        self.model = model
+        self.max_workers = max(1, max_workers)
+        self.max_retries = max_retries
+        self.cache = cache or get_analysis_cache()
+        self.batch_token_budget = batch_token_budget
+        self.batch_max_games = max(1, batch_max_games)
+        self.preanalyze = preanalyze and preanalysis.chess is not None
+        self.preanalysis_depth = preanalysis_depth
+        self.prompt_detail = prompt_builder.check_detail(prompt_detail)
+        # Estimated input tokens sent to the provider, retries included
+        self.prompt_tokens = 0
+        # Games answered from the analysis cache instead of the provider
+        self.cache_hits = 0
+        self._counters_lock = threading.Lock()
+
+    def _key(self, game_data: Dict[Any, Any]) -> str:
+        """Analysis cache key of a game under this engine's model and prompt"""
+        return cache_key(game_data['pgn'], self.model, ai_model.prompt_version(self.preanalyze, self.prompt_detail))
+
+    def _annotate(self, game_data: Dict[Any, Any], result: Any = _NOT_COMPUTED) -> Dict[Any, Any]:
+        """
+        Returns a copy of game_data carrying the local engine's opening moves and critical moments
+        critical_moments is None when the PGN could not be replayed
+        """
+        if not self.preanalyze or 'critical_moments' in game_data:
+            return game_data
+        if result is _NOT_COMPUTED:
+            result = preanalysis.analyze_pgn(game_data['pgn'], self.preanalysis_depth)
+        if result is None:
+            return dict(game_data, critical_moments=None)
+        return dict(game_data, critical_moments=result['moments'], opening_moves=result['opening_moves'])
+
+    def _cached(self, key: str) -> Optional[str]:
+        """Cached analysis of a key, or None; hits are counted"""
+        cached = self.cache.get(key)
+        if cached is not None:
+            with self._counters_lock:
+                self.cache_hits += 1
+        return cached
+
+    def _quiet_analysis(self, game_data: Dict[Any, Any], key: str) -> str:
+        """Answers a game the local engine found no critical moments in, without calling the LLM"""
+        analysis = preanalysis.quiet_game_analysis(game_data)
+        self.cache.put(key, analysis)
+        return analysis
+
+    def _request(self, prompt: str, send: Callable[[], Any]) -> Any:
+        """
+        Calls send(), retrying failures with backoff
+        Raises the last failure as an AnalysisError once all retries are used up
+        """
+        tokens = ai_model.estimate_tokens(prompt)
+        for attempt in range(self.max_retries + 1):
+            with self._counters_lock:
+                self.prompt_tokens += tokens
+            try:
+                return send()
+            except (UnsupportedModelError, NoProviderConfigured):
+                # Retrying will not help; providers that are only cooling down are retried below
+                raise
+            except Exception as e:
+                logger.warning("Analysis attempt %d failed: %s", attempt + 1, e)
+                if attempt < self.max_retries:
+                    time.sleep(backoff_delay(attempt))
+                elif isinstance(e, AnalysisError):
+                    raise
+                else:
+                    raise AnalysisError(str(e)) from e
+
+    def analyze_one(self, game_data: Dict[Any, Any], on_partial: Optional[Callable[[str], None]] = None) -> str:
+        """
+        Analyzes a single game, waiting for budget and retrying failures
+        With on_partial, the analysis is streamed and on_partial gets the text received so far
+        (a game another caller is already analyzing is not streamed, only waited for)
+        Raises providers.AnalysisError once all retries are used up
+        """
+        key = self._key(game_data)
+        cached = self._cached(key)
+        if cached is not None:
+            return cached
+        return _in_flight.do(key, self._analyze_uncached, game_data, key, on_partial)
+
+    def _stream(self, game_data: Dict[Any, Any], prompt: str, on_partial: Callable[[str], None]) -> str:
+        """Streams one analysis, passing the text received so far to on_partial after every chunk"""
+        chunks = []
+        for chunk in ai_model.stream_analysis(game_data, self.model, prompt):
+            chunks.append(chunk)
+            on_partial("".join(chunks))
+        return "".join(chunks)
+
+    def _analyze_uncached(self, game_data: Dict[Any, Any], key: str,
+                          on_partial: Optional[Callable[[str], None]] = None) -> str:
+        # A call for the same game that finished just before this one started may have cached it;
+        # analyze_one already counted the miss, so only a hit is counted here
+        if self.cache.contains(key):
+            cached = self._cached(key)
+            if cached is not None:
+                return cached
+
+        game_data = self._annotate(game_data)
+        if game_data.get('critical_moments') == []:
+            return self._quiet_analysis(game_data, key)
+
+        prompt = ai_model.build_prompt(game_data, self.prompt_detail)
+        if on_partial is None:
+            analysis = self._request(prompt, lambda: ai_model.request_analysis(game_data, self.model, prompt))
+        else:
+            analysis = self._request(prompt, lambda: self._stream(game_data, prompt, on_partial))
+        self.cache.put(key, analysis)
+        return analysis
+
+    def _outcome(self, game_data: Dict[Any, Any], on_partial: Optional[Callable[[str], None]] = None) -> Outcome:
+        """analyze_one, returning the AnalysisError instead of raising it"""
+        try:
+            return self.analyze_one(game_data, on_partial)
+        except AnalysisError as e:
+            return e
+
+    def analyze_batch(self, games: List[Dict[Any, Any]]) -> List[Outcome]:
+        """
+        Analyzes several games with one provider call and returns the analyses in order
+        Falls back to one call per game when the response cannot be split per game
+        Games no provider could answer get the AnalysisError in place of their analysis
+        """
+        games = list(games)
+        keys = [self._key(game_data) for game_data in games]
+        analyses = [self._cached(key) for key in keys]
+        pending = []
+        for index, analysis in enumerate(analyses):
+            if analysis is not None:
+                continue
+            game_data = self._annotate(games[index])
+            if game_data.get('critical_moments') == []:
+                analyses[index] = self._quiet_analysis(game_data, keys[index])
+            else:
+                games[index] = game_data
+                pending.append(index)
+        if not pending:
+            return analyses
+        if len(pending) == 1:
+            analyses[pending[0]] = self._outcome(games[pending[0]])
+            return analyses
+
+        batch_games = [games[index] for index in pending]
+        # Identical searches plan identical batches, so the whole batch is coalesced
+        try:
+            batch_analyses = _in_flight.do(tuple(keys[index] for index in pending), self._request_batch, batch_games)
+        except AnalysisError as e:
+            batch_analyses = [e] * len(batch_games)
+        else:
+            if batch_analyses is None:
+                logger.info("Could not split batch response for %d games, analyzing them one by one", len(batch_games))
+                batch_analyses = [self._outcome(game_data) for game_data in batch_games]
+            else:
+                for index, analysis in zip(pending, batch_analyses):
+                    self.cache.put(keys[index], analysis)
+
+        for index, analysis in zip(pending, batch_analyses):
+            analyses[index] = analysis
+        return analyses
+
+    def _request_batch(self, batch_games: List[Dict[Any, Any]]) -> Any:
+        prompt = ai_model.build_batch_prompt(batch_games, self.prompt_detail)
+        return self._request(prompt, lambda: ai_model.request_batch_analysis(batch_games, self.model, prompt))
+
+    def plan_batches(self, games: List[Dict[Any, Any]]) -> List[List[int]]:
+        """
+        Greedily groups game indices so every batch prompt stays within the token budget
+        Games that cannot be formatted for a prompt are left out
+        """
+        return list(self._iter_batches(games, range(len(games))))
+
+    def _iter_batches(self, games: List[Dict[Any, Any]], indices: Iterable[int]) -> Iterator[List[int]]:
+        """Like plan_batches, over indices as they arrive; each batch is yielded as soon as it is full"""
+        if self.batch_token_budget <= 0:
+            for index in indices:
+                yield [index]
+            return
+
+        overhead = ai_model.estimate_tokens(ai_model.build_batch_prompt([]))
+        current, current_tokens = [], overhead
+        for index in indices:
+            try:
+                tokens = ai_model.estimate_tokens(ai_model.build_game_details(games[index], self.prompt_detail))
+            except Exception as e:
+                logger.warning("Error processing game: %s", e)
+                continue
+            if current and (current_tokens + tokens > self.batch_token_budget or len(current) >= self.batch_max_games):
+                yield current
+                current, current_tokens = [], overhead
+            current.append(index)
+            current_tokens += tokens
+        if current:
+            yield current
+
+    def _iter_prepared(self, games: List[Dict[Any, Any]]) -> Iterator[int]:
+        """
+        Yields every game index in order, once the game is ready for its LLM call
+        With pre-analysis, the uncached games are all submitted to the local engine up front and
+        each one is annotated in place (games[index]) as soon as its own replay finishes
+        """
+        if not self.preanalyze:
+            yield from range(len(games))
+            return
+        missing = []
+        for index, game_data in enumerate(games):
+            try:
+                if 'critical_moments' not in game_data and not self.cache.contains(self._key(game_data)):
+                    missing.append(index)
+            except Exception as e:
+                logger.warning("Error processing game: %s", e)
+        start = time.perf_counter()
+        results = preanalysis.iter_analyze_pgns([games[index]['pgn'] for index in missing], self.preanalysis_depth)
+        pending = iter(missing)
+        waiting_for = next(pending, None)
+        for index in range(len(games)):
+            if index == waiting_for:
+                games[index] = self._annotate(games[index], next(results))
+                waiting_for = next(pending, None)
+            yield index
+        metrics.observe("stage.preanalysis", time.perf_counter() - start)
+
+    def _analyze_unit(self, games: List[Dict[Any, Any]], indices: List[int],
+                      on_partial: Optional[Callable[[int, str], None]] = None) -> List[Tuple[int, Outcome]]:
+        if len(indices) == 1:
+            index = indices[0]
+            stream = None if on_partial is None else lambda text: on_partial(index, text)
+            return [(index, self._outcome(games[index], stream))]
+        return list(zip(indices, self.analyze_batch([games[index] for index in indices])))
+
+    def iter_analyses(self, games: List[Dict[Any, Any]],
+                      on_partial: Optional[Callable[[int, str], None]] = None) -> Iterator[Tuple[int, Outcome]]:
+        """
+        Yields (index, analysis) pairs as soon as each game's (or batch's) analysis completes
+        A game no provider could answer gets its providers.AnalysisError instead of an analysis
+        Games that cannot be analyzed at all (e.g. missing fields) are skipped
+        on_partial(index, text so far) is called from the worker threads while single games stream
+        (batched games are not streamed: their response is only usable once complete)
+        """
+        if not games:
+            return
+        games = list(games)
+        # Units are planned on a feeder thread as pre-analysis finishes, so the first games
+        # reach the LLM while later ones are still being replayed
+        done: "queue.Queue[Any]" = queue.Queue()
+        stopped = threading.Event()
+        futures = []
+
+        def feed(executor: ThreadPoolExecutor) -> None:
+            submitted = 0
+            try:
+                for indices in self._iter_batches(games, self._iter_prepared(games)):
+                    if stopped.is_set():
+                        break
+                    future = executor.submit(self._analyze_unit, games, indices, on_partial)
+                    futures.append(future)
+                    future.add_done_callback(done.put)
+                    submitted += 1
+            except Exception as e:
+                logger.warning("Error preparing games: %s", e)
+            finally:
+                # The unit count marks the end of the feed
+                done.put(submitted)
+
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(games)),
+                                thread_name_prefix="llm-analysis") as executor:
+            feeder = threading.Thread(target=feed, args=(executor,), name="llm-analysis-feed", daemon=True)
+            feeder.start()
+            try:
+                finished, total = 0, None
+                while total is None or finished < total:
+                    item = done.get()
+                    if isinstance(item, int):
+                        total = item
+                        continue
+                    finished += 1
+                    try:
+                        results = item.result()
+                    except Exception as e:
+                        logger.warning("Error processing game: %s", e)
+                        continue
+                    for index, analysis in results:
+                        yield index, analysis
+            finally:
+                stopped.set()
+                for future in list(futures):
+                    future.cancel()
+
+    def analyze_games(self, games: List[Dict[Any, Any]]) -> List[Optional[Outcome]]:
+        """
+        Analyzes all games concurrently and returns the analyses in the same order as games
+        Skipped games are left as None, games no provider could answer hold their AnalysisError
+        """
+        analyses = [None] * len(games)
+        for index, analysis in self.iter_analyses(games):
+            analyses[index] = analysis
+        return analyses
@@ -0,0 +1,207 @@
+import os
+import re
+import json
+import time
+import zlib
+import datetime
+import threading
+from typing import Dict, Any, Optional, Tuple
+import http_client
+import metrics
+from singleflight import SingleFlight
+from db import get_connection
+
+# Where downloaded archives are kept between runs
+ARCHIVE_CACHE_PATH = os.getenv("ARCHIVE_CACHE_PATH", "archive_cache.db")
+# How long (seconds) the current month and the archives list are served before revalidating
+CURRENT_MONTH_TTL = int(os.getenv("ARCHIVE_CURRENT_MONTH_TTL", 600))
+
+# https://api.chess.com/pub/player/{username}/games/{yyyy}/{mm}
+_MONTH_URL = re.compile(r"/player/([^/]+)/games/(\d{4})/(\d{2})/?$")
+# https://api.chess.com/pub/player/{username}/games/archives
+_ARCHIVES_URL = re.compile(r"/player/([^/]+)/games/archives/?$")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS archives (
+    username TEXT NOT NULL,
+    period TEXT NOT NULL,
+    url TEXT NOT NULL,
+    etag TEXT,
+    last_modified TEXT,
+    fetched_at REAL NOT NULL,
+    body BLOB NOT NULL,
+    PRIMARY KEY (username, period)
+)
+"""
+
+
+def parse_archive_url(url: str) -> Optional[Tuple[str, str]]:
+    """
+    Maps an archive URL to its (username, period) key
+    period is "YYYY/MM" for monthly archives and "archives" for the archive list
+    Returns None for URLs that are not archives
+    """
+    match = _MONTH_URL.search(url)
+    if match:
+        return match.group(1).lower(), f"{match.group(2)}/{match.group(3)}"
+    match = _ARCHIVES_URL.search(url)
+    if match:
+        return match.group(1).lower(), "archives"
+    return None
+
+
+def is_closed_period(period: str, now: Optional[float] = None) -> bool:
+    """
+    Returns True for months that are over (in UTC)
+    Chess.com never changes the archive of a finished month
+    """
+    if period == "archives":
+        return False
+    year, month = (int(part) for part in period.split("/"))
+    today = datetime.datetime.fromtimestamp(now if now is not None else time.time(), tz=datetime.timezone.utc)
+    return (year, month) < (today.year, today.month)
+
+
+class ArchiveStore:
+    """
+    Local store of Chess.com archive responses keyed by player and month
+    Months fetched after they closed are served from disk forever; the current month and the
+    archives list are revalidated with a conditional request once their TTL expires
+    Concurrent fetches of the same URL share a single download
+    """
+
+    def __init__(self, path: str = ARCHIVE_CACHE_PATH, ttl: int = CURRENT_MONTH_TTL):
+        self.path = path
+        self.ttl = ttl
+        self._schema_lock = threading.Lock()
+        self._schema_ready = False
+        self._downloads = SingleFlight()
+
+    def _connection(self):
+        conn = get_connection(self.path)
+        if not self._schema_ready:
+            with self._schema_lock:
+                if not self._schema_ready:
+                    conn.execute(_SCHEMA)
+                    conn.commit()
+                    self._schema_ready = True
+        return conn
+
+    def get(self, url: str) -> Optional[Dict[str, Any]]:
+        """Returns the stored entry for an archive URL, or None"""
+        key = parse_archive_url(url)
+        if key is None:
+            return None
+        row = self._connection().execute(
+            "SELECT etag, last_modified, fetched_at, body FROM archives WHERE username = ? AND period = ?",
+            key
+        ).fetchone()
+        if row is None:
+            return None
+        return {
+            "period": key[1],
+            "etag": row["etag"],
+            "last_modified": row["last_modified"],
+            "fetched_at": row["fetched_at"],
+            "data": json.loads(zlib.decompress(row["body"]))
+        }
+
+    def get_meta(self, url: str) -> Optional[Dict[str, Any]]:
+        """Like get, but without decoding the body: {"period", "etag", "fetched_at"} or None"""
+        key = parse_archive_url(url)
+        if key is None:
+            return None
+        row = self._connection().execute(
+            "SELECT etag, fetched_at FROM archives WHERE username = ? AND period = ?", key
+        ).fetchone()
+        if row is None:
+            return None
+        return {"period": key[1], "etag": row["etag"], "fetched_at": row["fetched_at"]}
+
+    def put(self, url: str, data: Any, etag: Optional[str] = None, last_modified: Optional[str] = None) -> None:
+        """Stores (or replaces) the compressed body of an archive URL"""
+        key = parse_archive_url(url)
+        if key is None:
+            return
+        body = zlib.compress(json.dumps(data, separators=(",", ":")).encode("utf-8"))
+        conn = self._connection()
+        conn.execute(
+            "INSERT OR REPLACE INTO archives (username, period, url, etag, last_modified, fetched_at, body) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (key[0], key[1], url, etag, last_modified, time.time(), body)
+        )
+        conn.commit()
+
+    def touch(self, url: str) -> None:
+        """Marks a stored entry as freshly validated"""
+        key = parse_archive_url(url)
+        if key is None:
+            return
+        conn = self._connection()
+        conn.execute(
+            "UPDATE archives SET fetched_at = ? WHERE username = ? AND period = ?",
+            (time.time(), key[0], key[1])
+        )
+        conn.commit()
+
+    def is_fresh(self, entry: Dict[str, Any], now: Optional[float] = None) -> bool:
+        """
+        Copies fetched after their month closed never expire; everything else is fresh for ttl seconds
+        A month fetched while it was still running is revalidated once more after it closes, so the
+        games of its last hours are not lost
+        """
+        now = now if now is not None else time.time()
+        if is_closed_period(entry["period"], entry["fetched_at"]):
+            return True
+        return now - entry["fetched_at"] < self.ttl
+
+    def fetch_json(self, url: str, headers: Optional[Dict[str, str]] = None) -> Any:
+        """
+        Returns the JSON body of an archive URL, hitting the network only when needed
+        Raises requests.exceptions.RequestException on failure
+        """
+        if parse_archive_url(url) is None:
+            return http_client.get_json(url, headers=headers)
+
+        entry = self.get(url)
+        if entry is not None and self.is_fresh(entry):
+            metrics.incr("archive.hits")
+            return entry["data"]
+        # Chess.com usernames are case-insensitive, so "Hikaru" and "hikaru" share a download
+        return self._downloads.do(url.lower(), self._download, url, headers)
+
+    def _download(self, url: str, headers: Optional[Dict[str, str]]) -> Any:
+        """Downloads (or revalidates) an archive URL and stores the response"""
+        # A download that finished just before this one started may have stored a fresh copy
+        entry = self.get(url)
+        if entry is not None and self.is_fresh(entry):
+            return entry["data"]
+
+        result = http_client.conditional_get(
+            url,
+            headers=headers,
+            etag=entry["etag"] if entry else None,
+            last_modified=entry["last_modified"] if entry else None
+        )
+        if result["not_modified"]:
+            metrics.incr("archive.not_modified")
+            self.touch(url)
+            return entry["data"]
+
+        metrics.incr("archive.downloads")
+        self.put(url, result["data"], etag=result["etag"], last_modified=result["last_modified"])
+        return result["data"]
+
+
+_default_store: Optional[ArchiveStore] = None
+_default_store_lock = threading.Lock()
+
+
+def get_archive_store() -> ArchiveStore:
+    """Returns the process-wide archive store"""
+    global _default_store
+    if _default_store is None:
+        with _default_store_lock:
+            if _default_store is None:
+                _default_store = ArchiveStore()
+    return _default_store
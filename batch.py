@@ -0,0 +1,231 @@
+"""
+Bulk analysis of many players' games, e.g. a nightly run over a club roster
+Usage: python batch.py usernames.txt [--start YYYY-MM-DD] [--end YYYY-MM-DD] [--days N]
+                       [--workers N] [--players N] [--llm-workers N] [--checkpoint PATH] [--fresh]
+One username per line; blank lines and lines starting with # are ignored
+A player is checkpointed once all of their games are analyzed and saved, so a crashed or
+interrupted run picks up where it stopped when started again with the same date range
+"""
+import argparse
+import datetime
+import logging
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, Any, List, Optional, Set
+import main
+import metrics
+from analysis_cache import is_cacheable
+from analysis_engine import AnalysisEngine, LLM_CONCURRENCY
+from db import get_connection
+from game_store import make_game_id
+
+logger = logging.getLogger(__name__)
+
+# Players whose archives are downloaded at the same time
+BATCH_FETCH_WORKERS = int(os.getenv("BATCH_FETCH_WORKERS", 4))
+# Players whose games are analyzed at the same time, each with up to LLM_CONCURRENCY games in flight
+BATCH_PLAYER_WORKERS = int(os.getenv("BATCH_PLAYER_WORKERS", 2))
+# SQLite file recording which players each run has finished
+BATCH_CHECKPOINT_PATH = os.getenv("BATCH_CHECKPOINT_PATH", "batch_checkpoint.db")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS checkpoints (
+    run TEXT NOT NULL,
+    username TEXT NOT NULL,
+    games INTEGER NOT NULL,
+    finished_at REAL NOT NULL,
+    PRIMARY KEY (run, username)
+)
+"""
+
+
+def read_usernames(path: str) -> List[str]:
+    """Usernames listed in a file, in order, without blanks, comments or (case-insensitive) duplicates"""
+    usernames, seen = [], set()
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            name = line.strip()
+            if not name or name.startswith('#') or name.lower() in seen:
+                continue
+            seen.add(name.lower())
+            usernames.append(name)
+    return usernames
+
+
+class Checkpoint:
+    """Players a batch run has finished, keyed by run (the date range)"""
+
+    def __init__(self, run: str, path: str = BATCH_CHECKPOINT_PATH):
+        self.run = run
+        self.path = path
+        conn = get_connection(path)
+        conn.execute(_SCHEMA)
+        conn.commit()
+
+    def finished(self) -> Set[str]:
+        rows = get_connection(self.path).execute("SELECT username FROM checkpoints WHERE run = ?", (self.run,))
+        return {row["username"] for row in rows}
+
+    def mark(self, username: str, games: int) -> None:
+        conn = get_connection(self.path)
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO checkpoints (run, username, games, finished_at) VALUES (?, ?, ?, ?)",
+                (self.run, username.lower(), games, time.time())
+            )
+
+    def reset(self) -> None:
+        conn = get_connection(self.path)
+        with conn:
+            conn.execute("DELETE FROM checkpoints WHERE run = ?", (self.run,))
+
+
+class BatchRun:
+    """
+    Fetches every player's archives on a bounded pool and hands each player's games to a second
+    pool as soon as they arrive, so downloads overlap the LLM work and several players are
+    analyzed at the same time; each player is saved and checkpointed once their own games are done
+    Games shared by two listed players (club members playing each other) are analyzed once
+    """
+
+    def __init__(self, start: datetime.datetime, end: datetime.datetime, engine: AnalysisEngine = None,
+                 checkpoint: Optional[Checkpoint] = None, fetch_workers: int = BATCH_FETCH_WORKERS,
+                 player_workers: int = BATCH_PLAYER_WORKERS):
+        self.start = start
+        self.end = end
+        self.engine = engine or AnalysisEngine()
+        self.checkpoint = checkpoint
+        self.fetch_workers = max(1, fetch_workers)
+        self.player_workers = max(1, player_workers)
+        # Games already analyzed in this run
+        self._seen_games: Set[str] = set()
+        self.totals = {"players": 0, "skipped": 0, "failed": 0, "games": 0, "duplicates": 0,
+                       "saved": 0, "errors": 0}
+        self._totals_lock = threading.Lock()
+
+    def _count(self, **counts: int) -> None:
+        with self._totals_lock:
+            for name, count in counts.items():
+                self.totals[name] += count
+
+    def _fetch(self, username: str) -> Any:
+        with metrics.timer("stage.fetch"):
+            return main.ChessComAnalyzer(username).get_games_in_range(self.start, self.end)
+
+    def _new_games(self, games: List[Dict[Any, Any]]) -> List[Dict[Any, Any]]:
+        """Drops games another player of this run already brought in; called from the run's own thread"""
+        fresh = []
+        for game_data in games:
+            game_id = make_game_id(game_data)
+            if game_id not in self._seen_games:
+                self._seen_games.add(game_id)
+                fresh.append(game_data)
+        self._count(duplicates=len(games) - len(fresh))
+        return fresh
+
+    def _analyze_player(self, username: str, games: List[Dict[Any, Any]]) -> None:
+        analyzed = []
+        for index, analysis in self.engine.iter_analyses(games):
+            analyzed.append((games[index], analysis))
+        saved = main.save_game_analyses((game_data, analysis) for game_data, analysis in analyzed
+                                        if is_cacheable(analysis))
+        errors = len(analyzed) - saved
+        self._count(games=len(analyzed), saved=saved, errors=errors)
+        if errors:
+            # Left unchecked so the next run retries them; finished analyses come from the cache
+            logger.warning("%s: %d of %d analyses failed", username, errors, len(analyzed))
+            self._count(failed=1)
+            return
+        self._count(players=1)
+        if self.checkpoint is not None:
+            self.checkpoint.mark(username, len(analyzed))
+        logger.info("%s: %d games analyzed", username, saved)
+
+    def run(self, usernames: List[str]) -> Dict[str, Any]:
+        """Analyzes every player's games and returns the totals, including throughput"""
+        finished = self.checkpoint.finished() if self.checkpoint is not None else set()
+        pending = [name for name in usernames if name.lower() not in finished]
+        self.totals["skipped"] = len(usernames) - len(pending)
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.fetch_workers, thread_name_prefix="batch-fetch") as fetches, \
+                ThreadPoolExecutor(max_workers=self.player_workers, thread_name_prefix="batch-player") as players:
+            futures = {fetches.submit(self._fetch, name): name for name in pending}
+            analyses = {}
+            for future in as_completed(futures):
+                username = futures[future]
+                try:
+                    games = future.result()
+                    if isinstance(games, dict) and "error" in games:
+                        raise RuntimeError(games["error"])
+                    analyses[players.submit(self._analyze_player, username, self._new_games(games))] = username
+                except Exception as e:
+                    logger.warning("%s: %s", username, e)
+                    self._count(failed=1)
+            for future in as_completed(analyses):
+                try:
+                    future.result()
+                except Exception as e:
+                    logger.warning("%s: %s", analyses[future], e)
+                    self._count(failed=1)
+        elapsed = time.perf_counter() - started
+        analyzed = self.totals["games"]
+        return dict(
+            self.totals,
+            elapsed=elapsed,
+            games_per_second=analyzed / elapsed if elapsed else 0.0,
+            prompt_tokens=self.engine.prompt_tokens,
+            cache_hit_rate=self.engine.cache_hits / analyzed if analyzed else 0.0
+        )
+
+
+def format_summary(totals: Dict[str, Any]) -> str:
+    return "\n".join([
+        f"Players: {totals['players']} done, {totals['skipped']} skipped (checkpointed), {totals['failed']} failed",
+        f"Games: {totals['games']} analyzed, {totals['saved']} saved, {totals['errors']} failed, "
+        f"{totals['duplicates']} shared between players",
+        f"Time: {totals['elapsed']:.1f}s ({totals['games_per_second']:.2f} games/s)",
+        f"Prompt tokens: {totals['prompt_tokens']}",
+        f"Cache hit rate: {totals['cache_hit_rate']:.0%}"
+    ])
+
+
+def _date(value: str) -> datetime.datetime:
+    return datetime.datetime.strptime(value, '%Y-%m-%d')
+
+
+def main_cli(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("usernames", help="file with one Chess.com username per line")
+    parser.add_argument("--start", type=_date, help="first day (YYYY-MM-DD); default --days before --end")
+    parser.add_argument("--end", type=_date, help="last day (YYYY-MM-DD, inclusive); default now")
+    parser.add_argument("--days", type=int, default=1, help="days back from --end when --start is not given (default 1)")
+    parser.add_argument("--workers", type=int, default=BATCH_FETCH_WORKERS, help="players fetched at the same time")
+    parser.add_argument("--players", type=int, default=BATCH_PLAYER_WORKERS, help="players analyzed at the same time")
+    parser.add_argument("--llm-workers", type=int, default=LLM_CONCURRENCY, help="games analyzed at the same time")
+    parser.add_argument("--checkpoint", default=BATCH_CHECKPOINT_PATH, help="checkpoint database")
+    parser.add_argument("--fresh", action="store_true", help="ignore the checkpoints of an earlier run")
+    args = parser.parse_args(argv)
+    metrics.setup_logging()
+    metrics.start_metrics_log()
+
+    end = args.end + datetime.timedelta(days=1, microseconds=-1) if args.end else datetime.datetime.now()
+    start = args.start or end - datetime.timedelta(days=args.days)
+    if start > end:
+        parser.error("--start is after --end")
+
+    usernames = read_usernames(args.usernames)
+    checkpoint = Checkpoint(f"{start:%Y-%m-%d}..{end:%Y-%m-%d}", args.checkpoint)
+    if args.fresh:
+        checkpoint.reset()
+    print(f"Analyzing {len(usernames)} players' games from {start:%Y-%m-%d} to {end:%Y-%m-%d}")
+    batch = BatchRun(start, end, AnalysisEngine(max_workers=args.llm_workers), checkpoint, args.workers, args.players)
+    totals = batch.run(usernames)
+    print(format_summary(totals))
+    return 1 if totals["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
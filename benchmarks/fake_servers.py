@@ -0,0 +1,252 @@
+"""
+Local stand-ins for the Chess.com API and an OpenAI-compatible LLM, used by the offline benchmarks
+Both run on 127.0.0.1 in a background thread and count every request they answer
+"""
+import json
+import random
+import re
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Any, List, Optional
+
+_PROFILE = re.compile(r"^/pub/player/([^/]+)/?$")
+_ARCHIVES = re.compile(r"^/pub/player/([^/]+)/games/archives/?$")
+_MONTH = re.compile(r"^/pub/player/([^/]+)/games/(\d{4})/(\d{2})/?$")
+_PLAYERS = re.compile(r"White: (\S+) .*?\n\s*Black: (\S+) ", re.S)
+
+_ANALYSIS = """• Opening: {opening}
+• Key Moments:
+  - [Move 9. Bg5] {white} pins the knight and keeps the pressure on f6
+  - [Move 13. Rxd7] {white} gives up the exchange to open the d-file
+  - [Move 16. Qb8+] {black} is forced to take the queen
+• Final Outcome: The game ended {result}
+• Recommendations:
+  - [Move 5... dxe5] {black} should develop with 5... Nf6 instead of opening lines
+  - [Move 7... Qe7] {black} needs 7... Qd7 to cover b7 and d7
+  - [Move 10... cxb5] {black} should decline the piece with 10... Qb4+"""
+
+
+class _Server:
+    """A ThreadingHTTPServer on a free local port, served from a daemon thread"""
+
+    handler = BaseHTTPRequestHandler
+
+    def __init__(self):
+        self.requests: Counter = Counter()
+        self.bytes_sent = 0
+        self._lock = threading.Lock()
+        server = self
+
+        class Handler(self.handler):
+            owner = server
+
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._httpd.daemon_threads = True
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name=type(self).__name__, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def count(self, kind: str, sent: int = 0) -> None:
+        with self._lock:
+            self.requests[kind] += 1
+            self.bytes_sent += sent
+
+    def count_bytes(self, sent: int) -> None:
+        with self._lock:
+            self.bytes_sent += sent
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"requests": dict(self.requests), "total": sum(self.requests.values()), "bytes_sent": self.bytes_sent}
+
+    def reset_stats(self) -> None:
+        with self._lock:
+            self.requests.clear()
+            self.bytes_sent = 0
+
+    def start(self) -> "_Server":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Small replies go out at once; with Nagle's algorithm every keep-alive call waits ~40 ms for an ACK
+    disable_nagle_algorithm = True
+    owner: _Server = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, kind: str, status: int, data: Any, headers: Optional[Dict[str, str]] = None) -> None:
+        body = json.dumps(data).encode("utf-8") if data is not None else b""
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        if data is not None:
+            self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        # Counted before the client can see the reply, so a finished stage has all of its requests counted
+        self.owner.count(kind, len(body))
+        self.wfile.write(body)
+
+
+class _ChessComHandler(_Handler):
+    owner: "FakeChessCom" = None
+
+    def do_GET(self):
+        path = self.path.split("?", 1)[0]
+        month = _MONTH.match(path)
+        if month:
+            username, period = month.group(1).lower(), f"{month.group(2)}/{month.group(3)}"
+            archive = self.owner.archives.get(username, {}).get(period)
+            if archive is None:
+                return self.send_json("not_found", 404, {"code": 0, "message": "Not found"})
+            etag = self.owner.etag(username, period)
+            if self.headers.get("If-None-Match") == etag:
+                return self.send_json("not_modified", 304, None, {"ETag": etag})
+            return self.send_json("archive", 200, archive, {"ETag": etag})
+        archives = _ARCHIVES.match(path)
+        if archives:
+            username = archives.group(1).lower()
+            if username not in self.owner.archives:
+                return self.send_json("not_found", 404, {"code": 0, "message": "User not found"})
+            base = self.owner.url + "/pub"
+            urls = [f"{base}/player/{username}/games/{period}" for period in sorted(self.owner.archives[username])]
+            return self.send_json("archives", 200, {"archives": urls})
+        profile = _PROFILE.match(path)
+        if profile and profile.group(1).lower() in self.owner.archives:
+            username = profile.group(1).lower()
+            return self.send_json("profile", 200, {"username": username, "status": "premium",
+                                                   "@id": f"{self.owner.url}/pub/player/{username}"})
+        self.send_json("not_found", 404, {"code": 0, "message": "Not found"})
+
+
+class FakeChessCom(_Server):
+    """
+    Serves player profiles, archive lists and monthly archives from memory, like api.chess.com/pub
+    archives maps a username to {"YYYY/MM": archive}; monthly archives carry an ETag and honour If-None-Match
+    Point CHESSCOM_API_URL at url + "/pub"
+    """
+
+    handler = _ChessComHandler
+
+    def __init__(self, archives: Dict[str, Dict[str, Dict[str, Any]]]):
+        super().__init__()
+        self.archives = {username.lower(): months for username, months in archives.items()}
+
+    def etag(self, username: str, period: str) -> str:
+        return f'W/"{username}-{period.replace("/", "-")}-{len(self.archives[username][period]["games"])}"'
+
+
+class _LLMHandler(_Handler):
+    owner: "FakeLLM" = None
+
+    def do_POST(self):
+        if self.path.rstrip("/").split("?", 1)[0] != "/v1/chat/completions":
+            return self.send_json("not_found", 404, {"error": {"message": "Not found"}})
+        request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        prompt = request.get("messages", [{}])[-1].get("content", "")
+        with self.owner._lock:
+            self.owner.prompt_chars += len(prompt)
+        time.sleep(self.owner.latency)
+        if self.owner.fails():
+            return self.send_json("error", 500, {"error": {"message": "The server had an error", "type": "server_error"}})
+        text = self.owner.answer(prompt)
+        model = request.get("model", "gpt-4o")
+        if request.get("stream"):
+            return self.stream(model, text)
+        self.send_json("completion", 200, {
+            "id": "chatcmpl-bench", "object": "chat.completion", "created": int(time.time()), "model": model,
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": len(prompt) // 4 + 1, "completion_tokens": len(text) // 4 + 1,
+                      "total_tokens": (len(prompt) + len(text)) // 4 + 2}
+        })
+
+    def stream(self, model: str, text: str) -> None:
+        """Server-sent events of chat.completion.chunk objects, one per line of text"""
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.owner.count("stream")
+        pieces = [{"content": line} for line in text.splitlines(keepends=True)] + [{}]
+        for index, delta in enumerate(pieces):
+            chunk = {"id": "chatcmpl-bench", "object": "chat.completion.chunk", "created": int(time.time()),
+                     "model": model, "choices": [{"index": 0, "delta": delta,
+                                                  "finish_reason": None if delta else "stop"}]}
+            event = f"data: {json.dumps(chunk)}\n\n".encode("utf-8")
+            self.wfile.write(event)
+            self.wfile.flush()
+            self.owner.count_bytes(len(event))
+            if delta and index < len(pieces) - 2:
+                time.sleep(self.owner.chunk_delay)
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.close_connection = True
+
+
+class FakeLLM(_Server):
+    """
+    OpenAI-compatible chat completions endpoint answering every prompt in the app's analysis format
+    latency is added to every call, error_rate is the share of calls failing with a 500, and
+    chunk_delay spaces streamed lines; multi-game prompts get a JSON array of analyses
+    Point OPENAI_BASE_URL at url + "/v1"
+    """
+
+    handler = _LLMHandler
+
+    def __init__(self, latency: float = 0.0, error_rate: float = 0.0, chunk_delay: float = 0.0, seed: int = 0):
+        super().__init__()
+        self.latency = latency
+        self.error_rate = error_rate
+        self.chunk_delay = chunk_delay
+        self.prompt_chars = 0
+        self._random = random.Random(seed)
+
+    def fails(self) -> bool:
+        with self._lock:
+            return self._random.random() < self.error_rate
+
+    def stats(self) -> Dict[str, Any]:
+        stats = super().stats()
+        with self._lock:
+            stats["prompt_chars"] = self.prompt_chars
+        return stats
+
+    def reset_stats(self) -> None:
+        super().reset_stats()
+        with self._lock:
+            self.prompt_chars = 0
+
+    @staticmethod
+    def _analysis(details: str) -> str:
+        players = _PLAYERS.search(details)
+        white, black = players.groups() if players else ("White", "Black")
+        opening = re.search(r"Opening \(already classified, use as-is\): (.+)", details)
+        result = re.search(r"Result: (\S+)", details)
+        return _ANALYSIS.format(white=white, black=black, opening=opening.group(1) if opening else "Unclassified",
+                                result=f"in a {result.group(1)}" if result else "decisively")
+
+    def answer(self, prompt: str) -> str:
+        games: List[str] = re.split(r"\n\s*Game id: (g\d+)\n", prompt)
+        if len(games) == 1:
+            return self._analysis(prompt)
+        # games = [preamble, id, details, id, details, ...]
+        return json.dumps([{"id": game_id, "analysis": self._analysis(details)}
+                           for game_id, details in zip(games[1::2], games[2::2])])
@@ -0,0 +1,164 @@
+"""
+Chess.com monthly archives for the offline benchmarks
+Usage: python benchmarks/fixtures.py OUT_DIR [--sizes 10,500,5000]     write synthetic archives
+       python benchmarks/fixtures.py OUT_DIR --record USERNAME [--months N]  record real archives
+Synthetic archives copy the shape of the API's games (headers, clocked PGN, ratings, results)
+and are deterministic, so two benchmark runs always see the same games
+Recorded archives are saved as <username>-<YYYY>-<MM>.json, the API's response as-is
+"""
+import argparse
+import datetime
+import glob
+import json
+import os
+import random
+import sys
+from typing import Dict, Any, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Games per month in the standard benchmark sizes
+SIZES = (10, 500, 5000)
+
+# Real games (legal SAN), cycled and dressed up with different players, clocks and dates
+_TEMPLATES = [
+    # Morphy's Opera Game, C41
+    ("1-0", "checkmated", "e4 e5 Nf3 d6 d4 Bg4 dxe5 Bxf3 Qxf3 dxe5 Bc4 Nf6 Qb3 Qe7 Nc3 c6 Bg5 b5 Nxb5 cxb5 "
+                          "Bxb5+ Nbd7 O-O-O Rd8 Rxd7 Rxd7 Rd1 Qe6 Bxd7+ Nxd7 Qb8+ Nxb8 Rd8#"),
+    # Closed Ruy Lopez, C92
+    ("1/2-1/2", "agreed", "e4 e5 Nf3 Nc6 Bb5 a6 Ba4 Nf6 O-O Be7 Re1 b5 Bb3 d6 c3 O-O h3 Nb8 d4 Nbd7 Nbd2 Bb7 "
+                          "Bc2 Re8 Nf1 Bf8 Ng3 g6 a4 c5 d5 c4 Bg5 h6 Be3 Nc5 Qd2 h5 Bg5 Be7 Ra3 Nh7 Bxe7 Qxe7 "
+                          "axb5 axb5 Rxa8 Rxa8"),
+    # Queen's Gambit Declined, D67
+    ("1-0", "resigned", "d4 d5 c4 e6 Nc3 Nf6 Bg5 Be7 e3 O-O Nf3 Nbd7 Rc1 c6 Bd3 dxc4 Bxc4 Nd5 Bxe7 Qxe7 O-O "
+                        "Nxc3 Rxc3 e5 Qc2 exd4 exd4 Nf6 Re1 Qd6 h3 Be6 Bxe6 fxe6 Rxe6 Qf4 Re1 Rad8"),
+    # Sicilian Najdorf, English Attack, B80
+    ("0-1", "resigned", "e4 c5 Nf3 d6 d4 cxd4 Nxd4 Nf6 Nc3 a6 Be3 e5 Nb3 Be6 f3 Be7 Qd2 O-O O-O-O Nbd7 g4 b5 "
+                        "g5 b4 Ne2 Ne8 f4 a5 f5 a4 Nbd4 exd4 Nxd4 b3 Kb1 bxc2+ Nxc2 Bb3 axb3 axb3 Na3 Rxa3 "
+                        "bxa3 Qa5 Qb2 Qxa3"),
+]
+_TIME_CONTROLS = [("180+2", "blitz", 1800), ("600", "rapid", 6000), ("60", "bullet", 600)]
+_OPPONENTS = ["hikaru", "magnuscarlsen", "danielnaroditsky", "gothamchess", "anna_chess", "fabianocaruana",
+              "alireza2003", "penguingm1", "lachesisq", "chessbrah"]
+
+
+def _movetext(sans: List[str], base_tenths: int, increment: int, rng: random.Random) -> str:
+    """Chess.com style movetext with a clock comment after every ply"""
+    clocks = [base_tenths, base_tenths]
+    parts = []
+    for ply, san in enumerate(sans):
+        side = ply % 2
+        clocks[side] = max(1, clocks[side] - rng.randint(5, base_tenths // 25 + 10) + increment * 10)
+        seconds, tenths = divmod(clocks[side], 10)
+        clock = f"{{[%clk {seconds // 3600}:{seconds // 60 % 60:02d}:{seconds % 60:02d}.{tenths}]}}"
+        number = f"{ply // 2 + 1}." if side == 0 else f"{ply // 2 + 1}..."
+        parts.append(f"{number} {san} {clock}")
+    return " ".join(parts)
+
+
+def synthetic_game(username: str, index: int, end_time: int, rng: random.Random) -> Dict[str, Any]:
+    """One archive game of username, shaped like the API's"""
+    result, termination, moves = _TEMPLATES[index % len(_TEMPLATES)]
+    time_control, time_class, base_tenths = _TIME_CONTROLS[index % len(_TIME_CONTROLS)]
+    increment = int(time_control.split("+")[1]) if "+" in time_control else 0
+    opponent = f"{_OPPONENTS[index % len(_OPPONENTS)]}{index // len(_OPPONENTS) or ''}"
+    white, black = (username, opponent) if index % 2 == 0 else (opponent, username)
+    results = {"1-0": ("win", termination), "0-1": (termination, "win"), "1/2-1/2": (termination, termination)}
+    white_result, black_result = results[result]
+    ended = datetime.datetime.fromtimestamp(end_time, tz=datetime.timezone.utc)
+    game_id = 100000000000 + end_time * 10 + index % 10
+    winner = white if result == "1-0" else black
+    headers = [
+        ("Event", "Live Chess"), ("Site", "Chess.com"), ("Date", f"{ended:%Y.%m.%d}"), ("Round", "-"),
+        ("White", white), ("Black", black), ("Result", result), ("CurrentPosition", "-"),
+        ("TimeControl", time_control), ("EndDate", f"{ended:%Y.%m.%d}"), ("EndTime", f"{ended:%H:%M:%S}"),
+        ("Link", f"https://www.chess.com/game/live/{game_id}"),
+        ("Termination", f"{winner} won by {termination}" if result != "1/2-1/2" else "Game drawn by agreement")
+    ]
+    pgn = "\n".join(f'[{name} "{value}"]' for name, value in headers)
+    pgn += "\n\n" + _movetext(moves.split(), base_tenths, increment, rng) + f" {result}\n"
+    return {
+        "url": f"https://www.chess.com/game/live/{game_id}",
+        "pgn": pgn,
+        "time_control": time_control,
+        "end_time": end_time,
+        "rated": True,
+        "uuid": f"{game_id:032x}",
+        "initial_setup": "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1",
+        "time_class": time_class,
+        "rules": "chess",
+        "white": {"rating": rng.randint(1200, 2800), "result": white_result,
+                  "@id": f"https://api.chess.com/pub/player/{white.lower()}", "username": white},
+        "black": {"rating": rng.randint(1200, 2800), "result": black_result,
+                  "@id": f"https://api.chess.com/pub/player/{black.lower()}", "username": black}
+    }
+
+
+def synthetic_archive(username: str, games: int, year: int, month: int, seed: int = 0) -> Dict[str, Any]:
+    """
+    A month of games for username, spread evenly over the month in end_time order
+    The same arguments always give the same archive
+    """
+    rng = random.Random(f"{username}:{year}-{month}:{seed}")
+    first = datetime.datetime(year, month, 1, tzinfo=datetime.timezone.utc)
+    following = datetime.datetime(year + month // 12, month % 12 + 1, 1, tzinfo=datetime.timezone.utc)
+    start, span = int(first.timestamp()), int((following - first).total_seconds())
+    step = span / max(1, games)
+    return {"games": [synthetic_game(username, index, start + int(step * index), rng) for index in range(games)]}
+
+
+def load_recorded(directory: str) -> Dict[str, Dict[str, Any]]:
+    """Recorded archives in directory, keyed by file name without .json (<username>-<YYYY>-<MM>)"""
+    archives = {}
+    for path in sorted(glob.glob(os.path.join(directory, "*.json"))):
+        with open(path, "r", encoding="utf-8") as f:
+            archives[os.path.splitext(os.path.basename(path))[0]] = json.load(f)
+    return archives
+
+
+def record(username: str, directory: str, months: int = 1) -> List[str]:
+    """Downloads the player's latest monthly archives from Chess.com into directory; returns the files"""
+    sys.path.insert(0, ROOT)
+    import http_client
+    from archive_store import parse_archive_url
+    headers = {'User-Agent': 'Chess Game Analyzer v1.0 (Contact: your@email.com)'}
+    archive_urls = http_client.get_json(
+        f"https://api.chess.com/pub/player/{username}/games/archives", headers=headers
+    ).get("archives", [])
+    os.makedirs(directory, exist_ok=True)
+    written = []
+    for url in archive_urls[-months:] if months > 0 else []:
+        _, period = parse_archive_url(url)
+        path = os.path.join(directory, f"{username.lower()}-{period.replace('/', '-')}.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(http_client.get_json(url, headers=headers), f)
+        written.append(path)
+    return written
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("out_dir", help="directory the archives are written to")
+    parser.add_argument("--sizes", default=",".join(str(size) for size in SIZES),
+                        help="games per synthetic archive, comma separated (default 10,500,5000)")
+    parser.add_argument("--record", metavar="USERNAME", help="download this player's real archives instead")
+    parser.add_argument("--months", type=int, default=1, help="latest months recorded with --record (default 1)")
+    args = parser.parse_args()
+
+    if args.record:
+        paths = record(args.record, args.out_dir, args.months)
+    else:
+        os.makedirs(args.out_dir, exist_ok=True)
+        paths = []
+        for size in (int(size) for size in args.sizes.split(",")):
+            path = os.path.join(args.out_dir, f"bench{size}-2024-01.json")
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(synthetic_archive(f"bench{size}", size, 2024, 1), f)
+            paths.append(path)
+    for path in paths:
+        print(path)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
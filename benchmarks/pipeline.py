@@ -0,0 +1,258 @@
+"""
+Offline end-to-end benchmark: fetch a month of games, analyze them, save them and render the results
+Usage: python benchmarks/pipeline.py [--sizes 10,500,5000] [--fixtures DIR] [--llm-latency S]
+                                     [--llm-error-rate R] [--chunk-delay S] [--stream] [--no-memory]
+                                     [--json PATH] [--compare BASELINE.json] [--tolerance 0.25]
+Chess.com and the LLM are replaced by local fake servers (benchmarks/fake_servers.py), so the run
+needs no network or API keys. Each size is run twice: cold (empty caches) and warm (caches filled
+by the cold pass). Every stage reports its wall time, tracemalloc peak and the requests it sent
+With --compare, exits with status 1 when a stage got slower than the baseline by more than --tolerance
+"""
+import argparse
+import datetime
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Dict, Any, List, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import fixtures
+from fake_servers import FakeChessCom, FakeLLM
+
+STAGES = ("fetch", "analyze", "save", "render")
+# Stage slowdowns smaller than this many seconds are noise, whatever the tolerance
+MIN_REGRESSION = 0.005
+
+
+def configure(workdir: str, chesscom: FakeChessCom, llm: FakeLLM) -> None:
+    """
+    Points the app at the fake servers and a scratch directory; must run before the app is imported
+    Provider quotas and the local engine pass are off unless set in the environment, so the timings
+    show the fetch, LLM and render path (PREANALYSIS=1 adds the engine pass to the analyze stage)
+    """
+    os.environ.update({
+        "CHESSCOM_API_URL": chesscom.url + "/pub",
+        "OPENAI_BASE_URL": llm.url + "/v1",
+        "OPENAI_API_KEY": "benchmark",
+        "GOOGLE_API_KEY": "",
+        "LLM_MODEL": "gpt-4o",
+        "ARCHIVE_CACHE_PATH": os.path.join(workdir, "archive_cache.db"),
+        "ANALYSIS_CACHE_PATH": os.path.join(workdir, "analysis_cache.db"),
+        "GAME_DB_PATH": os.path.join(workdir, "chessdb.db"),
+        "METRICS_LOG_PATH": ""
+    })
+    for name, value in {"OPENAI_RPM": "0", "OPENAI_TPM": "0", "PREANALYSIS": "0", "LOG_LEVEL": "ERROR"}.items():
+        os.environ.setdefault(name, value)
+
+
+def load_archives(args) -> Dict[str, Dict[str, Dict[str, Any]]]:
+    """username -> {"YYYY/MM": archive}, from --fixtures or generated for --sizes"""
+    archives: Dict[str, Dict[str, Dict[str, Any]]] = {}
+    if args.fixtures:
+        for name, archive in fixtures.load_recorded(args.fixtures).items():
+            username, year, month = name.rsplit("-", 2)
+            archives.setdefault(username.lower(), {})[f"{year}/{month}"] = archive
+        return archives
+    for size in (int(size) for size in args.sizes.split(",")):
+        archives[f"bench{size}"] = {"2024/01": fixtures.synthetic_archive(f"bench{size}", size, 2024, 1)}
+    return archives
+
+
+class Stage:
+    """Times one stage and records its memory peak and the requests each fake server answered"""
+
+    def __init__(self, servers: Dict[str, Any], trace_memory: bool):
+        self.servers = servers
+        self.trace_memory = trace_memory
+        self.results: Dict[str, Dict[str, Any]] = {}
+
+    def run(self, name: str, fn, *args):
+        before = {server: self.servers[server].stats()["total"] for server in self.servers}
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+            baseline = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        value = fn(*args)
+        elapsed = time.perf_counter() - start
+        result = {"seconds": elapsed}
+        if self.trace_memory:
+            result["peak_bytes"] = max(0, tracemalloc.get_traced_memory()[1] - baseline)
+        for server in self.servers:
+            result[f"{server}_requests"] = self.servers[server].stats()["total"] - before[server]
+        self.results[name] = result
+        return value
+
+
+def _rows(games: List[Dict[str, Any]], analyses: List[Any]) -> List[Dict[str, Any]]:
+    """Results table rows of the analyzed games, newest first, as the web interface builds them"""
+    rows = [{
+        'date': datetime.datetime.fromtimestamp(game_data['end_time']).strftime('%Y-%m-%d %H:%M:%S'),
+        'white_player': game_data['white_player'],
+        'black_player': game_data['black_player'],
+        'result': game_data['result'],
+        'analysis': analysis,
+        'end_time': game_data['end_time']
+    } for game_data, analysis in zip(games, analyses) if isinstance(analysis, str)]
+    rows.sort(key=lambda row: -row['end_time'])
+    return rows
+
+
+def run_pass(username: str, servers: Dict[str, Any], args) -> Dict[str, Any]:
+    """Fetches, analyzes, saves and renders one player's latest month"""
+    import main
+    import metrics
+    import renderer
+    from analysis_cache import is_cacheable
+    from analysis_engine import AnalysisEngine
+
+    metrics.get_metrics().reset()
+    stage = Stage(servers, not args.no_memory)
+    start = time.perf_counter()
+
+    games = stage.run("fetch", main.ChessComAnalyzer(username).get_all_games)
+    if isinstance(games, dict):
+        raise RuntimeError(games["error"])
+
+    engine = AnalysisEngine(max_workers=args.llm_workers)
+    if args.stream:
+        def analyze(games):
+            analyses = [None] * len(games)
+            for index, analysis in engine.iter_analyses(games, on_partial=lambda index, text: None):
+                analyses[index] = analysis
+            return analyses
+    else:
+        analyze = engine.analyze_games
+    analyses = stage.run("analyze", analyze, games)
+
+    stage.run("save", main.save_game_analyses,
+              [(game_data, analysis) for game_data, analysis in zip(games, analyses) if is_cacheable(analysis)])
+    rows = _rows(games, analyses)
+    html = stage.run("render", renderer.render_results, rows)
+
+    snapshot = metrics.snapshot()
+    return {
+        "games": len(games),
+        "seconds": time.perf_counter() - start,
+        "stages": stage.results,
+        "analyzed": sum(1 for analysis in analyses if is_cacheable(analysis)),
+        "cache_hits": engine.cache_hits,
+        "prompt_tokens": engine.prompt_tokens,
+        "html_bytes": len(html),
+        "counters": snapshot["counters"],
+        "timers": snapshot["timers"]
+    }
+
+
+def run(args) -> Dict[str, Any]:
+    archives = load_archives(args)
+    with tempfile.TemporaryDirectory(prefix="moveanalyzer-bench-") as workdir, \
+            FakeChessCom(archives) as chesscom, \
+            FakeLLM(args.llm_latency, args.llm_error_rate, args.chunk_delay) as llm:
+        configure(workdir, chesscom, llm)
+        import metrics
+        import providers
+        metrics.setup_logging(metrics.LOG_LEVEL)
+        # Import the SDK and build its client up front: that cost is startup.py's, not the first size's
+        providers.get_router().providers["gpt-4o"].client()
+        if not args.no_memory:
+            tracemalloc.start()
+        results = []
+        for username in archives:
+            for name in ("cold", "warm"):
+                result = run_pass(username, {"chesscom": chesscom, "llm": llm}, args)
+                results.append(dict(result, player=username, run=name))
+        if not args.no_memory:
+            tracemalloc.stop()
+        # Connections live per thread; close this thread's before the directory goes away
+        from db import close_connection
+        for name in ("ARCHIVE_CACHE_PATH", "ANALYSIS_CACHE_PATH", "GAME_DB_PATH"):
+            close_connection(os.environ[name])
+    return {
+        "config": {
+            "llm_latency": args.llm_latency, "llm_error_rate": args.llm_error_rate,
+            "chunk_delay": args.chunk_delay, "stream": args.stream, "llm_workers": args.llm_workers,
+            "preanalysis": os.environ["PREANALYSIS"] == "1", "memory_traced": not args.no_memory,
+            "python": sys.version.split()[0]
+        },
+        "results": results
+    }
+
+
+def format_report(report: Dict[str, Any]) -> str:
+    lines = [f"{'games':>6} {'run':<5} {'stage':<8}{'ms':>11}{'peak KB':>10}{'chess.com':>11}{'llm':>7}"]
+    for result in report["results"]:
+        for name in STAGES:
+            stage = result["stages"][name]
+            peak = f"{stage['peak_bytes'] / 1024:.0f}" if "peak_bytes" in stage else "-"
+            lines.append(f"{result['games']:>6} {result['run']:<5} {name:<8}{stage['seconds'] * 1000:>11.1f}"
+                         f"{peak:>10}{stage['chesscom_requests']:>11}{stage['llm_requests']:>7}")
+        llm_latency = result["timers"].get("llm.gpt-4o.latency", {})
+        lines.append(f"{result['games']:>6} {result['run']:<5} {'total':<8}{result['seconds'] * 1000:>11.1f}"
+                     f"   {result['games'] / result['seconds'] if result['seconds'] else 0:.0f} games/s, "
+                     f"{result['analyzed']} analyzed, {result['cache_hits']} cached, "
+                     f"llm p50/p95 {llm_latency.get('p50_ms', 0):.0f}/{llm_latency.get('p95_ms', 0):.0f} ms")
+    return "\n".join(lines)
+
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Stages slower than in the baseline (same player and run) by more than tolerance"""
+    earlier: Dict[Tuple[str, str], Dict[str, Any]] = {
+        (result["player"], result["run"]): result for result in baseline.get("results", [])
+    }
+    regressions = []
+    for result in report["results"]:
+        before = earlier.get((result["player"], result["run"]))
+        if before is None:
+            continue
+        for name in STAGES:
+            old, new = before["stages"][name]["seconds"], result["stages"][name]["seconds"]
+            if new > old * (1 + tolerance) and new - old > MIN_REGRESSION:
+                regressions.append(f"{result['games']} games {result['run']} {name}: "
+                                   f"{old * 1000:.1f} ms -> {new * 1000:.1f} ms ({new / old - 1:+.0%})")
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", default=",".join(str(size) for size in fixtures.SIZES),
+                        help="games per synthetic month, comma separated (default 10,500,5000)")
+    parser.add_argument("--fixtures", help="directory of recorded archives to use instead (see fixtures.py)")
+    parser.add_argument("--llm-latency", type=float, default=0.01, help="seconds the fake LLM takes per call")
+    parser.add_argument("--llm-error-rate", type=float, default=0.0, help="share of LLM calls failing with a 500")
+    parser.add_argument("--chunk-delay", type=float, default=0.0, help="seconds between streamed lines")
+    parser.add_argument("--llm-workers", type=int, default=int(os.getenv("LLM_CONCURRENCY", 4)),
+                        help="games analyzed at the same time")
+    parser.add_argument("--stream", action="store_true", help="stream analyses like the web interface")
+    parser.add_argument("--no-memory", action="store_true", help="skip tracemalloc (faster, no peaks)")
+    parser.add_argument("--json", help="write the full report to this file")
+    parser.add_argument("--compare", help="report written by an earlier --json run")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown per stage (default 0.25)")
+    args = parser.parse_args()
+
+    report = run(args)
+    print(format_report(report))
+    if not args.no_memory:
+        print("Timings include tracemalloc overhead; use --no-memory for exact timings")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        if {**baseline.get("config", {}), "python": None} != {**report["config"], "python": None}:
+            print("Warning: the baseline was run with different options, timings may not be comparable")
+        regressions = compare(report, baseline, args.tolerance)
+        for regression in regressions:
+            print(f"SLOWER: {regression}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
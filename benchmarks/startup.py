@@ -0,0 +1,53 @@
+"""
+Startup benchmark: how long importing each entry module takes in a fresh interpreter
+Usage: python benchmarks/startup.py [--repeat N]
+Exits with status 1 when a module's median import time is over its budget
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Import-time budget per module in milliseconds (override with STARTUP_BUDGET_<MODULE>=ms)
+BUDGETS_MS = {
+    "main": 400,
+    "ai_model": 500,
+    "interface": 1000
+}
+
+_MEASURE = "import time; start = time.perf_counter(); import {module}; print((time.perf_counter() - start) * 1000)"
+
+
+def measure(module: str, repeat: int) -> float:
+    """Median import time of a module in milliseconds, one fresh interpreter per run"""
+    timings = []
+    for _ in range(repeat):
+        output = subprocess.run(
+            [sys.executable, "-c", _MEASURE.format(module=module)],
+            cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout
+        timings.append(float(output.strip().splitlines()[-1]))
+    return statistics.median(timings)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5, help="fresh interpreters per module (default 5)")
+    args = parser.parse_args()
+
+    over_budget = False
+    print(f"{'module':<12}{'median ms':>12}{'budget ms':>12}")
+    for module, budget in BUDGETS_MS.items():
+        budget = float(os.getenv(f"STARTUP_BUDGET_{module.upper()}", budget))
+        elapsed = measure(module, max(1, args.repeat))
+        over = elapsed > budget
+        over_budget = over_budget or over
+        print(f"{module:<12}{elapsed:>12.1f}{budget:>12.0f}{'  OVER BUDGET' if over else ''}")
+    return 1 if over_budget else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
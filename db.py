@@ -0,0 +1,34 @@
+import sqlite3
+import threading
+from typing import Dict
+
+# One connection per (thread, database file); sqlite3 connections must not be shared across threads
+_local = threading.local()
+
+
+def get_connection(path: str) -> sqlite3.Connection:
+    """
+    Returns a SQLite connection for the current thread
+    Opens the database in WAL mode so readers never block the writer
+    """
+    connections: Dict[str, sqlite3.Connection] = getattr(_local, "connections", None)
+    if connections is None:
+        connections = {}
+        _local.connections = connections
+
+    conn = connections.get(path)
+    if conn is None:
+        conn = sqlite3.connect(path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        connections[path] = conn
+    return conn
+
+
+def close_connection(path: str) -> None:
+    """Closes the current thread's connection to a database file, if any"""
+    connections = getattr(_local, "connections", {})
+    conn = connections.pop(path, None)
+    if conn is not None:
+        conn.close()
@@ -0,0 +1,204 @@
+import os
+import csv
+import sys
+import datetime
+import time
+import threading
+from typing import Dict, Any, List, Iterable, Optional
+from db import get_connection
+
+# SQLite file holding analyzed games (replaces chessdb.csv)
+GAME_DB_PATH = os.getenv("GAME_DB_PATH", "chessdb.db")
+# Rows written per transaction when saving or importing in bulk
+BATCH_SIZE = int(os.getenv("GAME_DB_BATCH_SIZE", 500))
+
+# Same columns as chessdb.csv, plus the raw end_time for range queries
+FIELDS = ['game_id', 'date', 'end_time', 'white_player', 'white_rating', 'black_player',
+          'black_rating', 'result', 'time_control', 'analysis', 'pgn']
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS games (
+    game_id TEXT PRIMARY KEY,
+    date TEXT,
+    end_time INTEGER,
+    white_player TEXT,
+    white_rating INTEGER,
+    black_player TEXT,
+    black_rating INTEGER,
+    result TEXT,
+    time_control TEXT,
+    analysis TEXT,
+    pgn TEXT
+);
+CREATE INDEX IF NOT EXISTS games_white_player ON games (lower(white_player), end_time);
+CREATE INDEX IF NOT EXISTS games_black_player ON games (lower(black_player), end_time);
+-- Per-player sync watermark: the newest game already analyzed and stored, and the ETag of
+-- its monthly archive when every game in that archive up to the watermark was stored
+CREATE TABLE IF NOT EXISTS sync_state (
+    username TEXT PRIMARY KEY,
+    last_end_time INTEGER NOT NULL,
+    archive_url TEXT,
+    etag TEXT,
+    synced_at REAL NOT NULL
+);
+"""
+
+_UPSERT = (
+    f"INSERT INTO games ({', '.join(FIELDS)}) VALUES ({', '.join('?' for _ in FIELDS)}) "
+    "ON CONFLICT(game_id) DO UPDATE SET "
+    + ", ".join(f"{field} = excluded.{field}" for field in FIELDS if field != 'game_id')
+)
+
+
+def make_game_id(game_data: Dict[Any, Any]) -> str:
+    """Unique identifier of a game, identical to the one used in chessdb.csv"""
+    return f"{game_data['end_time']}_{game_data['white_player']}_{game_data['black_player']}"
+
+
+def build_row(game_data: Dict[Any, Any], analysis: str) -> Dict[str, Any]:
+    """Turns a game data dictionary and its analysis into a store row"""
+    return {
+        'game_id': make_game_id(game_data),
+        'date': datetime.datetime.fromtimestamp(game_data['end_time']).strftime('%Y-%m-%d %H:%M:%S'),
+        'end_time': game_data['end_time'],
+        'white_player': game_data['white_player'],
+        'white_rating': game_data['white_rating'],
+        'black_player': game_data['black_player'],
+        'black_rating': game_data['black_rating'],
+        'result': game_data['result'],
+        'time_control': game_data['time_control'],
+        'analysis': analysis,
+        'pgn': game_data['pgn']
+    }
+
+
+def _chunks(rows: Iterable[Dict[str, Any]], size: int) -> Iterable[List[Dict[str, Any]]]:
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class GameStore:
+    """
+    SQLite (WAL mode) store of analyzed games with a primary key on game_id
+    Safe for several Gradio workers writing at once; each save is an indexed upsert
+    """
+
+    def __init__(self, path: str = GAME_DB_PATH):
+        self.path = path
+        self._schema_lock = threading.Lock()
+        self._schema_ready = False
+
+    def _connection(self):
+        conn = get_connection(self.path)
+        if not self._schema_ready:
+            with self._schema_lock:
+                if not self._schema_ready:
+                    conn.executescript(_SCHEMA)
+                    conn.commit()
+                    self._schema_ready = True
+        return conn
+
+    def save_games(self, rows: Iterable[Dict[str, Any]]) -> int:
+        """
+        Upserts rows in batches of BATCH_SIZE, one transaction per batch
+        Returns the number of rows written
+        """
+        conn = self._connection()
+        written = 0
+        for batch in _chunks(rows, BATCH_SIZE):
+            with conn:
+                conn.executemany(_UPSERT, [tuple(row.get(field) for field in FIELDS) for row in batch])
+            written += len(batch)
+        return written
+
+    def save_game(self, row: Dict[str, Any]) -> None:
+        """Upserts a single row"""
+        self.save_games([row])
+
+    def has_game(self, game_id: str) -> bool:
+        """Checks whether a game is already stored"""
+        row = self._connection().execute("SELECT 1 FROM games WHERE game_id = ?", (game_id,)).fetchone()
+        return row is not None
+
+    def get_game(self, game_id: str) -> Optional[Dict[str, Any]]:
+        """Returns a stored game as a dictionary, or None"""
+        row = self._connection().execute("SELECT * FROM games WHERE game_id = ?", (game_id,)).fetchone()
+        return dict(row) if row is not None else None
+
+    def player_games(self, username: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Stored games the player took part in, newest first"""
+        name = username.lower()
+        query = ("SELECT * FROM games WHERE lower(white_player) = ? "
+                 "UNION ALL SELECT * FROM games WHERE lower(black_player) = ? AND lower(white_player) != ? "
+                 "ORDER BY end_time DESC")
+        params = [name, name, name]
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(limit)
+        return [dict(row) for row in self._connection().execute(query, params)]
+
+    def get_watermark(self, username: str) -> Optional[Dict[str, Any]]:
+        """Returns the player's sync watermark, or None before the first sync"""
+        row = self._connection().execute(
+            "SELECT last_end_time, archive_url, etag, synced_at FROM sync_state WHERE username = ?",
+            (username.lower(),)
+        ).fetchone()
+        return dict(row) if row is not None else None
+
+    def set_watermark(self, username: str, last_end_time: int,
+                      archive_url: Optional[str] = None, etag: Optional[str] = None) -> None:
+        """Records that every game of the player up to last_end_time is stored"""
+        conn = self._connection()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO sync_state (username, last_end_time, archive_url, etag, synced_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (username.lower(), last_end_time, archive_url, etag, time.time())
+            )
+
+    def count(self) -> int:
+        """Number of stored games"""
+        return self._connection().execute("SELECT COUNT(*) FROM games").fetchone()[0]
+
+    def import_csv(self, csv_path: str) -> int:
+        """
+        Imports an existing chessdb.csv into the store
+        Returns the number of rows imported
+        """
+        def rows():
+            with open(csv_path, 'r', newline='', encoding='utf-8') as f:
+                for row in csv.DictReader(f):
+                    row = dict(row)
+                    # The CSV has no end_time column; it is the first part of the game_id
+                    end_time = row.get('game_id', '').split('_', 1)[0]
+                    row['end_time'] = int(end_time) if end_time.isdigit() else None
+                    yield row
+
+        return self.save_games(rows())
+
+
+_default_store: Optional[GameStore] = None
+_default_store_lock = threading.Lock()
+
+
+def get_game_store() -> GameStore:
+    """Returns the process-wide game store"""
+    global _default_store
+    if _default_store is None:
+        with _default_store_lock:
+            if _default_store is None:
+                _default_store = GameStore()
+    return _default_store
+
+
+if __name__ == "__main__":
+    # Usage: python game_store.py [chessdb.csv]
+    csv_path = sys.argv[1] if len(sys.argv) > 1 else 'chessdb.csv'
+    imported = get_game_store().import_csv(csv_path)
+    print(f"Imported {imported} games from {csv_path} into {GAME_DB_PATH}")
@@ -0,0 +1,138 @@
+import os
+import math
+import time
+import threading
+from typing import Dict, Any, Optional
+from urllib.parse import urlparse
+import requests
+from requests.adapters import HTTPAdapter
+import metrics
+from rate_limit import RateLimiter, backoff_delay
+
+# Connection pool sizing for the shared session
+POOL_CONNECTIONS = int(os.getenv("HTTP_POOL_CONNECTIONS", 4))
+POOL_MAXSIZE = int(os.getenv("HTTP_POOL_MAXSIZE", 16))
+REQUEST_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", 15))
+# Requests per second allowed to any single host (0 disables limiting)
+HOST_RATE_LIMIT = float(os.getenv("HTTP_HOST_RATE_LIMIT", 5))
+# How many times a 429 Too Many Requests response is retried
+MAX_RETRIES = int(os.getenv("HTTP_MAX_RETRIES", 3))
+# Longest Retry-After honoured, in seconds, so one bad header cannot hold a worker for long
+RETRY_AFTER_CAP = float(os.getenv("HTTP_RETRY_AFTER_CAP", REQUEST_TIMEOUT))
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+
+# host -> RateLimiter
+_host_limiters: Dict[str, RateLimiter] = {}
+_host_limiters_lock = threading.Lock()
+
+
+def get_session() -> requests.Session:
+    """
+    Returns the process-wide keep-alive session
+    Created on first use and shared by every ChessComAnalyzer instance
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                _session = session
+    return _session
+
+
+def reset_session() -> None:
+    """Closes the shared session"""
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+        _session = None
+
+
+def _host_limiter(url: str) -> RateLimiter:
+    """Returns the rate limiter shared by all requests to the URL's host"""
+    host = urlparse(url).netloc
+    with _host_limiters_lock:
+        limiter = _host_limiters.get(host)
+        if limiter is None:
+            limiter = RateLimiter(HOST_RATE_LIMIT)
+            _host_limiters[host] = limiter
+    return limiter
+
+
+def _retry_after(response: requests.Response, attempt: int) -> float:
+    """Seconds to wait before retrying a 429, honouring a numeric Retry-After header up to RETRY_AFTER_CAP"""
+    retry_after = response.headers.get("Retry-After")
+    try:
+        seconds = float(retry_after)
+    except (TypeError, ValueError):
+        return backoff_delay(attempt)
+    if not math.isfinite(seconds):
+        return backoff_delay(attempt)
+    return max(0.0, min(seconds, RETRY_AFTER_CAP))
+
+
+def get(url: str, headers: Optional[Dict[str, str]] = None) -> requests.Response:
+    """
+    Sends a GET request through the shared session
+    Requests are rate limited per host and 429 responses are retried with backoff
+    """
+    limiter = _host_limiter(url)
+    attempt = 0
+    while True:
+        limiter.acquire()
+        with metrics.timer("http.latency"):
+            response = get_session().get(url, headers=headers, timeout=REQUEST_TIMEOUT)
+        metrics.incr("http.requests")
+        metrics.incr("http.bytes", len(response.content or b""))
+        if response.status_code != 429 or attempt >= MAX_RETRIES:
+            return response
+        metrics.incr("http.throttled")
+        time.sleep(_retry_after(response, attempt))
+        attempt += 1
+
+
+def conditional_get(url: str, headers: Optional[Dict[str, str]] = None,
+                    etag: Optional[str] = None, last_modified: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Sends a GET request with the given ETag/Last-Modified validators
+    Returns {"not_modified": bool, "data": decoded JSON or None, "etag": ..., "last_modified": ...}
+    Raises requests.exceptions.RequestException on failure
+    """
+    request_headers = dict(headers or {})
+    if etag:
+        request_headers["If-None-Match"] = etag
+    if last_modified:
+        request_headers["If-Modified-Since"] = last_modified
+
+    response = get(url, headers=request_headers)
+
+    # Nothing changed since the validators were issued
+    if (etag or last_modified) and response.status_code == 304:
+        return {"not_modified": True, "data": None, "etag": etag, "last_modified": last_modified}
+
+    response.raise_for_status()
+    new_etag = response.headers.get("ETag")
+    new_last_modified = response.headers.get("Last-Modified")
+    return {
+        "not_modified": False,
+        "data": response.json(),
+        "etag": new_etag if isinstance(new_etag, str) else None,
+        "last_modified": new_last_modified if isinstance(new_last_modified, str) else None
+    }
+
+
+def get_json(url: str, headers: Optional[Dict[str, str]] = None) -> Any:
+    """
+    Fetches a URL through the shared session and returns the decoded JSON body
+    Archives are cached and revalidated by archive_store, which calls conditional_get itself
+    Raises requests.exceptions.RequestException on failure
+    """
+    response = get(url, headers=headers)
+    response.raise_for_status()
+    return response.json()
@@ -1,69 +1,103 @@
-import gradio as gr
 from typing import Dict, Any
-from main import ChessComAnalyzer, analyze_with_llm
+import main
+import metrics
+from analysis_engine import AnalysisEngine
+from stats import player_stats, summarize_with_llm
+from jobs import get_job_queue, DRAFT
+from analysis_cache import is_cacheable
+from game_store import make_game_id
+from providers import AnalysisError, NoProviderConfigured, UnsupportedModelError
+from renderer import RESULTS_CSS, render_game, render_results
 import datetime
+import html
 import os
 import base64
+import bisect
+import functools
+import logging
+import time
 
-# Read and encode the chess.png image
+logger = logging.getLogger(__name__)
+
+# Read and encode the chess.png image, once, when the app is first built
+@functools.lru_cache(maxsize=1)
 def get_chess_logo():
-    with open("chess.png", "rb") as image_file:
+    with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), "chess.png"), "rb") as image_file:
         encoded_string = base64.b64encode(image_file.read()).decode()
     return f"data:image/png;base64,{encoded_string}"
 
-LOGO_BASE64 = get_chess_logo()
-
-def format_results_as_html(results):
-    """Format results as an HTML table with bulleted analysis"""
-    html = """
-    <div style="margin: 20px 0; font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, Oxygen-Sans, Ubuntu, Cantarell, 'Helvetica Neue', sans-serif;">
-        <table style="width: 100%; border-collapse: separate; border-spacing: 0; border-radius: 8px; overflow: hidden; box-shadow: 0 4px 6px rgba(0, 0, 0, 0.1);">
-            <thead>
-                <tr style="background-color: var(--primary-500);">
-                    <th style="padding: 12px; text-align: left; color: white; font-weight: 600; font-size: 15px;">Date</th>
-                    <th style="padding: 12px; text-align: left; color: white; font-weight: 600; font-size: 15px;">White Player</th>
-                    <th style="padding: 12px; text-align: left; color: white; font-weight: 600; font-size: 15px;">Black Player</th>
-                    <th style="padding: 12px; text-align: left; color: white; font-weight: 600; font-size: 15px;">Result</th>
-                </tr>
-            </thead>
-            <tbody>
-    """
-    
-    for game in results:
-        # Format analysis with proper indentation and spacing
-        formatted_analysis = game['analysis']
-        # Replace bullet points with styled ones
-        formatted_analysis = formatted_analysis.replace('• ', '<br><span style="color: var(--primary-500);">•</span> ')
-        # Format sub-bullets with proper indentation
-        formatted_analysis = formatted_analysis.replace('  - ', '<br>&nbsp;&nbsp;&nbsp;<span style="color: var(--primary-600);">-</span> ')
-        # Format move numbers and notations
-        formatted_analysis = formatted_analysis.replace('[Move ', '<span style="font-family: monospace; background: var(--background-fill-secondary); padding: 2px 4px; border-radius: 3px;">Move ')
-        formatted_analysis = formatted_analysis.replace(']', '</span>')
-        # Format model attribution
-        formatted_analysis = formatted_analysis.replace('Analysis by:', '<br><br><em>Analysis by:</em>')
-        
-        html += f"""
-            <tr style="background-color: var(--background-fill-primary);">
-                <td style="padding: 12px; border-bottom: 1px solid var(--border-color-primary); font-size: 14px;">{game['date']}</td>
-                <td style="padding: 12px; border-bottom: 1px solid var(--border-color-primary); font-size: 14px;">{game['white_player']}</td>
-                <td style="padding: 12px; border-bottom: 1px solid var(--border-color-primary); font-size: 14px;">{game['black_player']}</td>
-                <td style="padding: 12px; border-bottom: 1px solid var(--border-color-primary); font-size: 14px;">{game['result']}</td>
-            </tr>
-            <tr>
-                <td colspan="4" style="padding: 16px; background-color: var(--background-fill-secondary); line-height: 1.8; font-size: 14px;">
-                    <div style="margin-left: 12px; white-space: pre-line;">
-                        {formatted_analysis}
-                    </div>
-                </td>
-            </tr>
-        """
-    
-    html += """
-            </tbody>
-        </table>
-    </div>
-    """
-    return html
+# Date filters and how many days back (before today) they reach
+DATE_FILTER_DAYS = {"Today": 0, "Last 7 days": 7, "Last 30 days": 30}
+# Periods offered on the Statistics tab
+STATS_PERIOD_DAYS = {"Last 30 days": 30, "Last 90 days": 90, "Last 365 days": 365}
+# Filter value that analyzes only the games played since the player's last sync
+SYNC_FILTER = "New since last sync"
+# Stored analyses shown next to the new games of a sync
+SYNC_DISPLAY_LIMIT = int(os.getenv("SYNC_DISPLAY_LIMIT", 50))
+# Show analyses word by word while the LLM writes them (0 waits for each complete analysis)
+STREAM_ANALYSES = os.getenv("STREAM_ANALYSES", "1") == "1"
+# Seconds between page updates for streamed text; finished games are always shown at once
+STREAM_RENDER_INTERVAL = float(os.getenv("STREAM_RENDER_INTERVAL", 0.2))
+# Shown in place of an analysis (or summary) no provider could write
+BUSY_MESSAGE = "API is busy, please try again later or reduce the number of days to analyze"
+
+def failure_message(error: AnalysisError) -> str:
+    """What the page shows for an analysis that failed"""
+    if isinstance(error, (UnsupportedModelError, NoProviderConfigured)):
+        return f"Error: {str(error)}"
+    return BUSY_MESSAGE
+
+def format_results_as_html(results, page=1):
+    """Format one page of results as an HTML table with bulleted analysis"""
+    return render_results(results, page)
+
+def show_results_page(results, page):
+    """Renders another page of the last search's results"""
+    return format_results_as_html(results, page) if results else ""
+
+# Shared styles of the statistics tables; rows only carry class names
+STATS_CSS = """
+.stats { margin: 20px 0; font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, Oxygen-Sans, Ubuntu, Cantarell, 'Helvetica Neue', sans-serif; }
+.stats h4 { margin: 16px 0 8px; }
+.stats table { width: 100%; border-collapse: separate; border-spacing: 0; border-radius: 8px; overflow: hidden; box-shadow: 0 4px 6px rgba(0, 0, 0, 0.1); }
+.stats thead tr { background-color: var(--primary-500); }
+.stats th { padding: 10px; text-align: left; color: white; font-weight: 600; font-size: 14px; }
+.stats tbody tr { background-color: var(--background-fill-primary); }
+.stats td { padding: 10px; border-bottom: 1px solid var(--border-color-primary); font-size: 14px; }
+.stats .summary { padding: 16px; background-color: var(--background-fill-secondary); border-radius: 8px; line-height: 1.8; white-space: pre-line; }
+.stats ul { line-height: 1.8; }
+"""
+
+_RECORD_COLUMNS = "<th>Games</th><th>Wins</th><th>Draws</th><th>Losses</th><th>Win rate</th>"
+
+def _record_row(name, record):
+    win_rate = f"{record['win_rate']:.0%}" if record['win_rate'] is not None else "-"
+    return (f"<tr><td>{html.escape(str(name))}</td><td>{record['games']}</td><td>{record['wins']}</td>"
+            f"<td>{record['draws']}</td><td>{record['losses']}</td><td>{win_rate}</td></tr>")
+
+def _record_table(title, first_column, rows):
+    """One HTML table of win/draw/loss records"""
+    body = "".join(_record_row(name, record) for name, record in rows)
+    return (f"<h4>{html.escape(title)}</h4><table><thead><tr><th>{html.escape(first_column)}</th>{_RECORD_COLUMNS}"
+            f"</tr></thead><tbody>{body}</tbody></table>")
+
+def format_stats_as_html(stats, summary=None):
+    """Format player statistics as HTML tables, with an optional AI summary on top"""
+    rating_rows = "".join(
+        f"<li>{html.escape(str(entry['time_control']))}: {entry['first']} &rarr; {entry['last']} ({entry['change']:+d}), "
+        f"range {entry['lowest']}-{entry['highest']}</li>"
+        for entry in stats['rating_history']
+    )
+    return "".join([
+        '<div class="stats">',
+        f'<div class="summary">{html.escape(summary)}</div>' if summary else "",
+        _record_table("Overall", "Player", [(stats['username'], stats['summary'])]),
+        _record_table("By colour", "Colour", [(colour.capitalize(), record) for colour, record in stats['by_color'].items()]),
+        _record_table("By time control", "Time control", [(row['name'], row) for row in stats['by_time_control']]),
+        _record_table("By opening", "Opening", [(row['name'], row) for row in stats['by_opening']]),
+        f"<h4>Rating trend</h4><ul>{rating_rows}</ul>",
+        "</div>"
+    ])
 
 custom_css = """
 .header-row {
@@ -85,154 +119,419 @@ custom_css = """
 }
 """
 
-# Create the Gradio interface with Applio theme
-with gr.Blocks(theme='Hev832/Applio', css=custom_css) as app:
-    # Header with logo and title
-    with gr.Row(elem_classes="header-row"):
-        with gr.Column(scale=1):
-            gr.HTML(f'<img src="{LOGO_BASE64}" style="height: 160px; width: 160px; object-fit: contain;">')
-        with gr.Column(scale=4):
-            gr.Markdown("# Move Analyzer")
-        with gr.Column(scale=1):
-            # center the button 
-            gr.HTML('<a href="https://github.com/vishwanath79/moveanalyzer" target="_blank" style="text-decoration: none;"><button class="gr-button gr-button-primary">About</button></a>')
-    
-    # Search section
-    with gr.Column():
-        gr.Markdown("### Enter your chess.com username to analyze your games", elem_classes=["instruction-text"])
-        with gr.Row():
-            player_name = gr.Textbox(
-                label="Player Name", 
-                placeholder="Enter player name...",
-                scale=2
-            )
-            result = gr.Dropdown(
-                choices=["All", "Today", "Last 7 days", "Last 30 days", "win", "resigned", "timeout", "abandoned"], 
-                label="Filter",
-                value="All",
-                scale=1,
-                container=True,
-                interactive=True
+# CSS for the loading animation
+custom_css = custom_css + """
+.loading {
+    display: inline-block;
+    width: 20px;
+    height: 20px;
+    border: 3px solid rgba(0, 0, 0, 0.1);
+    border-radius: 50%;
+    border-top-color: var(--primary-500);
+    animation: spin 1s ease-in-out infinite;
+}
+@keyframes spin {
+    to { transform: rotate(360deg); }
+}
+""" + RESULTS_CSS + STATS_CSS
+
+def build_game_filter(filter_value: str) -> main.GameFilter:
+    """Translates the dropdown value into a GameFilter"""
+    window_days = DATE_FILTER_DAYS.get(filter_value)
+    if window_days is not None:
+        today = datetime.datetime.now().date()
+        start = datetime.datetime.combine(today - datetime.timedelta(days=window_days), datetime.time.min)
+        return main.GameFilter(start=start)
+    if filter_value != "All":
+        return main.GameFilter(results=[filter_value])
+    return None
+
+def fetch_games(player_name: str, filter_value: str):
+    """Fetch and filter stage: returns only the games matching the filter, oldest first"""
+    analyzer = main.ChessComAnalyzer(player_name)
+    game_filter = build_game_filter(filter_value)
+    if game_filter is None or game_filter.start is None:
+        return analyzer.get_all_games(game_filter)
+    # Date filters may reach back into previous months, so fetch every month in the window
+    return analyzer.get_games_in_range(game_filter.start, datetime.datetime.now(), game_filter)
+
+def _partial_reporter(job, games):
+    """on_partial callback showing streamed analyses as job drafts (None when streaming is off)"""
+    if not STREAM_ANALYSES:
+        return None
+
+    def on_partial(index, text):
+        job.report_draft(index, (games[index], text))
+    return on_partial
+
+def run_sync_job(job, player_name: str):
+    """
+    Background job: analyzes only the games played since the player's last sync
+    Reports the player's stored analyses first, then each new game as it is analyzed;
+    the new games are saved and the sync watermark advanced
+    """
+    analyzer = main.ChessComAnalyzer(player_name)
+    job.report("Checking for new games...")
+    with metrics.timer("stage.fetch"):
+        sync = analyzer.fetch_new_games()
+    if "error" in sync:
+        job.report(f"Error: {sync['error']}")
+        return
+
+    new_games = sync["games"]
+    # Games saved by an earlier search may also be new to the watermark; show them once
+    new_ids = {make_game_id(game_data) for game_data in new_games}
+    stored = [row for row in main.get_game_store().player_games(player_name, SYNC_DISPLAY_LIMIT)
+              if row['end_time'] is not None and row['game_id'] not in new_ids]
+    job.total = len(new_games) + len(stored)
+    for row in stored:
+        job.report(f"Showing {len(stored)} stored games...", (row, row['analysis']))
+
+    analyses = [None] * len(new_games)
+    if new_games:
+        logger.info("Analyzing %d new games", len(new_games))
+        job.report(f"Analyzing {len(new_games)} new games...")
+        analyzed = 0
+        with metrics.timer("stage.analyze"):
+            for index, analysis in AnalysisEngine().iter_analyses(new_games, _partial_reporter(job, new_games)):
+                analyzed += 1
+                analyses[index] = analysis
+                job.report(f"Analyzed {analyzed} of {len(new_games)} new games...", (new_games[index], analysis), slot=index)
+
+    try:
+        with metrics.timer("stage.save"):
+            saved = analyzer.save_synced_games(sync, analyses)
+        logger.info("Saved %d new games", saved)
+    except Exception:
+        logger.exception("Error saving synced games")
+
+    if not new_games:
+        job.report("No new games since the last sync" if stored else "No games found for this player")
+    else:
+        job.report("")
+
+def run_analysis_job(job, player_name: str, filter_value: str):
+    """
+    Background job: runs the fetch, filter and analyze stages
+    Reports each finished game as a (game_data, analysis) result and saves them all to the game store
+    """
+    if filter_value == SYNC_FILTER:
+        return run_sync_job(job, player_name)
+
+    job.report("Fetching games...")
+    with metrics.timer("stage.fetch"):
+        games_data = fetch_games(player_name, filter_value)
+
+    if isinstance(games_data, dict) and "error" in games_data:
+        job.report(f"Error: {games_data['error']}")
+        return
+
+    if not games_data:  # If games_data is empty list
+        if filter_value == "All":
+            job.report("No games found for this player")
+        else:
+            job.report(f"No games found matching the filter: {filter_value}")
+        return
+
+    selected_games = games_data
+    total = len(selected_games)
+    job.total = total
+
+    # Analyze the selected games concurrently and hand each one to the page as soon as it is done
+    logger.info("Analyzing %d games", total)
+    job.report(f"Analyzing {total} games...")
+    analyzed = 0
+    with metrics.timer("stage.analyze"):
+        for index, analysis in AnalysisEngine().iter_analyses(selected_games, _partial_reporter(job, selected_games)):
+            analyzed += 1
+            job.report(f"Analyzed {analyzed} of {total} games...", (selected_games[index], analysis), slot=index)
+
+    if not analyzed:
+        job.report(f"No games found matching the filter: {filter_value}")
+        return
+
+    # Keep the results even if nobody is watching any more; failed analyses are not stored
+    try:
+        with metrics.timer("stage.save"):
+            saved = main.save_game_analyses(
+                (game_data, analysis) for game_data, analysis in job.results if is_cacheable(analysis)
             )
-        # Add loading text and progress indicator
-        with gr.Row():
-            search_btn = gr.Button("Show Results", variant="primary", interactive=True)
-            loading = gr.HTML(visible=False, value='<div style="display: flex; align-items: center; gap: 10px;"><span class="loading"></span><span>Analyzing games...</span></div>')
-
-    # Status and results
-    status = gr.Markdown("")
-    with gr.Row():
-        results = gr.HTML()
-
-    # Add CSS for loading animation
-    custom_css = custom_css + """
-    .loading {
-        display: inline-block;
-        width: 20px;
-        height: 20px;
-        border: 3px solid rgba(0, 0, 0, 0.1);
-        border-radius: 50%;
-        border-top-color: var(--primary-500);
-        animation: spin 1s ease-in-out infinite;
-    }
-    @keyframes spin {
-        to { transform: rotate(360deg); }
-    }
+        logger.info("Saved %d of %d analyzed games", saved, analyzed)
+    except Exception:
+        logger.exception("Error saving analyzed games")
+    job.report("")
+
+def submit_analysis_job(player_name: str, filter_value: str) -> str:
+    """Queues an analysis job; an identical job still in flight is reused. Returns the job id"""
+    return get_job_queue().submit((player_name.lower(), filter_value), run_analysis_job, player_name, filter_value)
+
+def _insert_game(formatted_games, sort_keys, game_data, analysis, draft=False):
     """
+    Inserts one analyzed game into the table rows, keeping them in date-descending order
+    Drafts (analyses still streaming) are marked so their rows are not cached by the renderer
+    """
+    position = bisect.bisect_right(sort_keys, -game_data['end_time'])
+    sort_keys.insert(position, -game_data['end_time'])
+    formatted_games.insert(position, {
+        'date': datetime.datetime.fromtimestamp(game_data['end_time']).strftime('%Y-%m-%d %H:%M:%S'),
+        'white_player': game_data['white_player'],
+        'black_player': game_data['black_player'],
+        'result': game_data['result'],
+        'analysis': failure_message(analysis) if isinstance(analysis, AnalysisError) else analysis,
+        'draft': draft
+    })
+
+def iter_analysis_rows(player_name: str, filter_value: str):
+    """
+    Runs the analysis as a background job and follows its progress
+    Yields (status, rows) after each stage and every finished game, and while analyses
+    stream in, with the text written so far; rows are newest first
+    Closing the page stops following the job, not the job itself
+    """
+    if not player_name:
+        yield "Please enter a player name", []
+        return
+
+    queue = get_job_queue()
+    job_id = submit_analysis_job(player_name, filter_value)
+    job = queue.get(job_id)
+    formatted_games = []
+    # Negated end times of formatted_games, kept ascending so each game is inserted in date-descending order
+    sort_keys = []
+    rows = formatted_games
+    last_render = 0.0
+    for message, result in queue.follow(job_id, drafts=True):
+        if result is DRAFT:
+            # Streamed text arrives a few words at a time: redraw at most every STREAM_RENDER_INTERVAL
+            if time.monotonic() - last_render < STREAM_RENDER_INTERVAL:
+                continue
+            rows, keys = list(formatted_games), list(sort_keys)
+            for game_data, text in job.draft_snapshot().values():
+                _insert_game(rows, keys, game_data, text + " …", draft=True)
+            last_render = time.monotonic()
+        elif result is not None:
+            _insert_game(formatted_games, sort_keys, *result)
+            rows = formatted_games
+            last_render = time.monotonic()
+        yield message, rows
 
-    def analyze_and_format(player_name: str, filter_value: str) -> tuple:
-        """Analyze games and format results"""
-        try:
-            if not player_name:
-                return "Please enter a player name", ""
-            
-            status_msg = "Analyzing games..."
-            
-            analyzer = ChessComAnalyzer(player_name)
-            games_data = analyzer.get_all_games()
-            
-            # Debug print to see what we're getting from the API
-            print("Games data:", games_data)
-            
-            if isinstance(games_data, dict) and "error" in games_data:
-                return f"Error: {games_data['error']}", ""
-            
-            if not games_data:  # If games_data is empty list
-                return "No games found for this player", ""
-            
-            # Get current date for filtering
-            current_date = datetime.datetime.now().date()
-            
-            formatted_games = []
-            for game_data in games_data:
-                try:
-                    game_date = datetime.datetime.fromtimestamp(game_data['end_time']).date()
-                    
-                    # Apply filters
-                    if filter_value == "Today" and game_date != current_date:
-                        continue
-                    elif filter_value == "Last 7 days" and (current_date - game_date).days > 7:
-                        continue
-                    elif filter_value == "Last 30 days" and (current_date - game_date).days > 30:
-                        continue
-                    elif filter_value not in ["All", "Today", "Last 7 days", "Last 30 days"] and game_data['result'] != filter_value:
-                        continue
-                    
-                    # Debug print for analysis
-                    print(f"Analyzing game from {game_date}")
-                    analysis = analyze_with_llm(game_data)
-                    
-                    formatted_game = {
-                        'date': datetime.datetime.fromtimestamp(game_data['end_time']).strftime('%Y-%m-%d %H:%M:%S'),
-                        'white_player': game_data['white_player'],
-                        'black_player': game_data['black_player'],
-                        'result': game_data['result'],
-                        'analysis': analysis
-                    }
-                    formatted_games.append(formatted_game)
-                    formatted_games.sort(key=lambda x: x['date'], reverse=True)
-                    
-                    # sort by date in descending order
-                    formatted_games.sort(key=lambda x: x['date'], reverse=True)
-                except Exception as e:
-                    print(f"Error processing game: {str(e)}")
-                    continue
-            
-            if not formatted_games:
-                return f"No games found matching the filter: {filter_value}", ""
-            
-            # Debug print for results
-            print(f"Found {len(formatted_games)} games")
-            return "", format_results_as_html(formatted_games)
-            
-        except Exception as e:
-            print(f"Error in analyze_and_format: {str(e)}")
-            return f"Error: {str(e)}", ""
+def iter_analysis_updates(player_name: str, filter_value: str):
+    """Like iter_analysis_rows, but yields (status, results_html) showing the first page"""
+    for message, rows in iter_analysis_rows(player_name, filter_value):
+        yield message, format_results_as_html(rows) if rows else ""
+
+def job_status(job_id: str) -> Dict[str, Any]:
+    """Progress of a background analysis job"""
+    return get_job_queue().status(job_id)
+
+def job_results(job_id: str) -> Dict[str, Any]:
+    """
+    Progress of a background analysis job plus the games analyzed so far (all of them once
+    its status is "done"), newest first, each with game_id, date, players, result and analysis
+    A game no provider could answer has analysis None and the reason in error
+    """
+    queue = get_job_queue()
+    status = queue.status(job_id)
+    if "id" not in status:
+        return status
+    games = []
+    for game_data, analysis in queue.results(job_id):
+        failed = isinstance(analysis, AnalysisError)
+        games.append({
+            'game_id': make_game_id(game_data),
+            'date': datetime.datetime.fromtimestamp(game_data['end_time']).strftime('%Y-%m-%d %H:%M:%S'),
+            'end_time': game_data['end_time'],
+            'white_player': game_data['white_player'],
+            'black_player': game_data['black_player'],
+            'result': game_data['result'],
+            'analysis': None if failed else analysis,
+            'error': failure_message(analysis) if failed else None
+        })
+    games.sort(key=lambda game: -game['end_time'])
+    return dict(status, games=games)
+
+def metrics_snapshot() -> Dict[str, Any]:
+    """Stage timers and counters of this process, plus the LLM providers' health"""
+    # Imported here: the provider module is only needed once an analysis has run
+    from providers import get_router
+    return dict(metrics.snapshot(), providers=get_router().health(),
+                render_cache=render_game.cache_info()._asdict())
+
+def analyze_and_format(player_name: str, filter_value: str) -> tuple:
+    """Analyze games and format results"""
+    try:
+        update = ("", "")
+        for update in iter_analysis_updates(player_name, filter_value):
+            pass
+        return update
+
+    except Exception as e:
+        logger.exception("Error in analyze_and_format")
+        return f"Error: {str(e)}", ""
+
+def analyze_with_loading(player_name: str, filter_value: str):
+    """
+    Wrapper function to handle loading state and stream partial results
+    Yields (loading, status, results_html, rows, page); rows are kept for paging through the results
+    """
+    try:
+        # Show loading state
+        yield True, "", "", [], 1  # loading visible, clear status and results
+
+        # Push every finished game, and the analyses still being written, to the page as they arrive
+        status_msg, rows = "", []
+        for status_msg, rows in iter_analysis_rows(player_name, filter_value):
+            yield True, status_msg, show_results_page(rows, 1), rows, 1
+
+        # Hide loading and show results
+        yield False, status_msg, show_results_page(rows, 1), rows, 1
+
+    except Exception as e:
+        # Hide loading and show error
+        yield False, f"Error: {str(e)}", "", [], 1
+
+def show_statistics(player_name: str, period: str, summarize: bool) -> tuple:
+    """Fetches the games of the chosen period and renders the aggregates"""
+    if not player_name:
+        return "Please enter a player name", ""
+    try:
+        end = datetime.datetime.now()
+        start = end - datetime.timedelta(days=STATS_PERIOD_DAYS.get(period, 90))
+        games_data = main.ChessComAnalyzer(player_name).get_games_in_range(start, end)
+        if isinstance(games_data, dict) and "error" in games_data:
+            return f"Error: {games_data['error']}", ""
+        with metrics.timer("stage.statistics"):
+            stats = player_stats(player_name, games_data)
+        if not stats['summary']['games']:
+            return "No games found for this player", ""
+        summary = None
+        if summarize:
+            try:
+                summary = summarize_with_llm(stats)
+            except AnalysisError as e:
+                summary = failure_message(e)
+        return f"Games: {stats['summary']['games']}", format_stats_as_html(stats, summary)
+    except Exception as e:
+        logger.exception("Error in show_statistics")
+        return f"Error: {str(e)}", ""
+
+_app = None
+
+def create_app():
+    """
+    Builds the Gradio app
+    Gradio is only imported here, so importing this module (e.g. from tests) stays cheap
+    """
+    import gradio as gr
+
+    # Create the Gradio interface with Applio theme
+    with gr.Blocks(theme='Hev832/Applio', css=custom_css) as app:
+        # Header with logo and title
+        with gr.Row(elem_classes="header-row"):
+            with gr.Column(scale=1):
+                gr.HTML(f'<img src="{get_chess_logo()}" style="height: 160px; width: 160px; object-fit: contain;">')
+            with gr.Column(scale=4):
+                gr.Markdown("# Move Analyzer")
+            with gr.Column(scale=1):
+                # center the button 
+                gr.HTML('<a href="https://github.com/vishwanath79/moveanalyzer" target="_blank" style="text-decoration: none;"><button class="gr-button gr-button-primary">About</button></a>')
     
-    def analyze_with_loading(player_name: str, filter_value: str):
-        """Wrapper function to handle loading state"""
-        try:
-            # Show loading state
-            yield True, "", ""  # loading visible, clear status and results
-            
-            # Get analysis results
-            status_msg, results_html = analyze_and_format(player_name, filter_value)
-            
-            # Hide loading and show results
-            yield False, status_msg, results_html
-            
-        except Exception as e:
-            # Hide loading and show error
-            yield False, f"Error: {str(e)}", ""
-
-    # Update event handlers
-    search_btn.click(
-        fn=analyze_with_loading,
-        inputs=[player_name, result],
-        outputs=[loading, status, results],
-        api_name="analyze"
-    )
+        with gr.Tab("Game Analysis"):
+            # Search section
+            with gr.Column():
+                gr.Markdown("### Enter your chess.com username to analyze your games", elem_classes=["instruction-text"])
+                with gr.Row():
+                    player_name = gr.Textbox(
+                        label="Player Name", 
+                        placeholder="Enter player name...",
+                        scale=2
+                    )
+                    result = gr.Dropdown(
+                        choices=["All", SYNC_FILTER, "Today", "Last 7 days", "Last 30 days", "win", "resigned", "timeout", "abandoned"], 
+                        label="Filter",
+                        value="All",
+                        scale=1,
+                        container=True,
+                        interactive=True
+                    )
+                # Add loading text and progress indicator
+                with gr.Row():
+                    search_btn = gr.Button("Show Results", variant="primary", interactive=True)
+                    loading = gr.HTML(visible=False, value='<div style="display: flex; align-items: center; gap: 10px;"><span class="loading"></span><span>Analyzing games...</span></div>')
+
+            # Status and results
+            status = gr.Markdown("")
+            with gr.Row():
+                results = gr.HTML()
+            # Rows of the last search, paged on the server so only one page is sent at a time
+            results_rows = gr.State([])
+            results_page = gr.Number(label="Page", value=1, precision=0, minimum=1)
+
+        with gr.Tab("Statistics"):
+            gr.Markdown("### Win rates, rating trends and openings, computed without the LLM", elem_classes=["instruction-text"])
+            with gr.Row():
+                stats_player_name = gr.Textbox(
+                    label="Player Name",
+                    placeholder="Enter player name...",
+                    scale=2
+                )
+                stats_period = gr.Dropdown(
+                    choices=list(STATS_PERIOD_DAYS),
+                    label="Period",
+                    value="Last 90 days",
+                    scale=1,
+                    interactive=True
+                )
+                stats_summarize = gr.Checkbox(label="Summarize with AI", value=False, scale=1)
+            stats_btn = gr.Button("Show Statistics", variant="primary")
+            stats_status = gr.Markdown("")
+            stats_results = gr.HTML()
+
+        # Update event handlers
+        stats_btn.click(
+            fn=show_statistics,
+            inputs=[stats_player_name, stats_period, stats_summarize],
+            outputs=[stats_status, stats_results],
+            api_name="statistics"
+        )
+
+        # API-only endpoints: submit an analysis as a background job, poll it by id and fetch its
+        # analyses; read metrics
+        with gr.Row(visible=False):
+            job_id_box = gr.Textbox()
+            job_info = gr.JSON()
+            job_results_info = gr.JSON()
+            submit_job_btn = gr.Button()
+            job_status_btn = gr.Button()
+            job_results_btn = gr.Button()
+            metrics_info = gr.JSON()
+            metrics_btn = gr.Button()
+        submit_job_btn.click(fn=submit_analysis_job, inputs=[player_name, result], outputs=job_id_box, api_name="submit_job")
+        job_status_btn.click(fn=job_status, inputs=job_id_box, outputs=job_info, api_name="job_status")
+        job_results_btn.click(fn=job_results, inputs=job_id_box, outputs=job_results_info, api_name="job_results")
+        metrics_btn.click(fn=metrics_snapshot, inputs=None, outputs=metrics_info, api_name="metrics")
+
+        search_btn.click(
+            fn=analyze_with_loading,
+            inputs=[player_name, result],
+            outputs=[loading, status, results, results_rows, results_page],
+            api_name="analyze"
+        )
+        results_page.input(fn=show_results_page, inputs=[results_rows, results_page], outputs=results)
+
+    return app
+
+def __getattr__(name):
+    # interface.app is built on first access
+    global _app
+    if name == "app":
+        if _app is None:
+            _app = create_app()
+        return _app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 if __name__ == "__main__":
+    metrics.setup_logging()
+    metrics.start_metrics_log()
     port = int(os.getenv("PORT", 8080))
-    app.launch(server_name="0.0.0.0", server_port=port, share=True) 
\ No newline at end of file
+    create_app().launch(server_name="0.0.0.0", server_port=port, share=True) 
\ No newline at end of file
@@ -0,0 +1,211 @@
+import os
+import time
+import uuid
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Iterator, Optional, Tuple, Callable, Hashable
+
+logger = logging.getLogger(__name__)
+
+# Jobs run at the same time; later submissions wait in the queue
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", 2))
+# Seconds a finished job's progress and results stay available
+JOB_RETENTION = int(os.getenv("JOB_RETENTION", 3600))
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+# Yielded by Job.follow(drafts=True) in place of a result when the drafts changed
+DRAFT = object()
+# Event index of a draft change
+_DRAFT_EVENT = -1
+
+
+class Job:
+    """
+    One background run of a job function
+    Progress is an append-only list of (message, result index) events, so any number of
+    followers can replay it from the start and then wait for more
+    Drafts are partial results still being produced (e.g. a streaming analysis), by slot; they are
+    live state rather than events, so followers read the latest ones from job.drafts
+    """
+
+    def __init__(self, key: Hashable):
+        self.id = uuid.uuid4().hex[:12]
+        self.key = key
+        self.status = QUEUED
+        self.total: Optional[int] = None
+        self.results: List[Any] = []
+        self.events: List[Tuple[str, Optional[int]]] = []
+        self.drafts: Dict[Hashable, Any] = {}
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.finished_at: Optional[float] = None
+        self._changed = threading.Condition()
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (DONE, FAILED)
+
+    def report(self, message: str, result: Any = None, slot: Hashable = None) -> None:
+        """
+        Records a progress message, optionally with one more result
+        The draft in slot, if any, is replaced by the result in the same step
+        """
+        with self._changed:
+            index = None
+            if result is not None:
+                self.results.append(result)
+                index = len(self.results) - 1
+            if slot is not None:
+                self.drafts.pop(slot, None)
+            self.events.append((message, index))
+            self._changed.notify_all()
+
+    def report_draft(self, slot: Hashable, draft: Any) -> None:
+        """Sets the partial result in a slot; the status message stays the same"""
+        with self._changed:
+            self.drafts[slot] = draft
+            self.events.append((self.events[-1][0] if self.events else "", _DRAFT_EVENT))
+            self._changed.notify_all()
+
+    def draft_snapshot(self) -> Dict[Hashable, Any]:
+        with self._changed:
+            return dict(self.drafts)
+
+    def _finish(self, status: str, error: str = None) -> None:
+        with self._changed:
+            self.status = status
+            self.error = error
+            self.finished_at = time.time()
+            self._changed.notify_all()
+
+    def follow(self, timeout: Optional[float] = None, drafts: bool = False) -> Iterator[Tuple[str, Any]]:
+        """
+        Yields (message, result or None) for every event, from the first one until the job finishes
+        With drafts, a change of the drafts is yielded as (message, DRAFT); otherwise it is skipped
+        Stops early when no new event arrives within timeout seconds
+        """
+        position = 0
+        while True:
+            with self._changed:
+                if position >= len(self.events) and not self.finished:
+                    self._changed.wait(timeout)
+                pending = self.events[position:]
+                finished = self.finished
+            if not pending and not finished:
+                return
+            for message, index in pending:
+                if index == _DRAFT_EVENT:
+                    if drafts:
+                        yield message, DRAFT
+                elif index is not None:
+                    yield message, self.results[index]
+                else:
+                    yield message, None
+            position += len(pending)
+            if finished and position >= len(self.events):
+                return
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Progress summary, safe to send to API clients"""
+        with self._changed:
+            return {
+                "id": self.id,
+                "status": self.status,
+                "message": self.events[-1][0] if self.events else "",
+                "total": self.total,
+                "completed": len(self.results),
+                "error": self.error,
+                "created_at": self.created_at,
+                "finished_at": self.finished_at
+            }
+
+
+class JobQueue:
+    """
+    Bounded in-process queue of background jobs
+    Submitting a job identical to one still queued or running returns the existing job id
+    """
+
+    def __init__(self, max_workers: int = JOB_WORKERS, retention: int = JOB_RETENTION):
+        self.retention = retention
+        self._executor = ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="analysis-job")
+        self._jobs: Dict[str, Job] = {}
+        self._active: Dict[Hashable, str] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, key: Hashable, fn: Callable[..., None], *args) -> str:
+        """
+        Queues fn(job, *args) unless a job with the same key is still in flight
+        fn reports progress and results through job.report
+        Returns the job id
+        """
+        with self._lock:
+            self._prune()
+            job_id = self._active.get(key)
+            if job_id is not None:
+                return job_id
+            job = Job(key)
+            self._jobs[job.id] = job
+            self._active[key] = job.id
+        job.report("Queued...")
+        self._executor.submit(self._run, job, fn, args)
+        return job.id
+
+    def _run(self, job: Job, fn: Callable[..., None], args: tuple) -> None:
+        job.status = RUNNING
+        try:
+            fn(job, *args)
+            status, error = DONE, None
+        except Exception as e:
+            logger.exception("Job %s failed", job.id)
+            job.report(f"Error: {str(e)}")
+            status, error = FAILED, str(e)
+        with self._lock:
+            if self._active.get(job.key) == job.id:
+                del self._active[job.key]
+        job._finish(status, error)
+
+    def _prune(self) -> None:
+        """Forgets finished jobs older than the retention period; caller holds the lock"""
+        cutoff = time.time() - self.retention
+        for job_id in [job_id for job_id, job in self._jobs.items()
+                       if job.finished and job.finished_at < cutoff]:
+            del self._jobs[job_id]
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def status(self, job_id: str) -> Dict[str, Any]:
+        """Progress of a job, or an error dictionary for unknown ids"""
+        job = self.get(job_id)
+        if job is None:
+            return {"error": f"Job '{job_id}' not found"}
+        return job.snapshot()
+
+    def results(self, job_id: str) -> List[Any]:
+        """Results reported so far (all of them once the job is done)"""
+        job = self.get(job_id)
+        return list(job.results) if job is not None else []
+
+    def follow(self, job_id: str, timeout: Optional[float] = None, drafts: bool = False) -> Iterator[Tuple[str, Any]]:
+        """Replays a job's progress and then streams it live; see Job.follow"""
+        job = self.get(job_id)
+        if job is None:
+            return iter(())
+        return job.follow(timeout, drafts)
+
+
+_default_queue: Optional[JobQueue] = None
+_default_queue_lock = threading.Lock()
+
+
+def get_job_queue() -> JobQueue:
+    """Returns the process-wide job queue"""
+    global _default_queue
+    if _default_queue is None:
+        with _default_queue_lock:
+            if _default_queue is None:
+                _default_queue = JobQueue()
+    return _default_queue
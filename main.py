@@ -1,14 +1,108 @@
 import requests
 import datetime
-from typing import Dict, Any, List
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Any, List, Iterator, Iterable, Optional, Tuple
 import json
-from ai_model import analyze_chess_game
+import os
+import logging
+import http_client
+import metrics
+import openings
+from pgn_parser import ParsedGame, iter_parsed
+from archive_store import ArchiveStore, get_archive_store, parse_archive_url
+from game_store import GameStore, build_row, get_game_store
+
+logger = logging.getLogger(__name__)
+
+# Small pool for side requests (e.g. player info) that run alongside game fetching
+_prefetch_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="chesscom-prefetch")
+# Upper bound on monthly archives downloaded at the same time for a date range
+ARCHIVE_FETCH_WORKERS = int(os.getenv("ARCHIVE_FETCH_WORKERS", 4))
+# Chess.com public API root (point it at a local fake server for offline benchmarks)
+CHESSCOM_API_URL = os.getenv("CHESSCOM_API_URL", "https://api.chess.com/pub").rstrip("/")
+
+
+def archive_urls_in_range(archive_urls: List[str], start: datetime.datetime, end: datetime.datetime) -> List[str]:
+    """
+    Picks the monthly archive URLs whose (UTC) month overlaps the start..end window
+    Keeps the chronological order of archive_urls
+    """
+    utc = datetime.timezone.utc
+    first = datetime.datetime.fromtimestamp(start.timestamp(), tz=utc)
+    last = datetime.datetime.fromtimestamp(end.timestamp(), tz=utc)
+    wanted = (first.year, first.month)
+    until = (last.year, last.month)
+
+    selected = []
+    for url in archive_urls:
+        parts = url.rstrip('/').split('/')
+        try:
+            month = (int(parts[-2]), int(parts[-1]))
+        except (ValueError, IndexError):
+            continue
+        if wanted <= month <= until:
+            selected.append(url)
+    return selected
+
+def get_game_result(game: Dict) -> str:
+    """Determines the result of a raw archive game"""
+    if 'white' in game and game['white']['result'] == 'win':
+        return 'win'
+    elif 'black' in game and game['black']['result'] == 'win':
+        return 'win'
+    elif game.get('rules') == 'chess':
+        if game.get('pgn', '').endswith('1/2-1/2'):
+            return 'draw'
+        else:
+            return game.get('white', {}).get('result', 'unknown')
+    return 'unknown'
+
+
+class GameFilter:
+    """
+    Date-range, result, time-control and opening predicates checked against raw archive games
+    Applied while walking an archive, before a game data dictionary is built
+    """
+
+    def __init__(self, start: Optional[datetime.datetime] = None, end: Optional[datetime.datetime] = None,
+                 results: Optional[Iterable[str]] = None, time_controls: Optional[Iterable[str]] = None,
+                 ecos: Optional[Iterable[str]] = None):
+        self.start = start
+        self.end = end
+        self.start_ts = start.timestamp() if start else None
+        self.end_ts = end.timestamp() if end else None
+        self.results = set(results) if results else None
+        # Matches either the exact time control ("180+2") or the time class ("blitz")
+        self.time_controls = set(time_controls) if time_controls else None
+        # ECO codes or prefixes ("C5" matches C50-C59)
+        self.ecos = tuple(ecos) if ecos else None
+
+    def matches(self, game: Dict[Any, Any]) -> bool:
+        """Checks a raw archive game against every predicate, cheapest first"""
+        end_time = game.get('end_time', 0)
+        if self.start_ts is not None and end_time < self.start_ts:
+            return False
+        if self.end_ts is not None and end_time > self.end_ts:
+            return False
+        if self.time_controls is not None and game.get('time_control') not in self.time_controls \
+                and game.get('time_class') not in self.time_controls:
+            return False
+        if self.results is not None and get_game_result(game) not in self.results:
+            return False
+        if self.ecos is not None:
+            opening = openings.classify_pgn(game.get('pgn', ''))
+            if opening is None or not opening['eco'].startswith(self.ecos):
+                return False
+        return True
+
 
 class ChessComAnalyzer:
-    def __init__(self, username: str):
+    def __init__(self, username: str, archive_store: ArchiveStore = None):
         # Base URL for Chess.com API
-        self.base_url = "https://api.chess.com/pub"  # Removed trailing slash
+        self.base_url = CHESSCOM_API_URL
         self.username = username
+        # Local copy of downloaded archives, shared by all analyzers by default
+        self.archive_store = archive_store or get_archive_store()
         # Add headers for API requests
         self.headers = {
             'User-Agent': 'Chess Game Analyzer v1.0 (Contact: your@email.com)'
@@ -23,123 +117,252 @@ class ChessComAnalyzer:
         player_url = f"{self.base_url}/player/{self.username}"
         
         try:
-            # Make the API request with headers
-            response = requests.get(player_url, headers=self.headers)
-            print(player_url)
-            response.raise_for_status()
-            
-            # Get the player data
-            player_data = response.json()
+            # Make the API request through the shared session
+            player_data = http_client.get_json(player_url, headers=self.headers)
+            logger.debug("Fetched %s", player_url)
             return player_data
             
         except requests.exceptions.RequestException as e:
             return {"error": f"Failed to fetch player info: {str(e)}"}
 
+    def prefetch_player_info(self) -> Future:
+        """
+        Starts fetching the player information in the background
+        Only worth calling when the result is actually displayed; game fetching does not need it
+        """
+        return _prefetch_executor.submit(self.get_player_info)
+
+    def _get_archive_urls(self) -> List[str]:
+        """
+        Fetches the list of monthly archive URLs for the player
+        Raises requests.exceptions.HTTPError (status 404) for unknown players
+        """
+        archives_url = f"{self.base_url}/player/{self.username}/games/archives"
+        archives_data = self.archive_store.fetch_json(archives_url, headers=self.headers)
+        return archives_data.get("archives", [])
+
+    def _fetch_error(self, e: requests.exceptions.RequestException) -> Dict[str, str]:
+        """Turns a failed request into the error dictionary returned to callers"""
+        response = getattr(e, "response", None)
+        if response is not None and response.status_code == 404:
+            return {"error": f"Player '{self.username}' not found"}
+        return {"error": f"Failed to fetch games: {str(e)}"}
+
     def get_player_games(self) -> Dict[Any, Any]:
         """
         Fetches the player's games from Chess.com
         Returns the games data as a dictionary
         """
-        # Get player info first to get the games archive URL
-        player_info = self.get_player_info()
-        
-        if "error" in player_info:
-            return player_info
-            
-        # Construct the API endpoint for games archives
-        archives_url = f"{self.base_url}/player/{self.username}/games/archives"
-        
         try:
-            # Get the archives list with headers
-            archives_response = requests.get(archives_url, headers=self.headers)
-            archives_response.raise_for_status()
-            archives_data = archives_response.json()
-            
+            # Go straight to the archives list; a 404 there means the player does not exist
+            archive_urls = self._get_archive_urls()
             
             # Get the most recent archive URL
-            if archives_data["archives"]:
-                latest_games_url = archives_data["archives"][-1]
+            if archive_urls:
+                latest_games_url = archive_urls[-1]
                 
-                # Fetch the games from the latest archive with headers
-                games_response = requests.get(latest_games_url, headers=self.headers)
-                games_response.raise_for_status()
-                games_data = games_response.json()
+                # Fetch the games from the latest archive
+                games_data = self.archive_store.fetch_json(latest_games_url, headers=self.headers)
                 
                 # Get the last game
                 if games_data["games"]:
                     last_game = games_data["games"][-1]
-                    #print(last_game)
                     return self._format_game_for_llm(last_game)
             
             return {"error": "No games found"}
             
         except requests.exceptions.RequestException as e:
-            return {"error": f"Failed to fetch games: {str(e)}"}
+            return self._fetch_error(e)
 
-    def get_all_games(self) -> List[Dict[Any, Any]]:
+    def iter_games(self, game_filter: GameFilter = None) -> Iterator[Dict[Any, Any]]:
         """
-        Fetches all games from the current month for a player
-        Returns a list of game data dictionaries
+        Yields the current month's games that match game_filter
+        A game data dictionary is only built for games that pass the filter
+        Raises requests.exceptions.RequestException on failure
         """
-        # Get player info first to get the games archive URL
-        player_info = self.get_player_info()
+        # Go straight to the archives list; a 404 there means the player does not exist
+        archive_urls = self._get_archive_urls()
         
-        if "error" in player_info:
-            return []
-            
-        # Construct the API endpoint for games archives
-        archives_url = f"{self.base_url}/player/{self.username}/games/archives"
+        # Get the most recent archive URL (last month's games)
+        if not archive_urls:
+            return
+        games_data = self.archive_store.fetch_json(archive_urls[-1], headers=self.headers)
         
+        for game in games_data.get("games", []):
+            if game_filter is None or game_filter.matches(game):
+                yield self._build_game_data(game)
+
+    def get_all_games(self, game_filter: GameFilter = None) -> List[Dict[Any, Any]]:
+        """
+        Fetches all games from the current month for a player
+        Only games matching game_filter are returned when one is given
+        Returns a list of game data dictionaries
+        """
         try:
-            # Get the archives list
-            archives_response = requests.get(archives_url, headers=self.headers)
-            archives_response.raise_for_status()
-            archives_data = archives_response.json()
-            
-            all_games = []
-            # Get the most recent archive URL (last month's games)
-            if archives_data["archives"]:
-                latest_games_url = archives_data["archives"][-1]
-                
-                # Fetch the games from the latest archive
-                games_response = requests.get(latest_games_url, headers=self.headers)
-                games_response.raise_for_status()
-                games_data = games_response.json()
-                
-                # Process each game
-                for game in games_data.get("games", []):
-                    game_data = {
-                        'game_id': game['url'].split('/')[-1],
-                        'end_time': game['end_time'],
-                        'white_player': game['white']['username'],
-                        'white_rating': game['white']['rating'],
-                        'black_player': game['black']['username'],
-                        'black_rating': game['black']['rating'],
-                        'result': self._get_result(game),
-                        'time_control': game['time_control'],
-                        'pgn': game['pgn']
-                    }
-                    all_games.append(game_data)
-                
-                return all_games
-            
-            return []
-            
+            return list(self.iter_games(game_filter))
+        except requests.exceptions.RequestException as e:
+            return self._fetch_error(e)
+
+    def _iter_raw_games_in_range(self, start: datetime.datetime, end: datetime.datetime,
+                                 game_filter: GameFilter = None) -> Iterator[Dict[Any, Any]]:
+        """
+        Yields the raw archive games that ended between start and end, in end_time order
+        Every monthly archive overlapping the window is downloaded concurrently; games
+        are streamed as soon as the archives before them have arrived
+        Raises requests.exceptions.RequestException on failure
+        """
+        start_ts, end_ts = start.timestamp(), end.timestamp()
+        month_urls = archive_urls_in_range(self._get_archive_urls(), start, end)
+        if not month_urls:
+            return
+
+        workers = max(1, min(ARCHIVE_FETCH_WORKERS, len(month_urls)))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="chesscom-archive") as executor:
+            futures = [
+                executor.submit(self.archive_store.fetch_json, url, self.headers)
+                for url in month_urls
+            ]
+            try:
+                # Archives are keyed by the month a game ended in, so months never overlap
+                # and walking them in order keeps the stream sorted by end_time
+                for future in futures:
+                    # Filter first so only the matching games are sorted and converted
+                    matching = [
+                        game for game in future.result().get("games", [])
+                        if start_ts <= game.get('end_time', 0) <= end_ts
+                        and (game_filter is None or game_filter.matches(game))
+                    ]
+                    matching.sort(key=lambda g: g.get('end_time', 0))
+                    yield from matching
+            finally:
+                for future in futures:
+                    future.cancel()
+
+    def iter_games_in_range(self, start: datetime.datetime, end: datetime.datetime,
+                            game_filter: GameFilter = None) -> Iterator[Dict[Any, Any]]:
+        """
+        Yields the player's games that ended between start and end, in end_time order
+        Raises requests.exceptions.RequestException on failure
+        """
+        for game in self._iter_raw_games_in_range(start, end, game_filter):
+            yield self._build_game_data(game)
+
+    def iter_parsed_games(self, start: datetime.datetime, end: datetime.datetime,
+                          game_filter: GameFilter = None) -> Iterator[ParsedGame]:
+        """
+        Yields the player's games between start and end as compact ParsedGames, in end_time order
+        Meant for bulk statistics over many months; no game data dictionaries are built
+        Raises requests.exceptions.RequestException on failure
+        """
+        return iter_parsed(self._iter_raw_games_in_range(start, end, game_filter))
+
+    def get_games_in_range(self, start: datetime.datetime, end: datetime.datetime,
+                           game_filter: GameFilter = None) -> List[Dict[Any, Any]]:
+        """
+        Fetches all games that ended between start and end, across as many months as needed
+        Only games matching game_filter are returned when one is given
+        Returns a list of game data dictionaries sorted by end_time
+        """
+        try:
+            return list(self.iter_games_in_range(start, end, game_filter))
+        except requests.exceptions.RequestException as e:
+            return self._fetch_error(e)
+
+    def _archive_unchanged(self, url: str, watermark: Dict[str, Any]) -> bool:
+        """
+        True when url is the watermark's archive and the stored copy is still fresh and carries the
+        ETag recorded at the last sync, so nothing was added to it (checked without decoding the body)
+        """
+        if not watermark.get('etag') or parse_archive_url(url) != parse_archive_url(watermark.get('archive_url') or ''):
+            return False
+        meta = self.archive_store.get_meta(url)
+        return meta is not None and meta['etag'] == watermark['etag'] and self.archive_store.is_fresh(meta)
+
+    def fetch_new_games(self, game_store: GameStore = None) -> Dict[str, Any]:
+        """
+        Fetches the games that ended after the player's sync watermark
+        Only the monthly archives from the watermark's month on are read; before the first sync
+        that is the current month, like get_all_games
+        Returns {"games": game data dictionaries in end_time order, "archive_url": newest archive read,
+        "etag": its ETag}, or an error dictionary. Pass it to save_synced_games once analyzed
+        """
+        store = game_store or get_game_store()
+        watermark = store.get_watermark(self.username)
+        since = watermark['last_end_time'] if watermark else 0
+        try:
+            archive_urls = self._get_archive_urls()
+            if watermark is None:
+                month_urls = archive_urls[-1:]
+            else:
+                month_urls = archive_urls_in_range(
+                    archive_urls, datetime.datetime.fromtimestamp(since), datetime.datetime.now()
+                )
+            games, archive_url, etag = [], None, None
+            for url in month_urls:
+                archive_url = url
+                if watermark is not None and self._archive_unchanged(url, watermark):
+                    etag = watermark['etag']
+                    continue
+                data = self.archive_store.fetch_json(url, headers=self.headers)
+                meta = self.archive_store.get_meta(url)
+                etag = meta['etag'] if meta else None
+                new_games = sorted((game for game in data.get("games", []) if game.get('end_time', 0) > since),
+                                   key=lambda g: g.get('end_time', 0))
+                games.extend(self._build_game_data(game) for game in new_games)
+            return {"games": games, "archive_url": archive_url, "etag": etag}
         except requests.exceptions.RequestException as e:
-            return {"error": f"Failed to fetch games: {str(e)}"}
+            return self._fetch_error(e)
+
+    def save_synced_games(self, sync: Dict[str, Any], analyses: List[Any],
+                          game_store: GameStore = None) -> int:
+        """
+        Saves the analyzed games of a fetch_new_games result and advances the player's sync watermark
+        analyses[i] is the analysis of sync["games"][i], its AnalysisError when no provider could answer,
+        or None for games that could not be analyzed at all
+        The watermark stops before the first game whose analysis failed (e.g. the LLM was busy),
+        so that game is fetched again next sync; the archive ETag is only kept once everything is stored
+        Returns the number of games saved
+        """
+        from analysis_cache import is_cacheable
+        store = game_store or get_game_store()
+        games = sync["games"]
+        store.save_games(
+            build_row(game_data, analysis) for game_data, analysis in zip(games, analyses) if is_cacheable(analysis)
+        )
+        watermark = store.get_watermark(self.username)
+        last_end_time = watermark['last_end_time'] if watermark else None
+        complete = True
+        for game_data, analysis in zip(games, analyses):
+            if analysis is not None and not is_cacheable(analysis):
+                complete = False
+                break
+            last_end_time = game_data['end_time']
+        if last_end_time is not None:
+            complete = complete and len(analyses) >= len(games)
+            store.set_watermark(self.username, last_end_time, sync.get("archive_url"),
+                                sync.get("etag") if complete else None)
+        return sum(1 for analysis in analyses if is_cacheable(analysis))
+
+    def _build_game_data(self, game: Dict[Any, Any]) -> Dict[Any, Any]:
+        """Converts a raw archive game into the game data dictionary used across the app"""
+        opening = openings.classify_pgn(game['pgn']) or {}
+        return {
+            'game_id': game['url'].split('/')[-1],
+            'end_time': game['end_time'],
+            'white_player': game['white']['username'],
+            'white_rating': game['white']['rating'],
+            'black_player': game['black']['username'],
+            'black_rating': game['black']['rating'],
+            'result': self._get_result(game),
+            'time_control': game['time_control'],
+            'eco': opening.get('eco'),
+            'opening': opening.get('name'),
+            'pgn': game['pgn']
+        }
 
     def _get_result(self, game: Dict) -> str:
         """Helper method to determine game result"""
-        if 'white' in game and game['white']['result'] == 'win':
-            return 'win'
-        elif 'black' in game and game['black']['result'] == 'win':
-            return 'win'
-        elif game.get('rules') == 'chess':
-            if game.get('pgn', '').endswith('1/2-1/2'):
-                return 'draw'
-            else:
-                return game.get('white', {}).get('result', 'unknown')
-        return 'unknown'
+        return get_game_result(game)
 
     def _format_game_for_llm(self, game: Dict[Any, Any]) -> Dict[Any, Any]:
         """
@@ -147,6 +370,7 @@ class ChessComAnalyzer:
         Handles missing fields gracefully
         """
         try:
+            opening = openings.classify_pgn(game.get("pgn", "")) or {}
             formatted_game = {
                 "white_player": game.get("white", {}).get("username", "Unknown"),
                 "black_player": game.get("black", {}).get("username", "Unknown"),
@@ -156,103 +380,83 @@ class ChessComAnalyzer:
                 "time_control": game.get("time_control", "Unknown"),
                 "end_time": game.get("end_time", "Unknown"),
                 "white_rating": game.get("white", {}).get("rating", "Unknown"),
-                "black_rating": game.get("black", {}).get("rating", "Unknown")
+                "black_rating": game.get("black", {}).get("rating", "Unknown"),
+                "eco": opening.get("eco"),
+                "opening": opening.get("name")
             }
-            
-            # Debug print to see the raw game data
-            print("Raw game data:", json.dumps(game, indent=2))
-            
             return formatted_game
             
         except Exception as e:
-            print(f"Error formatting game data: {str(e)}")
+            logger.warning("Error formatting game data: %s", e)
             return {
                 "error": "Failed to format game data",
                 "raw_game": game
             }
 
-def analyze_with_llm(game_data: Dict[Any, Any]) -> str:
+def analyze_with_llm(game_data: Dict[Any, Any], model: str = None) -> str:
     """
-    Sends the game data to the AI model for analysis
+    Sends the game data to the AI model for analysis (the default model when none is given)
+    Previously analyzed games are answered from the analysis cache
+    Raises providers.AnalysisError when no provider could answer
     """
-    return analyze_chess_game(game_data)
+    # Imported on first use so fetching games does not pay for the LLM stack
+    import ai_model
+    from analysis_cache import cache_key, get_analysis_cache
+    model = model or ai_model.model
+    cache = get_analysis_cache()
+    key = cache_key(game_data['pgn'], model)
+    analysis = cache.get(key)
+    if analysis is None:
+        analysis = ai_model.analyze_chess_game(game_data, model)
+        cache.put(key, analysis)
+    return analysis
 
 def save_game_analysis(game_data: Dict[Any, Any], analysis: str) -> None:
     """
-    Saves the game analysis to chessdb.csv in a structured format
-    Checks for duplicates before saving
+    Saves the game analysis to the game store
+    Re-saving a game updates its row instead of adding a duplicate
     """
-    import csv
-    
-    # Create a unique identifier for the game
-    game_id = f"{game_data['end_time']}_{game_data['white_player']}_{game_data['black_player']}"
-    
-    # Format timestamp
-    game_date = datetime.datetime.fromtimestamp(game_data['end_time']).strftime('%Y-%m-%d %H:%M:%S')
-    
-    # Prepare the row data
-    row_data = {
-        'game_id': game_id,
-        'date': game_date,
-        'white_player': game_data['white_player'],
-        'white_rating': game_data['white_rating'],
-        'black_player': game_data['black_player'],
-        'black_rating': game_data['black_rating'],
-        'result': game_data['result'],
-        'time_control': game_data['time_control'],
-        'analysis': analysis.replace('\n', ' '),  # Remove newlines for CSV format
-        'pgn': game_data['pgn'].replace('\n', ' ')  # Remove newlines for CSV format
-    }
-    
-    # Define the CSV fields
-    fields = ['game_id', 'date', 'white_player', 'white_rating', 'black_player', 
-              'black_rating', 'result', 'time_control', 'analysis', 'pgn']
-    
-    # Check if file exists and if game is already in database
-    try:
-        existing_games = set()
-        with open('chessdb.csv', 'r', newline='', encoding='utf-8') as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                existing_games.add(row['game_id'])
-                
-        if game_id in existing_games:
-            print("Game already exists in database")
-            return
-            
-    except FileNotFoundError:
-        # Create new file with headers if it doesn't exist
-        with open('chessdb.csv', 'w', newline='', encoding='utf-8') as f:
-            writer = csv.DictWriter(f, fieldnames=fields)
-            writer.writeheader()
-    
-    # Append the new game analysis
-    with open('chessdb.csv', 'a', newline='', encoding='utf-8') as f:
-        writer = csv.DictWriter(f, fieldnames=fields)
-        writer.writerow(row_data)
-    
-    print("Game analysis saved to chessdb.csv")
+    store = get_game_store()
+    store.save_game(build_row(game_data, analysis))
+    logger.info("Game analysis saved to %s", store.path)
+
+def save_game_analyses(analyzed_games: List[Tuple[Dict[Any, Any], str]]) -> int:
+    """
+    Saves many (game_data, analysis) pairs to the game store in batched upserts
+    Returns the number of games written
+    """
+    return get_game_store().save_games(build_row(game_data, analysis) for game_data, analysis in analyzed_games)
 
 def main():
+    metrics.setup_logging()
     # Using your username
     username = "ingvay7"
     
     # Initialize the analyzer
     analyzer = ChessComAnalyzer(username)
     
-    # Get player info first
-    player_info = analyzer.get_player_info()
-    print("Player Info:", json.dumps(player_info, indent=2))
+    # Player info is only printed, so fetch it alongside the games instead of before them
+    player_info_future = analyzer.prefetch_player_info()
     
     # Get the last game
     game_data = analyzer.get_player_games()
+    print("Player Info:", json.dumps(player_info_future.result(), indent=2))
     
     if "error" in game_data:
         print(f"Error: {game_data['error']}")
         return
 
+    # Estimated prompt size at each detail level (PROMPT_DETAIL picks the one sent)
+    import ai_model
+    print("Prompt tokens:", ai_model.estimate_game_tokens(game_data))
+
     # Get the analysis
-    analysis = analyze_with_llm(game_data)
+    from providers import AnalysisError
+    try:
+        analysis = analyze_with_llm(game_data)
+    except AnalysisError as e:
+        print(f"Error: {str(e)}")
+        return
     print("\nGame Analysis:")
     print(analysis)
     
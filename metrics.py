@@ -0,0 +1,169 @@
+import os
+import json
+import time
+import logging
+import threading
+import functools
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, Any, Optional, Deque
+
+# Log level of the app's own loggers (DEBUG shows per-request details)
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+# File a JSON line of every metric is appended to, every METRICS_LOG_INTERVAL seconds (empty disables)
+METRICS_LOG_PATH = os.getenv("METRICS_LOG_PATH", "")
+METRICS_LOG_INTERVAL = float(os.getenv("METRICS_LOG_INTERVAL", 60))
+# Recent samples kept per timer for percentiles
+TIMER_SAMPLES = 512
+
+logger = logging.getLogger(__name__)
+
+
+class Timer:
+    """Count, total, max and recent samples (for p50/p95) of one timed stage, in seconds"""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.samples: Deque[float] = deque(maxlen=TIMER_SAMPLES)
+
+    def add(self, seconds: float) -> None:
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        self.samples.append(seconds)
+
+    def snapshot(self) -> Dict[str, Any]:
+        ordered = sorted(self.samples)
+
+        def percentile(fraction: float) -> float:
+            return round(ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] * 1000, 2) if ordered else 0.0
+
+        return {
+            "count": self.count,
+            "total_ms": round(self.total * 1000, 2),
+            "mean_ms": round(self.total / self.count * 1000, 2) if self.count else 0.0,
+            "p50_ms": percentile(0.5),
+            "p95_ms": percentile(0.95),
+            "max_ms": round(self.max * 1000, 2)
+        }
+
+
+class Metrics:
+    """
+    In-process counters and stage timers, cheap enough for hot paths
+    Names are dotted by stage, e.g. "http.requests", "llm.gemini.latency", "render.results"
+    """
+
+    def __init__(self):
+        self.started_at = time.time()
+        self._counters: Dict[str, float] = {}
+        self._timers: Dict[str, Timer] = {}
+        self._lock = threading.Lock()
+
+    def incr(self, name: str, value: float = 1) -> None:
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def observe(self, name: str, seconds: float) -> None:
+        with self._lock:
+            timer = self._timers.get(name)
+            if timer is None:
+                timer = self._timers[name] = Timer()
+            timer.add(seconds)
+
+    @contextmanager
+    def timer(self, name: str):
+        """Times the block, failed or not"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Every counter and timer, JSON-serializable"""
+        with self._lock:
+            return {
+                "uptime_s": round(time.time() - self.started_at, 1),
+                "counters": dict(sorted(self._counters.items())),
+                "timers": {name: timer.snapshot() for name, timer in sorted(self._timers.items())}
+            }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters.clear()
+            self._timers.clear()
+            self.started_at = time.time()
+
+
+_default_metrics = Metrics()
+
+
+def get_metrics() -> Metrics:
+    """Returns the process-wide metrics"""
+    return _default_metrics
+
+
+def incr(name: str, value: float = 1) -> None:
+    _default_metrics.incr(name, value)
+
+
+def observe(name: str, seconds: float) -> None:
+    _default_metrics.observe(name, seconds)
+
+
+def timer(name: str):
+    return _default_metrics.timer(name)
+
+
+def timed(name: str):
+    """Decorator timing every call of a function"""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with _default_metrics.timer(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def snapshot() -> Dict[str, Any]:
+    return _default_metrics.snapshot()
+
+
+def write_snapshot(path: str) -> None:
+    """Appends the current metrics to path as one JSON line"""
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(dict(snapshot(), time=time.time()), separators=(",", ":")) + "\n")
+
+
+_log_thread: Optional[threading.Thread] = None
+_log_lock = threading.Lock()
+
+
+def start_metrics_log(path: str = METRICS_LOG_PATH, interval: float = METRICS_LOG_INTERVAL) -> bool:
+    """Starts appending a snapshot to path every interval seconds; returns False when disabled"""
+    global _log_thread
+    if not path or interval <= 0:
+        return False
+    with _log_lock:
+        if _log_thread is None:
+            def run():
+                while True:
+                    time.sleep(interval)
+                    try:
+                        write_snapshot(path)
+                    except OSError as e:
+                        logger.warning("Could not write metrics to %s: %s", path, e)
+
+            _log_thread = threading.Thread(target=run, name="metrics-log", daemon=True)
+            _log_thread.start()
+    return True
+
+
+def setup_logging(level: str = LOG_LEVEL) -> None:
+    """Configures the root logger for the command-line and web entry points"""
+    logging.basicConfig(level=getattr(logging, level.upper(), logging.INFO),
+                        format="%(asctime)s %(levelname)s %(name)s: %(message)s")
@@ -0,0 +1,91 @@
+import os
+from typing import Dict, List, Optional
+from pgn_parser import parse_pgn
+
+# Bundled table of ECO codes, names and their move sequences
+ECO_DATA_PATH = os.getenv("ECO_DATA_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "eco.tsv"))
+
+
+def san_moves(pgn: str, limit: Optional[int] = None) -> List[str]:
+    """Extracts the SAN moves of a PGN's main line, skipping headers, comments and move numbers"""
+    return parse_pgn(pgn, max_plies=limit).san()
+
+
+class _Node:
+    __slots__ = ("children", "eco", "name")
+
+    def __init__(self):
+        self.children: Dict[str, "_Node"] = {}
+        self.eco: Optional[str] = None
+        self.name: Optional[str] = None
+
+
+class OpeningClassifier:
+    """
+    Trie of ECO move sequences
+    A game is labelled with the deepest opening whose moves it starts with
+    """
+
+    def __init__(self, path: str = ECO_DATA_PATH):
+        self.root = _Node()
+        self.max_depth = 0
+        self.load(path)
+
+    def load(self, path: str) -> None:
+        """Adds every "eco<TAB>name<TAB>moves" line of a data file to the trie"""
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                if not line.strip() or line.startswith("#"):
+                    continue
+                eco, name, moves = line.rstrip("\n").split("\t")
+                self.add(eco, name, san_moves(moves))
+
+    def add(self, eco: str, name: str, moves: List[str]) -> None:
+        """Adds one opening; a later entry for the same moves replaces the earlier one"""
+        node = self.root
+        for move in moves:
+            node = node.children.setdefault(move, _Node())
+        node.eco, node.name = eco, name
+        self.max_depth = max(self.max_depth, len(moves))
+
+    def classify_moves(self, moves: List[str]) -> Optional[Dict[str, str]]:
+        """Returns {"eco", "name"} of the longest matching opening, or None"""
+        node, best = self.root, None
+        for move in moves[:self.max_depth]:
+            node = node.children.get(move)
+            if node is None:
+                break
+            if node.eco is not None:
+                best = node
+        if best is None:
+            return None
+        return {"eco": best.eco, "name": best.name}
+
+    def classify_pgn(self, pgn: str) -> Optional[Dict[str, str]]:
+        """
+        Classifies a PGN by its moves
+        Falls back to the ECO/ECOUrl headers Chess.com adds when the moves match nothing
+        """
+        game = parse_pgn(pgn, max_plies=self.max_depth)
+        opening = self.classify_moves(game.san())
+        if opening is not None:
+            return opening
+        headers = game.headers
+        if headers.get("ECO"):
+            slug = headers.get("ECOUrl", "").rstrip("/").rsplit("/", 1)[-1]
+            return {"eco": headers["ECO"], "name": slug.replace("-", " ") or headers["ECO"]}
+        return None
+
+
+# Loaded once at startup; the table is small
+_classifier = OpeningClassifier()
+
+
+def classify_pgn(pgn: str) -> Optional[Dict[str, str]]:
+    """Labels a PGN with its ECO code and opening name using the shared classifier"""
+    return _classifier.classify_pgn(pgn)
+
+
+def classify_moves(moves: List[str]) -> Optional[Dict[str, str]]:
+    """Labels a SAN move list with its ECO code and opening name using the shared classifier"""
+    return _classifier.classify_moves(moves)
@@ -0,0 +1,183 @@
+import re
+import sys
+import threading
+from array import array
+from typing import Dict, Any, List, Iterable, Iterator, Optional, Tuple
+
+_HEADER = re.compile(r'^\[(\w+)\s+"(.*)"\]\s*$')
+# Comment | rest-of-line comment | variation bracket | NAG | move number | move or result
+_TOKEN = re.compile(r"\{([^}]*)\}|;[^\n]*|([()])|\$\d+|(\d+)(\.+)|([^\s{}();$]+)")
+_CLOCK = re.compile(r"\[%clk\s+(\d+):(\d+):(\d+(?:\.\d+)?)\]")
+_RESULTS = {"1-0", "0-1", "1/2-1/2", "*"}
+
+# Stored in ParsedGame.clocks for plies without a %clk comment
+NO_CLOCK = -1
+
+# Every distinct SAN string is kept once; games store indices into this table
+_san_table: List[str] = []
+_san_ids: Dict[str, int] = {}
+_san_lock = threading.Lock()
+
+
+def _san_id(san: str) -> int:
+    sid = _san_ids.get(san)
+    if sid is None:
+        with _san_lock:
+            sid = _san_ids.get(san)
+            if sid is None:
+                sid = len(_san_table)
+                _san_table.append(san)
+                _san_ids[san] = sid
+    return sid
+
+
+def _clock_tenths(comment: str) -> int:
+    match = _CLOCK.search(comment)
+    if match is None:
+        return NO_CLOCK
+    hours, minutes, seconds = match.groups()
+    return int(round((int(hours) * 3600 + int(minutes) * 60 + float(seconds)) * 10))
+
+
+class ParsedGame:
+    """
+    Compact form of one PGN: headers plus array-backed moves and clocks
+    moves holds indices into a shared SAN table (4 bytes per ply instead of a string)
+    clocks holds the mover's remaining time after each ply in tenths of a second, or NO_CLOCK
+    """
+    __slots__ = ("headers", "moves", "clocks", "first_ply", "result")
+
+    def __init__(self, headers: Dict[str, str], first_ply: int = 0):
+        self.headers = headers
+        self.moves = array("I")
+        self.clocks = array("i")
+        # Ply number of the first recorded move; 0 is White's first move of a normal game
+        self.first_ply = first_ply
+        self.result: Optional[str] = headers.get("Result")
+
+    def __len__(self) -> int:
+        return len(self.moves)
+
+    def header(self, name: str, default: Any = None) -> Any:
+        return self.headers.get(name, default)
+
+    def san(self, start: int = 0, stop: Optional[int] = None) -> List[str]:
+        """SAN moves of plies start..stop"""
+        return [_san_table[sid] for sid in self.moves[start:stop]]
+
+    def clock(self, ply: int) -> Optional[float]:
+        """Seconds left on the mover's clock after a ply, or None when the PGN has no clock for it"""
+        tenths = self.clocks[ply]
+        return None if tenths == NO_CLOCK else tenths / 10
+
+    def time_spent(self) -> array:
+        """Tenths of a second each ply took, increment included; NO_CLOCK where unknown"""
+        base, increment = parse_time_control(self.headers.get("TimeControl"))
+        spent = array("i", [NO_CLOCK]) * len(self.clocks)
+        for ply, tenths in enumerate(self.clocks):
+            previous = self.clocks[ply - 2] if ply >= 2 else base
+            if tenths != NO_CLOCK and previous is not None and previous != NO_CLOCK:
+                spent[ply] = max(0, previous - tenths + increment)
+        return spent
+
+    def move_label(self, ply: int) -> str:
+        """"12." / "12..." label of a ply, matching preanalysis move labels"""
+        absolute = self.first_ply + ply
+        return f"{absolute // 2 + 1}{'.' if absolute % 2 == 0 else '...'}"
+
+    def movetext(self, stop: Optional[int] = None, clocks: Iterable[int] = ()) -> str:
+        """
+        Rebuilds numbered movetext ("1. e4 e5 2. Nf3") without comments
+        Plies listed in clocks keep their %clk time
+        """
+        keep_clock = set(clocks)
+        parts = []
+        for ply, sid in enumerate(self.moves[:stop]):
+            absolute = self.first_ply + ply
+            if absolute % 2 == 0:
+                parts.append(f"{absolute // 2 + 1}.")
+            elif ply == 0 or (ply - 1) in keep_clock:
+                parts.append(f"{absolute // 2 + 1}...")
+            parts.append(_san_table[sid])
+            if ply in keep_clock and self.clocks[ply] != NO_CLOCK:
+                parts.append(f"{{[%clk {format_clock(self.clocks[ply])}]}}")
+        return " ".join(parts)
+
+
+def format_clock(tenths: int) -> str:
+    """Formats tenths of a second the way %clk comments do (h:mm:ss.f)"""
+    seconds, tenth = divmod(tenths, 10)
+    minutes, seconds = divmod(seconds, 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02d}:{seconds:02d}" + (f".{tenth}" if tenth else "")
+
+
+def parse_time_control(time_control: Optional[str]) -> Tuple[Optional[int], int]:
+    """
+    Splits a "180+2" TimeControl header into (base, increment) in tenths of a second
+    base is None for daily ("1/86400") or missing time controls
+    """
+    base, _, increment = (time_control or "").partition("+")
+    if not base.isdigit():
+        return None, 0
+    return int(base) * 10, int(increment) * 10 if increment.isdigit() else 0
+
+
+def parse_headers(pgn: str) -> Dict[str, str]:
+    """Parses the [Tag "value"] header lines of a PGN"""
+    return _split(pgn)[0]
+
+
+def _split(pgn: str):
+    headers = {}
+    lines = (pgn or "").splitlines()
+    body_start = len(lines)
+    for index, line in enumerate(lines):
+        match = _HEADER.match(line)
+        if match:
+            headers[sys.intern(match.group(1))] = match.group(2)
+        elif line.strip():
+            body_start = index
+            break
+    return headers, "\n".join(lines[body_start:])
+
+
+def parse_pgn(pgn: str, max_plies: Optional[int] = None) -> ParsedGame:
+    """
+    Parses a PGN into a ParsedGame in a single pass over its movetext
+    Variations and annotations are skipped; only max_plies moves are read when given
+    """
+    headers, body = _split(pgn)
+    game = ParsedGame(headers)
+    moves, clocks = game.moves, game.clocks
+    depth = 0
+    for match in _TOKEN.finditer(body):
+        comment, bracket, number, dots, token = match.groups()
+        if bracket is not None:
+            depth += 1 if bracket == "(" else -1
+        elif depth:
+            continue
+        elif comment is not None:
+            tenths = _clock_tenths(comment)
+            if clocks and tenths != NO_CLOCK:
+                clocks[-1] = tenths
+        elif number is not None:
+            if not moves:
+                game.first_ply = (int(number) - 1) * 2 + (1 if len(dots) >= 3 else 0)
+        elif token is not None:
+            if token in _RESULTS:
+                game.result = token
+                break
+            if max_plies is not None and len(moves) >= max_plies:
+                break
+            moves.append(_san_id(token.rstrip("!?")))
+            clocks.append(NO_CLOCK)
+    return game
+
+
+def iter_parsed(games: Iterable[Dict[str, Any]]) -> Iterator[ParsedGame]:
+    """Streams raw archive games into ParsedGames; games without a PGN are skipped"""
+    for game in games:
+        pgn = game.get("pgn")
+        if pgn:
+            yield parse_pgn(pgn)
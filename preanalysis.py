@@ -0,0 +1,266 @@
+import io
+import os
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+
+try:
+    import chess
+    import chess.pgn
+    import chess.engine
+except ImportError:  # python-chess is optional; without it games go to the LLM unfiltered
+    chess = None
+
+logger = logging.getLogger(__name__)
+
+# Optional UCI engine (e.g. Stockfish); the built-in material evaluator is used when unset
+STOCKFISH_PATH = os.getenv("STOCKFISH_PATH", "")
+# The local engine pass runs when a UCI engine is configured or PREANALYSIS=1; PREANALYSIS=0 always turns it off
+PREANALYSIS_ENABLED = os.getenv("PREANALYSIS", "1" if STOCKFISH_PATH else "0") == "1" and chess is not None
+# Search depth (plies) of the evaluator
+PREANALYSIS_DEPTH = int(os.getenv("PREANALYSIS_DEPTH", 1))
+# Centipawns a move must lose to be reported as a mistake / blunder
+SWING_THRESHOLD = int(os.getenv("PREANALYSIS_SWING_CP", 150))
+BLUNDER_THRESHOLD = int(os.getenv("PREANALYSIS_BLUNDER_CP", 300))
+# Most critical positions reported per game
+MAX_MOMENTS = int(os.getenv("PREANALYSIS_MAX_MOMENTS", 5))
+# Processes used to pre-analyze many games at once
+PREANALYSIS_WORKERS = int(os.getenv("PREANALYSIS_WORKERS", os.cpu_count() or 1))
+# How much of the game is sent to the LLM as the opening
+OPENING_PLIES = 20
+
+MATE_SCORE = 10000
+PIECE_VALUES = {1: 100, 2: 320, 3: 330, 4: 500, 5: 900, 6: 0}
+# Quiescence search only follows captures this many plies deep
+QUIESCENCE_DEPTH = 4
+# Plies at the start of the quiescence search that also follow quiet checks (finds mates like Qb8+ Nxb8 Rd8#)
+QUIESCENCE_CHECKS = 2
+# Bump whenever the critical moments are computed differently so analyses built on the old ones are not reused
+MOMENTS_VERSION = "2"
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def _material(board) -> int:
+    """Material balance from the side to move's point of view, with a small centralization bonus"""
+    score = 0
+    for square, piece in board.piece_map().items():
+        value = PIECE_VALUES[piece.piece_type]
+        if piece.piece_type in (chess.PAWN, chess.KNIGHT):
+            file, rank = chess.square_file(square), chess.square_rank(square)
+            value += 10 - 3 * (abs(3.5 - file) + abs(3.5 - rank)) // 2
+        score += value if piece.color == board.turn else -value
+    return int(score)
+
+
+def _quiescence(board, alpha: int, beta: int, depth: int, checks: int = QUIESCENCE_CHECKS) -> int:
+    if board.is_check():
+        # No standing pat in check: every evasion is searched, and having none is mate
+        best = -MATE_SCORE
+        for move in board.legal_moves:
+            board.push(move)
+            score = -_quiescence(board, -beta, -max(alpha, best), max(depth - 1, 0), checks - 1)
+            board.pop()
+            best = max(best, score)
+            if best >= beta:
+                break
+        return best
+    stand_pat = _material(board)
+    if depth == 0 or stand_pat >= beta:
+        return stand_pat
+    alpha = max(alpha, stand_pat)
+    moves = list(board.generate_legal_captures())
+    if checks > 0:
+        moves += [move for move in board.legal_moves if not board.is_capture(move) and board.gives_check(move)]
+    for move in moves:
+        board.push(move)
+        score = -_quiescence(board, -beta, -alpha, depth - 1, checks - 1)
+        board.pop()
+        if score >= beta:
+            return score
+        alpha = max(alpha, score)
+    return alpha
+
+
+def _negamax(board, depth: int, alpha: int, beta: int) -> int:
+    if board.is_checkmate():
+        return -MATE_SCORE
+    if board.is_stalemate() or board.is_insufficient_material():
+        return 0
+    if depth == 0:
+        return _quiescence(board, alpha, beta, QUIESCENCE_DEPTH)
+
+    # Captures first so alpha-beta cuts earlier
+    moves = sorted(board.legal_moves, key=lambda move: not board.is_capture(move))
+    best = -MATE_SCORE - 1
+    for move in moves:
+        board.push(move)
+        score = -_negamax(board, depth - 1, -beta, -alpha)
+        board.pop()
+        best = max(best, score)
+        alpha = max(alpha, score)
+        if alpha >= beta:
+            break
+    return best
+
+
+def evaluate(board, depth: int = PREANALYSIS_DEPTH, engine=None) -> int:
+    """Evaluates a position in centipawns from White's point of view"""
+    if engine is not None:
+        info = engine.analyse(board, chess.engine.Limit(depth=depth))
+        return info["score"].white().score(mate_score=MATE_SCORE)
+    score = _negamax(board, depth, -MATE_SCORE - 1, MATE_SCORE + 1)
+    return score if board.turn == chess.WHITE else -score
+
+
+def score_move(board, move, depth: int = PREANALYSIS_DEPTH, engine=None) -> Tuple[int, int]:
+    """
+    (best, played): centipawn scores of the best move and of move in the position before it,
+    both searched to the same depth and from the side to move's point of view
+    """
+    if engine is not None:
+        limit = chess.engine.Limit(depth=depth)
+        best = engine.analyse(board, limit)["score"].pov(board.turn).score(mate_score=MATE_SCORE)
+        played = engine.analyse(board, limit, root_moves=[move])["score"].pov(board.turn).score(mate_score=MATE_SCORE)
+        return max(best, played), played
+    child_depth = max(depth - 1, 0)
+    board.push(move)
+    played = -_negamax(board, child_depth, -MATE_SCORE - 1, MATE_SCORE + 1)
+    board.pop()
+    # Only moves scoring above the played one matter, so it is the lower bound of the search window
+    best = played
+    for other in sorted(board.legal_moves, key=lambda other: not board.is_capture(other)):
+        if other == move:
+            continue
+        board.push(other)
+        best = max(best, -_negamax(board, child_depth, -MATE_SCORE - 1, -best))
+        board.pop()
+    return best, played
+
+
+def analyze_pgn(pgn: str, depth: int = PREANALYSIS_DEPTH) -> Optional[Dict[str, Any]]:
+    """
+    Replays a PGN and scores every position
+    Returns {"opening_moves": SAN string, "moments": [critical positions]} or None when the PGN cannot be read
+    Each moment holds the move, the position before it, and the evaluation of the best move and of the
+    played move there (White's view); a move's loss is the difference, so only-legal moves are never flagged
+    """
+    if chess is None:
+        return None
+    game = chess.pgn.read_game(io.StringIO(pgn or ""))
+    if game is None or game.errors:
+        return None
+    moves = list(game.mainline_moves())
+    if not moves:
+        return None
+
+    engine = chess.engine.SimpleEngine.popen_uci(STOCKFISH_PATH) if STOCKFISH_PATH else None
+    try:
+        board = game.board()
+        opening_moves = board.variation_san(moves[:OPENING_PLIES])
+
+        moments = []
+        for move in moves:
+            # A forced move cannot be a mistake
+            if board.legal_moves.count() > 1:
+                best, played = score_move(board, move, depth, engine)
+                # How much the move cost its own side compared with the best one
+                loss = best - played
+                if loss >= SWING_THRESHOLD:
+                    mover_is_white = board.turn == chess.WHITE
+                    sign = 1 if mover_is_white else -1
+                    moments.append({
+                        "move": f"{board.fullmove_number}{'.' if mover_is_white else '...'} {board.san(move)}",
+                        "fen": board.fen(),
+                        "eval_before": sign * best,
+                        "eval_after": sign * played,
+                        "loss": loss,
+                        "kind": "blunder" if loss >= BLUNDER_THRESHOLD else "mistake"
+                    })
+            board.push(move)
+    finally:
+        if engine is not None:
+            engine.quit()
+
+    # Keep the biggest swings, in game order
+    moments = sorted(sorted(moments, key=lambda m: -m["loss"])[:MAX_MOMENTS],
+                     key=lambda m: moves_index(m["move"]))
+    return {"opening_moves": opening_moves, "moments": moments}
+
+
+def moves_index(move_label: str) -> float:
+    """Sort key of a "12." / "12..." move label"""
+    number = move_label.split(".", 1)[0]
+    return int(number) + (0.5 if "..." in move_label else 0)
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                # spawn: forking a process that runs Gradio/HTTP threads is not safe
+                _pool = ProcessPoolExecutor(max_workers=max(1, PREANALYSIS_WORKERS),
+                                            mp_context=multiprocessing.get_context("spawn"))
+    return _pool
+
+
+def iter_analyze_pgns(pgns: List[str], depth: int = PREANALYSIS_DEPTH) -> Iterator[Optional[Dict[str, Any]]]:
+    """
+    Pre-analyzes many PGNs across CPU cores, yielding each result in the order of pgns as soon as it is ready
+    Every PGN is submitted up front; a game that fails to replay yields None
+    """
+    if chess is None:
+        yield from [None] * len(pgns)
+        return
+    # Starting worker processes costs more than analyzing a couple of games inline
+    if len(pgns) <= 2 or PREANALYSIS_WORKERS <= 1:
+        for pgn in pgns:
+            yield analyze_pgn(pgn, depth)
+        return
+    pool = _get_pool()
+    futures = [pool.submit(analyze_pgn, pgn, depth) for pgn in pgns]
+    try:
+        for future in futures:
+            try:
+                yield future.result()
+            except Exception as e:
+                logger.warning("Pre-analysis failed: %s", e)
+                yield None
+    finally:
+        # The caller stopped early: drop the games not started yet
+        for future in futures:
+            future.cancel()
+
+
+def analyze_pgns(pgns: List[str], depth: int = PREANALYSIS_DEPTH) -> List[Optional[Dict[str, Any]]]:
+    """Pre-analyzes many PGNs across CPU cores; results keep the order of pgns"""
+    return list(iter_analyze_pgns(pgns, depth))
+
+
+def format_moment(moment: Dict[str, Any]) -> str:
+    """One critical position as a compact prompt line"""
+    return (f"{moment['move']} ({moment['kind']}, eval {moment['eval_after'] / 100:+.1f}, best move "
+            f"{moment['eval_before'] / 100:+.1f}) FEN: {moment['fen']}")
+
+
+def quiet_game_analysis(game_data: Dict[str, Any]) -> str:
+    """
+    Analysis text for a game without critical moments, in the same format the LLM uses
+    Used instead of an LLM call when the local engine finds nothing worth explaining
+    """
+    if game_data.get('opening'):
+        opening = f"{game_data['opening']} ({game_data['eco']})"
+    else:
+        opening = game_data.get('opening_moves', 'Unknown')
+    return (
+        f"• Opening: {opening}\n"
+        f"• Key Moments:\n"
+        f"  - No blunders or large evaluation swings found by the local engine\n"
+        f"• Final Outcome: {game_data['result']}\n"
+        f"• Recommendations:\n"
+        f"  - Review the middlegame plans; the game had no tactical turning points"
+    )
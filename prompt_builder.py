@@ -0,0 +1,57 @@
+import os
+from typing import Dict, List, Iterable
+from pgn_parser import ParsedGame, format_clock, parse_pgn, NO_CLOCK
+
+# How much of each PGN is sent to the LLM:
+#   moves  - numbered SAN moves only, no headers or comments
+#   clocks - moves plus the clock times of the critical moves
+#   full   - the PGN as Chess.com returns it (every header, a clock comment on every move)
+DETAIL_LEVELS = ("moves", "clocks", "full")
+PROMPT_DETAIL = os.getenv("PROMPT_DETAIL", "moves")
+# Moves that keep their clock in "clocks" detail when no engine picked the critical moves
+CLOCK_MOVES = int(os.getenv("PROMPT_CLOCK_MOVES", 5))
+
+
+def check_detail(detail: str) -> str:
+    """Returns detail, raising ValueError for unknown detail levels"""
+    if detail not in DETAIL_LEVELS:
+        raise ValueError(f"Unsupported prompt detail {detail}. Use one of {', '.join(DETAIL_LEVELS)}.")
+    return detail
+
+
+def critical_plies(game: ParsedGame, labels: Iterable[str] = ()) -> List[int]:
+    """
+    Plies whose clock is worth keeping
+    The moves named in labels ("12." / "12...") when given, otherwise the longest thinks
+    """
+    labels = set(labels)
+    if labels:
+        return [ply for ply in range(len(game)) if game.move_label(ply) in labels]
+    spent = game.time_spent()
+    thinks = sorted((tenths, ply) for ply, tenths in enumerate(spent) if tenths != NO_CLOCK)
+    return sorted(ply for _, ply in thinks[-CLOCK_MOVES:]) if CLOCK_MOVES > 0 else []
+
+
+def format_moves(pgn: str, detail: str = PROMPT_DETAIL, labels: Iterable[str] = ()) -> str:
+    """
+    The moves of a game at the given detail level
+    PGNs the parser finds no moves in are sent unchanged
+    """
+    if check_detail(detail) == "full":
+        return pgn
+    game = parse_pgn(pgn)
+    if not len(game):
+        return pgn
+    clocks = critical_plies(game, labels) if detail == "clocks" else ()
+    text = game.movetext(clocks=clocks)
+    return f"{text} {game.result}" if game.result else text
+
+
+def moment_clocks(pgn: str, labels: Iterable[str]) -> Dict[str, str]:
+    """Clock left after each labelled move, e.g. {"12...": "0:01:05"}; moves without a clock are left out"""
+    game = parse_pgn(pgn)
+    clocks = {}
+    for ply in critical_plies(game, labels):
+        if game.clocks[ply] != NO_CLOCK:
+            clocks[game.move_label(ply)] = format_clock(game.clocks[ply])
+    return clocks
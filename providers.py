@@ -0,0 +1,353 @@
+import os
+import time
+import logging
+import threading
+from typing import Dict, Any, List, Iterator, Optional
+import metrics
+from rate_limit import RateLimiter
+
+logger = logging.getLogger(__name__)
+
+# Routes each call to the healthiest configured provider
+AUTO = "auto"
+# Weight of the newest call in the rolling latency and error rate
+PROVIDER_EWMA_ALPHA = float(os.getenv("PROVIDER_EWMA_ALPHA", 0.2))
+# Consecutive failures that take a provider out of rotation, and for how many seconds
+PROVIDER_FAILURE_THRESHOLD = int(os.getenv("PROVIDER_FAILURE_THRESHOLD", 3))
+PROVIDER_COOLDOWN = float(os.getenv("PROVIDER_COOLDOWN", 30))
+# Seconds a provider call may take before it is abandoned and the next provider is tried
+PROVIDER_TIMEOUT = float(os.getenv("PROVIDER_TIMEOUT", 60))
+# How much a provider's error rate inflates its expected latency when ranking providers
+ERROR_PENALTY = 10
+
+# Requests and tokens per minute each provider accepts from this process (0 disables a budget)
+PROVIDER_BUDGETS = {
+    "gemini": {
+        "rpm": float(os.getenv("GEMINI_RPM", 60)),
+        "tpm": float(os.getenv("GEMINI_TPM", 250000))
+    },
+    "gpt-4o": {
+        "rpm": float(os.getenv("OPENAI_RPM", 500)),
+        "tpm": float(os.getenv("OPENAI_TPM", 30000))
+    }
+}
+
+
+class AnalysisError(Exception):
+    """Base class of every failure to get an analysis from an LLM provider"""
+
+
+class UnsupportedModelError(AnalysisError, ValueError):
+    """The requested model is not a registered provider"""
+
+
+class ProviderError(AnalysisError):
+    """One provider failed to answer"""
+
+    def __init__(self, provider: str, message: str):
+        super().__init__(f"{provider}: {message}")
+        self.provider = provider
+
+
+class NoProviderAvailable(AnalysisError):
+    """Every provider failed or is unavailable"""
+
+    def __init__(self, errors: List[ProviderError]):
+        detail = "; ".join(str(error) for error in errors) or "no provider is configured"
+        super().__init__(f"No LLM provider could answer ({detail})")
+        self.errors = errors
+
+
+class NoProviderConfigured(NoProviderAvailable):
+    """No provider has its API key set, so retrying cannot help"""
+
+    def __init__(self):
+        super().__init__([])
+
+
+class ProviderHealth:
+    """
+    Rolling (EWMA) latency and error rate of one provider
+    After PROVIDER_FAILURE_THRESHOLD failures in a row the provider is skipped for PROVIDER_COOLDOWN seconds
+    """
+
+    def __init__(self, alpha: float = PROVIDER_EWMA_ALPHA):
+        self.alpha = alpha
+        self.latency: Optional[float] = None
+        self.error_rate = 0.0
+        self.consecutive_failures = 0
+        self.open_until = 0.0
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def record(self, latency: float, ok: bool) -> None:
+        with self._lock:
+            self.calls += 1
+            self.latency = latency if self.latency is None else self.alpha * latency + (1 - self.alpha) * self.latency
+            self.error_rate = self.alpha * (0.0 if ok else 1.0) + (1 - self.alpha) * self.error_rate
+            if ok:
+                self.consecutive_failures = 0
+                self.open_until = 0.0
+            else:
+                self.consecutive_failures += 1
+                if self.consecutive_failures >= PROVIDER_FAILURE_THRESHOLD:
+                    self.open_until = time.monotonic() + PROVIDER_COOLDOWN
+
+    def available(self) -> bool:
+        return time.monotonic() >= self.open_until
+
+    def score(self) -> float:
+        """Expected seconds per call, inflated by the error rate; lower is healthier"""
+        latency = self.latency if self.latency is not None else 0.0
+        return latency * (1 + ERROR_PENALTY * self.error_rate) + self.error_rate
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "latency": round(self.latency, 3) if self.latency is not None else None,
+            "error_rate": round(self.error_rate, 3),
+            "consecutive_failures": self.consecutive_failures,
+            "available": self.available(),
+            "calls": self.calls
+        }
+
+
+class Provider:
+    """
+    One LLM backend
+    Subclasses name the API key they need and implement create_client and send (and
+    send_stream when the vendor can stream)
+    The client is created on first use; every call is rate limited, timed and recorded
+    """
+    name = ""
+    api_key_env = ""
+
+    def __init__(self):
+        self.health = ProviderHealth()
+        budget = PROVIDER_BUDGETS.get(self.name, {"rpm": 0, "tpm": 0})
+        self.request_limiter = RateLimiter(budget["rpm"] / 60, capacity=max(budget["rpm"], 1))
+        self.token_limiter = RateLimiter(budget["tpm"] / 60, capacity=max(budget["tpm"], 1))
+        self._client = None
+        self._client_lock = threading.Lock()
+
+    def configured(self) -> bool:
+        return bool(os.getenv(self.api_key_env))
+
+    def client(self):
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    self._client = self.create_client()
+        return self._client
+
+    def create_client(self):
+        raise NotImplementedError
+
+    def send(self, client, prompt: str) -> str:
+        raise NotImplementedError
+
+    def send_stream(self, client, prompt: str) -> Iterator[str]:
+        """Yields the response in chunks; without vendor streaming the whole response is one chunk"""
+        yield self.send(client, prompt)
+
+    def _acquire(self, prompt: str) -> None:
+        # Rough token count (about four characters per token)
+        tokens = len(prompt) // 4 + 1
+        self.request_limiter.acquire()
+        self.token_limiter.acquire(tokens)
+        metrics.incr("llm.calls")
+        metrics.incr("llm.prompt_tokens", tokens)
+
+    def _record(self, start: float, ok: bool, length: int = 0) -> None:
+        """Records a call's health and metrics; length is the response size in characters"""
+        latency = time.monotonic() - start
+        self.health.record(latency, ok)
+        metrics.observe(f"llm.{self.name}.latency", latency)
+        if ok:
+            metrics.incr("llm.response_tokens", length // 4 + 1)
+        else:
+            metrics.incr(f"llm.{self.name}.errors")
+
+    def complete(self, prompt: str) -> str:
+        """Returns the response text, raising ProviderError on any failure"""
+        self._acquire(prompt)
+        start = time.monotonic()
+        try:
+            text = self.send(self.client(), prompt)
+            if not text:
+                raise ValueError("empty response")
+        except Exception as e:
+            self._record(start, ok=False)
+            raise ProviderError(self.name, str(e)) from e
+        self._record(start, ok=True, length=len(text))
+        return text
+
+    def stream(self, prompt: str) -> Iterator[str]:
+        """
+        Yields the response text chunk by chunk as the vendor produces it
+        Raises ProviderError on any failure, including one after some chunks were yielded
+        """
+        self._acquire(prompt)
+        start = time.monotonic()
+        length = 0
+        try:
+            for chunk in self.send_stream(self.client(), prompt):
+                if chunk:
+                    if not length:
+                        metrics.observe(f"llm.{self.name}.first_token", time.monotonic() - start)
+                    length += len(chunk)
+                    yield chunk
+            if not length:
+                raise ValueError("empty response")
+        except Exception as e:
+            self._record(start, ok=False)
+            raise ProviderError(self.name, str(e)) from e
+        self._record(start, ok=True, length=length)
+
+
+class GeminiProvider(Provider):
+    name = "gemini"
+    api_key_env = "GOOGLE_API_KEY"
+
+    def create_client(self):
+        # Imported here: the SDK is slow to import and not needed until the first call
+        import google.generativeai as genai
+        genai.configure(api_key=os.getenv(self.api_key_env))
+        return genai.GenerativeModel("gemini-2.5-flash-lite")
+
+    def send(self, client, prompt: str) -> str:
+        response = client.generate_content(prompt, request_options={"timeout": PROVIDER_TIMEOUT})
+        return response.text
+
+    def send_stream(self, client, prompt: str) -> Iterator[str]:
+        response = client.generate_content(prompt, stream=True, request_options={"timeout": PROVIDER_TIMEOUT})
+        for chunk in response:
+            # The closing chunk may carry only the finish reason
+            if chunk.parts:
+                yield chunk.text
+
+
+class OpenAIProvider(Provider):
+    name = "gpt-4o"
+    api_key_env = "OPENAI_API_KEY"
+
+    def create_client(self):
+        from openai import OpenAI
+        # Failover replaces the SDK's own retries, so a slow vendor does not hold the call
+        # OPENAI_BASE_URL points the client at any OpenAI-compatible server (e.g. the benchmark's fake)
+        return OpenAI(api_key=os.getenv(self.api_key_env), base_url=os.getenv("OPENAI_BASE_URL") or None,
+                      timeout=PROVIDER_TIMEOUT, max_retries=0)
+
+    @staticmethod
+    def _messages(prompt: str) -> List[Dict[str, str]]:
+        return [
+            {"role": "system", "content": "You are a chess analysis assistant. Follow the format EXACTLY."},
+            {"role": "user", "content": prompt}
+        ]
+
+    def send(self, client, prompt: str) -> str:
+        completion = client.chat.completions.create(model=self.name, messages=self._messages(prompt))
+        return completion.choices[0].message.content
+
+    def send_stream(self, client, prompt: str) -> Iterator[str]:
+        stream = client.chat.completions.create(model=self.name, messages=self._messages(prompt), stream=True)
+        for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+
+class ProviderRouter:
+    """
+    Sends each prompt to the healthiest provider and fails over to the others
+    A named model is tried first while it is in rotation; AUTO ranks providers by health only
+    """
+
+    def __init__(self, providers: List[Provider]):
+        self.providers: Dict[str, Provider] = {provider.name: provider for provider in providers}
+
+    def register(self, provider: Provider) -> None:
+        self.providers[provider.name] = provider
+
+    def names(self) -> List[str]:
+        return [AUTO] + list(self.providers)
+
+    def candidates(self, model: str = AUTO) -> List[Provider]:
+        """Providers to try, in order"""
+        if model != AUTO and model not in self.providers:
+            raise UnsupportedModelError(f"Unsupported model {model}. Use one of {', '.join(self.names())}.")
+        configured = [provider for provider in self.providers.values() if provider.configured()]
+        in_rotation = sorted((p for p in configured if p.health.available()), key=lambda p: p.health.score())
+        if not in_rotation:
+            # Everything is cooling down: try the provider that comes back first anyway
+            in_rotation = sorted(configured, key=lambda p: p.health.open_until)
+        preferred = self.providers.get(model)
+        if preferred in in_rotation:
+            in_rotation.remove(preferred)
+            in_rotation.insert(0, preferred)
+        return in_rotation
+
+    def complete(self, prompt: str, model: str = AUTO) -> str:
+        """
+        Returns the first successful response
+        Raises UnsupportedModelError for unknown models, NoProviderConfigured when no provider has
+        an API key and NoProviderAvailable when every provider failed
+        """
+        candidates = self.candidates(model)
+        if not candidates:
+            raise NoProviderConfigured()
+        errors = []
+        for provider in candidates:
+            try:
+                return provider.complete(prompt)
+            except ProviderError as e:
+                logger.warning("Provider %s failed: %s", provider.name, e)
+                errors.append(e)
+        raise NoProviderAvailable(errors)
+
+    def stream(self, prompt: str, model: str = AUTO) -> Iterator[str]:
+        """
+        Yields the first answering provider's response chunk by chunk
+        Fails over until a provider has produced its first chunk; a stream that breaks after
+        that raises its ProviderError, since the text already shown cannot be taken back
+        """
+        candidates = self.candidates(model)
+        if not candidates:
+            raise NoProviderConfigured()
+        errors = []
+        for provider in candidates:
+            started = False
+            try:
+                for chunk in provider.stream(prompt):
+                    started = True
+                    yield chunk
+                return
+            except ProviderError as e:
+                if started:
+                    raise
+                logger.warning("Provider %s failed: %s", provider.name, e)
+                errors.append(e)
+        raise NoProviderAvailable(errors)
+
+    def health(self) -> Dict[str, Dict[str, Any]]:
+        """Rolling latency and error rate of every provider"""
+        return {name: provider.health.snapshot() for name, provider in self.providers.items()}
+
+
+_default_router: Optional[ProviderRouter] = None
+_default_router_lock = threading.Lock()
+
+
+def get_router() -> ProviderRouter:
+    """Returns the process-wide provider router"""
+    global _default_router
+    if _default_router is None:
+        with _default_router_lock:
+            if _default_router is None:
+                _default_router = ProviderRouter([GeminiProvider(), OpenAIProvider()])
+    return _default_router
+
+
+def reset_router() -> None:
+    """Forgets the router, its clients and health statistics (mainly for tests)"""
+    global _default_router
+    with _default_router_lock:
+        _default_router = None
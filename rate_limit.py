@@ -0,0 +1,44 @@
+import time
+import random
+import threading
+from typing import Optional
+
+
+class RateLimiter:
+    """
+    Thread-safe token bucket
+    Refills at `rate` tokens per second up to `capacity`; acquire() blocks until enough tokens are available
+    A rate of 0 (or less) disables limiting
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(rate, 1)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, tokens: float = 1) -> None:
+        """Blocks until `tokens` can be taken from the bucket"""
+        if self.rate <= 0:
+            return
+        # Requests larger than the bucket would never fit, so cap them at a full bucket
+        tokens = min(tokens, self.capacity)
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                wait = (tokens - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+def backoff_delay(attempt: int, base: float = 0.5, cap: float = 30.0) -> float:
+    """Exponential backoff with full jitter for the given (0-based) retry attempt"""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
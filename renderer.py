@@ -0,0 +1,92 @@
+import os
+import re
+import html
+import functools
+from typing import Dict, Any, List
+import metrics
+
+# Games shown per page of the results table
+RESULTS_PAGE_SIZE = int(os.getenv("RESULTS_PAGE_SIZE", 50))
+# Rendered game rows kept in memory, keyed by their content (analysis included)
+FRAGMENT_CACHE_SIZE = int(os.getenv("FRAGMENT_CACHE_SIZE", 2048))
+
+# Shared styles of the results table; rows only carry class names
+RESULTS_CSS = """
+.results { margin: 20px 0; font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, Oxygen-Sans, Ubuntu, Cantarell, 'Helvetica Neue', sans-serif; }
+.results table { width: 100%; border-collapse: separate; border-spacing: 0; border-radius: 8px; overflow: hidden; box-shadow: 0 4px 6px rgba(0, 0, 0, 0.1); }
+.results thead tr { background-color: var(--primary-500); }
+.results th { padding: 12px; text-align: left; color: white; font-weight: 600; font-size: 15px; }
+.results .game { background-color: var(--background-fill-primary); }
+.results .game td { padding: 12px; border-bottom: 1px solid var(--border-color-primary); font-size: 14px; }
+.results .analysis td { padding: 16px; background-color: var(--background-fill-secondary); line-height: 1.8; font-size: 14px; }
+.results .analysis div { margin-left: 12px; white-space: pre-line; }
+.results .bullet { color: var(--primary-500); }
+.results .sub-bullet { color: var(--primary-600); }
+.results .move { font-family: monospace; background: var(--background-fill-secondary); padding: 2px 4px; border-radius: 3px; }
+.results .pages { margin-top: 8px; font-size: 13px; color: var(--body-text-color-subdued); }
+"""
+
+_HEADER = (
+    '<div class="results"><table><thead><tr>'
+    '<th>Date</th><th>White Player</th><th>Black Player</th><th>Result</th>'
+    '</tr></thead><tbody>'
+)
+_FOOTER = '</tbody></table>{pages}</div>'
+_ROW = (
+    '<tr class="game"><td>{date}</td><td>{white}</td><td>{black}</td><td>{result}</td></tr>'
+    '<tr class="analysis"><td colspan="4"><div>{analysis}</div></td></tr>'
+)
+
+# Markup of the analysis format, replaced in a single pass
+_MARKUP = {
+    '• ': '<br><span class="bullet">•</span> ',
+    '  - ': '<br>&nbsp;&nbsp;&nbsp;<span class="sub-bullet">-</span> ',
+    '[Move ': '<span class="move">Move ',
+    ']': '</span>',
+    'Analysis by:': '<br><br><em>Analysis by:</em>'
+}
+_MARKUP_PATTERN = re.compile("|".join(re.escape(token) for token in _MARKUP))
+
+
+def format_analysis(analysis: str) -> str:
+    """Escapes an analysis and styles its bullets, sub-bullets, moves and attribution"""
+    return _MARKUP_PATTERN.sub(lambda match: _MARKUP[match.group(0)], html.escape(analysis, quote=False))
+
+
+def _render_game(date: str, white: str, black: str, result: str, analysis: str) -> str:
+    return _ROW.format(
+        date=html.escape(str(date)),
+        white=html.escape(str(white)),
+        black=html.escape(str(black)),
+        result=html.escape(str(result)),
+        analysis=format_analysis(str(analysis))
+    )
+
+
+# Finished analyses never change, so each row is rendered once
+render_game = functools.lru_cache(maxsize=FRAGMENT_CACHE_SIZE)(_render_game)
+
+
+def page_count(total: int, page_size: int = RESULTS_PAGE_SIZE) -> int:
+    return max(1, -(-total // max(1, page_size)))
+
+
+@metrics.timed("render.results")
+def render_results(games: List[Dict[str, Any]], page: int = 1, page_size: int = RESULTS_PAGE_SIZE) -> str:
+    """
+    HTML table of one page of games (dicts with date, white_player, black_player, result, analysis)
+    Rows marked 'draft' (analyses still streaming) are rendered without being cached
+    """
+    pages = page_count(len(games), page_size)
+    page = min(max(1, int(page or 1)), pages)
+    first = (page - 1) * page_size
+    shown = games[first:first + page_size]
+    rows = []
+    for game in shown:
+        render = _render_game if game.get('draft') else render_game
+        rows.append(render(game['date'], game['white_player'], game['black_player'], game['result'], game['analysis']))
+    footer = ""
+    if pages > 1:
+        footer = (f'<div class="pages">Games {first + 1}-{first + len(shown)} of {len(games)}'
+                  f' &middot; page {page} of {pages}</div>')
+    return _HEADER + "".join(rows) + _FOOTER.format(pages=footer)
@@ -0,0 +1,186 @@
+import datetime
+from typing import Dict, Any, List, Tuple
+import numpy as np
+import ai_model
+from pgn_parser import parse_headers
+
+# Player's score for each PGN Result, from White's point of view
+_WHITE_SCORES = {"1-0": 1.0, "0-1": 0.0, "1/2-1/2": 0.5}
+
+
+def _number(value: Any) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def _white_score(game_data: Dict[Any, Any]) -> float:
+    """1 / 0.5 / 0 for a White win / draw / loss, NaN when unknown"""
+    result = parse_headers(game_data.get('pgn', '')).get("Result")
+    if result in _WHITE_SCORES:
+        return _WHITE_SCORES[result]
+    return 0.5 if game_data.get('result') == 'draw' else np.nan
+
+
+def _encode(values: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """Categorical column: (labels, integer code per game)"""
+    labels, codes = np.unique(np.array(values, dtype=str), return_inverse=True)
+    return labels, codes.astype(np.int32)
+
+
+class PlayerStats:
+    """
+    Columnar view of one player's games for fast aggregate statistics
+    Every column is a NumPy array with one entry per game, in end_time order
+    Scores are from the player's point of view: 1 win, 0.5 draw, 0 loss, NaN unknown
+    """
+
+    def __init__(self, username: str, games: List[Dict[Any, Any]]):
+        self.username = username
+        name = username.lower()
+        games = [game for game in games if name in (str(game.get('white_player', '')).lower(),
+                                                     str(game.get('black_player', '')).lower())]
+        games.sort(key=lambda game: game.get('end_time') or 0)
+
+        self.end_time = np.array([game.get('end_time') or 0 for game in games], dtype=np.int64)
+        self.is_white = np.array([str(game.get('white_player', '')).lower() == name for game in games], dtype=bool)
+        white_rating = np.array([_number(game.get('white_rating')) for game in games], dtype=np.float64)
+        black_rating = np.array([_number(game.get('black_rating')) for game in games], dtype=np.float64)
+        white_score = np.array([_white_score(game) for game in games], dtype=np.float64)
+
+        self.rating = np.where(self.is_white, white_rating, black_rating)
+        self.opponent_rating = np.where(self.is_white, black_rating, white_rating)
+        self.score = np.where(self.is_white, white_score, 1.0 - white_score)
+        self.time_controls, self.time_control = _encode([str(game.get('time_control', 'Unknown')) for game in games])
+        self.openings, self.opening = _encode([
+            f"{game['eco']} {game['opening']}" if game.get('opening') else "Unclassified" for game in games
+        ])
+
+    def __len__(self) -> int:
+        return len(self.end_time)
+
+    @staticmethod
+    def _record(score: np.ndarray) -> Dict[str, Any]:
+        known = score[~np.isnan(score)]
+        games = int(len(known))
+        wins, draws = int(np.sum(known == 1.0)), int(np.sum(known == 0.5))
+        return {
+            "games": games,
+            "wins": wins,
+            "draws": draws,
+            "losses": games - wins - draws,
+            "win_rate": round(wins / games, 3) if games else None,
+            "score": round(float(known.mean()), 3) if games else None
+        }
+
+    def _grouped(self, labels: np.ndarray, codes: np.ndarray) -> List[Dict[str, Any]]:
+        """Win/draw/loss record per category, most played first"""
+        known = ~np.isnan(self.score)
+        size = len(labels)
+        games = np.bincount(codes[known], minlength=size)
+        wins = np.bincount(codes[known], weights=self.score[known] == 1.0, minlength=size)
+        draws = np.bincount(codes[known], weights=self.score[known] == 0.5, minlength=size)
+        rows = []
+        for index in np.argsort(-games, kind="stable"):
+            if not games[index]:
+                continue
+            total = int(games[index])
+            rows.append({
+                "name": str(labels[index]),
+                "games": total,
+                "wins": int(wins[index]),
+                "draws": int(draws[index]),
+                "losses": total - int(wins[index]) - int(draws[index]),
+                "win_rate": round(float(wins[index]) / total, 3)
+            })
+        return rows
+
+    def summary(self) -> Dict[str, Any]:
+        """Overall record plus average ratings"""
+        record = self._record(self.score)
+        record["average_opponent_rating"] = (
+            round(float(np.nanmean(self.opponent_rating))) if np.any(~np.isnan(self.opponent_rating)) else None
+        )
+        return record
+
+    def by_color(self) -> Dict[str, Dict[str, Any]]:
+        return {"white": self._record(self.score[self.is_white]), "black": self._record(self.score[~self.is_white])}
+
+    def by_time_control(self) -> List[Dict[str, Any]]:
+        return self._grouped(self.time_controls, self.time_control)
+
+    def by_opening(self, limit: int = 10) -> List[Dict[str, Any]]:
+        return self._grouped(self.openings, self.opening)[:limit]
+
+    def rating_history(self) -> List[Dict[str, Any]]:
+        """
+        Rating trend per time control: first, last, lowest and highest rating and the change
+        Also the last rating of every day, for charts
+        """
+        history = []
+        days = self.end_time // 86400
+        for index, label in enumerate(self.time_controls):
+            mask = (self.time_control == index) & ~np.isnan(self.rating)
+            ratings = self.rating[mask]
+            if not len(ratings):
+                continue
+            game_days = days[mask]
+            # Last game of each day: positions where the next game falls on another day
+            last_of_day = np.append(game_days[1:] != game_days[:-1], True)
+            history.append({
+                "time_control": str(label),
+                "first": int(ratings[0]),
+                "last": int(ratings[-1]),
+                "lowest": int(ratings.min()),
+                "highest": int(ratings.max()),
+                "change": int(ratings[-1] - ratings[0]),
+                "daily": [
+                    (datetime.datetime.fromtimestamp(int(day) * 86400, tz=datetime.timezone.utc).strftime('%Y-%m-%d'),
+                     int(rating))
+                    for day, rating in zip(game_days[last_of_day], ratings[last_of_day])
+                ]
+            })
+        return history
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Every aggregate in one dictionary"""
+        return {
+            "username": self.username,
+            "summary": self.summary(),
+            "by_color": self.by_color(),
+            "by_time_control": self.by_time_control(),
+            "by_opening": self.by_opening(),
+            "rating_history": self.rating_history()
+        }
+
+
+def player_stats(username: str, games: List[Dict[Any, Any]]) -> Dict[str, Any]:
+    """
+    Aggregate statistics of a player's games, as returned by get_all_games / get_games_in_range
+    Returns {"summary", "by_color", "by_time_control", "by_opening", "rating_history"}
+    """
+    return PlayerStats(username, games).as_dict()
+
+
+def build_summary_prompt(stats: Dict[str, Any]) -> str:
+    """Prompt asking for a short coaching summary of the aggregates (one call for all games)"""
+    compact = dict(stats, rating_history=[
+        {key: value for key, value in entry.items() if key != "daily"} for entry in stats["rating_history"]
+    ])
+    return f"""
+    You are a chess coach. Based on these statistics of the Chess.com player {stats['username']},
+    write at most 5 short bullet points (starting with •) about their strengths, weaknesses and trends.
+    Scores are from the player's point of view.
+
+    Statistics:
+    {compact}
+    """
+
+
+def summarize_with_llm(stats: Dict[str, Any], model: str = ai_model.model) -> str:
+    """
+    Summarizes the aggregates with a single LLM call
+    Raises providers.AnalysisError when no provider could answer
+    """
+    return ai_model.complete(build_summary_prompt(stats), model)
@@ -9,6 +9,25 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from test_chess_analyzer import TestChessComAnalyzer
 from test_ai_model import TestAIModel
 from test_interface import TestInterface
+from test_http_client import TestHttpClient
+from test_archive_store import TestArchiveStore
+from test_rate_limit import TestRateLimit
+from test_analysis_engine import TestAnalysisEngine
+from test_analysis_cache import TestAnalysisCache
+from test_game_store import TestGameStore
+from test_preanalysis import TestPreanalysis
+from test_openings import TestOpenings
+from test_pgn_parser import TestPgnParser
+from test_prompt_builder import TestPromptBuilder
+from test_stats import TestStats
+from test_jobs import TestJobs
+from test_singleflight import TestSingleFlight
+from test_startup import TestStartup
+from test_providers import TestProviders
+from test_batch import TestBatch
+from test_renderer import TestRenderer
+from test_metrics import TestMetrics
+from test_benchmarks import TestBenchmarks
 
 def run_tests():
     # Create test suite
@@ -18,6 +37,25 @@ def run_tests():
     test_suite.addTests(unittest.TestLoader().loadTestsFromTestCase(TestChessComAnalyzer))
     test_suite.addTests(unittest.TestLoader().loadTestsFromTestCase(TestAIModel))
     test_suite.addTests(unittest.TestLoader().loadTestsFromTestCase(TestInterface))
+    test_suite.addTests(unittest.TestLoader().loadTestsFromTestCase(TestHttpClient))
+    test_suite.addTests(unittest.TestLoader().loadTestsFromTestCase(TestArchiveStore))
+    test_suite.addTests(unittest.TestLoader().loadTestsFromTestCase(TestRateLimit))
+    test_suite.addTests(unittest.TestLoader().loadTestsFromTestCase(TestAnalysisEngine))
+    test_suite.addTests(unittest.TestLoader().loadTestsFromTestCase(TestAnalysisCache))
+    test_suite.addTests(unittest.TestLoader().loadTestsFromTestCase(TestGameStore))
+    test_suite.addTests(unittest.TestLoader().loadTestsFromTestCase(TestPreanalysis))
+    test_suite.addTests(unittest.TestLoader().loadTestsFromTestCase(TestOpenings))
+    test_suite.addTests(unittest.TestLoader().loadTestsFromTestCase(TestPgnParser))
+    test_suite.addTests(unittest.TestLoader().loadTestsFromTestCase(TestPromptBuilder))
+    test_suite.addTests(unittest.TestLoader().loadTestsFromTestCase(TestStats))
+    test_suite.addTests(unittest.TestLoader().loadTestsFromTestCase(TestJobs))
+    test_suite.addTests(unittest.TestLoader().loadTestsFromTestCase(TestSingleFlight))
+    test_suite.addTests(unittest.TestLoader().loadTestsFromTestCase(TestStartup))
+    test_suite.addTests(unittest.TestLoader().loadTestsFromTestCase(TestProviders))
+    test_suite.addTests(unittest.TestLoader().loadTestsFromTestCase(TestBatch))
+    test_suite.addTests(unittest.TestLoader().loadTestsFromTestCase(TestRenderer))
+    test_suite.addTests(unittest.TestLoader().loadTestsFromTestCase(TestMetrics))
+    test_suite.addTests(unittest.TestLoader().loadTestsFromTestCase(TestBenchmarks))
     
     # Run tests
     runner = unittest.TextTestRunner(verbosity=2)
@@ -1,6 +1,8 @@
 import unittest
 from unittest.mock import patch, MagicMock
-from ai_model import analyze_chess_game
+import providers
+from ai_model import analyze_chess_game, build_batch_prompt, parse_batch_response
+from providers import AnalysisError
 
 class TestAIModel(unittest.TestCase):
     def setUp(self):
@@ -23,10 +25,28 @@ class TestAIModel(unittest.TestCase):
         result = analyze_chess_game(self.test_game_data)
         self.assertIn("Opening", result)
         
-    @patch('openai.OpenAI')
-    def test_analyze_chess_game_failure(self, mock_openai):
-        # Mock API error
-        mock_openai.return_value.chat.completions.create.side_effect = Exception("API Error")
-        
-        result = analyze_chess_game(self.test_game_data)
-        self.assertIn("An error occurred", result) 
\ No newline at end of file
+    @patch('providers.Provider.configured', return_value=True)
+    @patch('providers.OpenAIProvider.send', side_effect=Exception("API Error"))
+    @patch('providers.GeminiProvider.send', side_effect=Exception("API Error"))
+    def test_analyze_chess_game_failure(self, mock_gemini, mock_openai, mock_configured):
+        # Every provider fails: the error is raised instead of returned as an analysis
+        providers.reset_router()
+        with patch('providers.Provider.client'):
+            with self.assertRaises(AnalysisError):
+                analyze_chess_game(self.test_game_data)
+        providers.reset_router()
+
+    def test_parse_batch_response(self):
+        response = '```json\n[{"id": "g1", "analysis": "• Opening: French"}, {"id": "g0", "analysis": "• Opening: Sicilian"}]\n```'
+        self.assertEqual(parse_batch_response(response, 2), ["• Opening: Sicilian", "• Opening: French"])
+
+    def test_parse_batch_response_rejects_incomplete(self):
+        self.assertIsNone(parse_batch_response('[{"id": "g0", "analysis": "• Opening: Sicilian"}]', 2))
+        self.assertIsNone(parse_batch_response('• Opening: Sicilian', 1))
+
+    def test_batch_prompt_contains_every_game(self):
+        second = dict(self.test_game_data, white_player='player3')
+        prompt = build_batch_prompt([self.test_game_data, second])
+        self.assertIn('Game id: g0', prompt)
+        self.assertIn('Game id: g1', prompt)
+        self.assertIn('player3', prompt)
@@ -0,0 +1,46 @@
+import os
+import tempfile
+import unittest
+from analysis_cache import AnalysisCache, cache_key, normalize_pgn
+from providers import AnalysisError
+
+class TestAnalysisCache(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "analyses.db")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_cache_key_ignores_whitespace_but_not_model(self):
+        pgn = '[Event "Live Chess"]\n\n1. e4 e5 2. Nf3 Nc6'
+        self.assertEqual(normalize_pgn(pgn), '[Event "Live Chess"] 1. e4 e5 2. Nf3 Nc6')
+        self.assertEqual(cache_key(pgn, "gemini"), cache_key(pgn.replace('\n', ' '), "gemini"))
+        self.assertNotEqual(cache_key(pgn, "gemini"), cache_key(pgn, "gpt-4o"))
+        self.assertNotEqual(cache_key(pgn, "gemini", "1"), cache_key(pgn, "gemini", "2"))
+
+    def test_lru_eviction(self):
+        cache = AnalysisCache(max_entries=2, path=None)
+        cache.put("a", "analysis a")
+        cache.put("b", "analysis b")
+        cache.get("a")
+        cache.put("c", "analysis c")
+        self.assertEqual(cache.get("a"), "analysis a")
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("c"), "analysis c")
+
+    def test_disk_tier_survives_restart(self):
+        AnalysisCache(path=self.path).put("a", "analysis a")
+        reopened = AnalysisCache(path=self.path)
+        self.assertTrue(reopened.contains("a"))
+        self.assertFalse(reopened.contains("b"))
+        self.assertEqual((reopened.hits, reopened.misses), (0, 0))
+        self.assertEqual(reopened.get("a"), "analysis a")
+        self.assertEqual(reopened.hits, 1)
+
+    def test_failures_are_not_cached(self):
+        cache = AnalysisCache(path=None)
+        cache.put("a", AnalysisError("busy"))
+        cache.put("b", "Error: the opening blunder decided the game")
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.get("b"), "Error: the opening blunder decided the game")
@@ -0,0 +1,204 @@
+import json
+import time
+import threading
+import unittest
+from unittest.mock import patch
+from analysis_cache import AnalysisCache
+from analysis_engine import AnalysisEngine
+from providers import AnalysisError, NoProviderAvailable, NoProviderConfigured
+
+class TestAnalysisEngine(unittest.TestCase):
+    def setUp(self):
+        self.cache = AnalysisCache(path=None)
+        self.games = [{
+            'white_player': f'white{i}',
+            'white_rating': 1500,
+            'black_player': f'black{i}',
+            'black_rating': 1600,
+            'result': 'win',
+            'pgn': f'1. e4 e5 2. Nf3 Nc6 {i}'
+        } for i in range(6)]
+
+    @patch('ai_model.request_analysis')
+    def test_analyze_games_keeps_order(self, mock_request):
+        def fake_request(game_data, model, prompt):
+            # Later games finish first
+            time.sleep(0.01 * (6 - int(game_data['white_player'][5:])))
+            return f"analysis of {game_data['white_player']}"
+
+        mock_request.side_effect = fake_request
+        analyses = AnalysisEngine(max_workers=6, cache=self.cache, preanalyze=False).analyze_games(self.games)
+        self.assertEqual(analyses, [f"analysis of white{i}" for i in range(6)])
+
+    @patch('ai_model.request_analysis')
+    def test_concurrency_cap(self, mock_request):
+        active = []
+        peak = []
+        lock = threading.Lock()
+
+        def fake_request(game_data, model, prompt):
+            with lock:
+                active.append(1)
+                peak.append(len(active))
+            time.sleep(0.02)
+            with lock:
+                active.pop()
+            return "ok"
+
+        mock_request.side_effect = fake_request
+        AnalysisEngine(max_workers=2, cache=self.cache, preanalyze=False).analyze_games(self.games)
+        self.assertLessEqual(max(peak), 2)
+
+    @patch('time.sleep')
+    @patch('ai_model.request_analysis')
+    def test_retries_then_succeeds(self, mock_request, mock_sleep):
+        mock_request.side_effect = [Exception("503"), Exception("503"), "• Opening: Italian Game"]
+        result = AnalysisEngine(max_retries=3, cache=self.cache, preanalyze=False).analyze_one(self.games[0])
+        self.assertEqual(result, "• Opening: Italian Game")
+        self.assertEqual(mock_request.call_count, 3)
+
+    @patch('time.sleep')
+    @patch('ai_model.request_analysis')
+    def test_gives_up_after_retries(self, mock_request, mock_sleep):
+        mock_request.side_effect = Exception("503")
+        engine = AnalysisEngine(max_retries=2, cache=self.cache, preanalyze=False)
+        with self.assertRaises(AnalysisError):
+            engine.analyze_one(self.games[0])
+        self.assertEqual(mock_request.call_count, 3)
+        analyses = engine.analyze_games(self.games[:1])
+        self.assertIsInstance(analyses[0], AnalysisError)
+
+    @patch('time.sleep')
+    @patch('ai_model.request_analysis')
+    def test_missing_configuration_is_not_retried(self, mock_request, mock_sleep):
+        mock_request.side_effect = NoProviderConfigured()
+        engine = AnalysisEngine(max_retries=3, cache=self.cache, preanalyze=False)
+        with self.assertRaises(NoProviderConfigured):
+            engine.analyze_one(self.games[0])
+        self.assertEqual(mock_request.call_count, 1)
+        mock_sleep.assert_not_called()
+        # Providers that are only cooling down are still retried
+        mock_request.side_effect = [NoProviderAvailable([]), "• Opening: Italian Game"]
+        self.assertEqual(engine.analyze_one(self.games[0]), "• Opening: Italian Game")
+
+    @patch('ai_model.request_analysis')
+    def test_incomplete_game_is_skipped(self, mock_request):
+        mock_request.return_value = "ok"
+        games = [self.games[0], {'white_player': 'missing fields'}]
+        self.assertEqual(AnalysisEngine(cache=self.cache, preanalyze=False).analyze_games(games), ["ok", None])
+
+    @patch('ai_model.request_analysis')
+    def test_cached_games_skip_provider(self, mock_request):
+        mock_request.return_value = "• Opening: Italian Game"
+        engine = AnalysisEngine(cache=self.cache, preanalyze=False)
+        engine.analyze_games(self.games[:2])
+        engine.analyze_games(self.games[:2])
+        self.assertEqual(mock_request.call_count, 2)
+
+    @patch('time.sleep')
+    @patch('ai_model.request_analysis')
+    def test_failed_analysis_not_cached(self, mock_request, mock_sleep):
+        mock_request.side_effect = Exception("503")
+        engine = AnalysisEngine(max_retries=0, cache=self.cache, preanalyze=False)
+        engine.analyze_games(self.games[:1])
+        engine.analyze_games(self.games[:1])
+        self.assertEqual(mock_request.call_count, 2)
+
+    @patch('ai_model.complete')
+    def test_batch_mode_packs_games(self, mock_complete):
+        def fake_complete(prompt, model):
+            count = prompt.count('Game id:')
+            return json.dumps([{"id": f"g{i}", "analysis": f"batched {i}"} for i in range(count)])
+
+        mock_complete.side_effect = fake_complete
+        engine = AnalysisEngine(cache=self.cache, preanalyze=False, batch_token_budget=100000, batch_max_games=4)
+        analyses = engine.analyze_games(self.games)
+        # Six games in batches of at most four
+        self.assertEqual(mock_complete.call_count, 2)
+        self.assertTrue(all(analysis.startswith("batched") for analysis in analyses))
+
+    def test_plan_batches_respects_token_budget(self):
+        engine = AnalysisEngine(cache=self.cache, preanalyze=False, batch_token_budget=1, batch_max_games=10)
+        # A budget too small for any pair still sends every game, one per batch
+        self.assertEqual(engine.plan_batches(self.games), [[i] for i in range(6)])
+
+    @patch('ai_model.request_analysis')
+    @patch('ai_model.complete')
+    def test_batch_falls_back_to_single_calls(self, mock_complete, mock_request):
+        mock_complete.return_value = "not json"
+        mock_request.return_value = "single"
+        engine = AnalysisEngine(cache=self.cache, preanalyze=False, batch_token_budget=100000)
+        self.assertEqual(engine.analyze_games(self.games[:3]), ["single"] * 3)
+        self.assertEqual(mock_request.call_count, 3)
+
+    @patch('ai_model.request_analysis')
+    def test_preanalysis_skips_llm_for_quiet_games(self, mock_request):
+        mock_request.return_value = "llm analysis"
+        blunder = dict(self.games[0], pgn='1. e4 e5 2. Qh5 Nc6 3. Bc4 Nf6 4. Qxf7# 1-0')
+        quiet = dict(self.games[1], pgn='1. e4 e5 2. Nf3 Nc6')
+        engine = AnalysisEngine(cache=self.cache, preanalyze=True, preanalysis_depth=1)
+
+        analyses = engine.analyze_games([blunder, quiet])
+        self.assertEqual(analyses[0], "llm analysis")
+        self.assertIn("No blunders", analyses[1])
+        self.assertEqual(mock_request.call_count, 1)
+        # Each game is looked up in the cache once, however many stages check it
+        self.assertEqual((self.cache.hits, self.cache.misses), (0, 2))
+        # Only the critical positions of the blunder game were sent, not its PGN
+        prompt = mock_request.call_args.args[2]
+        self.assertIn("Critical positions", prompt)
+        self.assertIn("3... Nf6", prompt)
+        self.assertNotIn("PGN:", prompt)
+
+    @patch('ai_model.request_analysis')
+    def test_first_game_reaches_llm_before_later_games_are_replayed(self, mock_request):
+        first_call = threading.Event()
+        mock_request.side_effect = lambda *args: first_call.set() or "llm analysis"
+
+        def slow_replays(pgns, depth):
+            yield None
+            # The second replay only finishes once the first game is with the LLM
+            self.assertTrue(first_call.wait(5))
+            yield from [None] * (len(pgns) - 1)
+
+        engine = AnalysisEngine(cache=self.cache, preanalyze=True, max_workers=2)
+        with patch('preanalysis.iter_analyze_pgns', side_effect=slow_replays):
+            analyses = engine.analyze_games(self.games[:3])
+        self.assertEqual(analyses, ["llm analysis"] * 3)
+
+    @patch('ai_model.stream_analysis')
+    def test_streamed_analysis_reports_partial_text(self, mock_stream):
+        mock_stream.return_value = iter(["• Opening: ", "Italian ", "Game"])
+        engine = AnalysisEngine(cache=self.cache, preanalyze=False)
+        partials = []
+        results = list(engine.iter_analyses(self.games[:1], lambda index, text: partials.append((index, text))))
+        self.assertEqual(results, [(0, "• Opening: Italian Game")])
+        self.assertEqual(partials, [(0, "• Opening: "), (0, "• Opening: Italian "), (0, "• Opening: Italian Game")])
+        # The finished stream is cached like any other analysis
+        self.assertEqual(engine.analyze_one(self.games[0]), "• Opening: Italian Game")
+        self.assertEqual(mock_stream.call_count, 1)
+
+    @patch('ai_model.request_analysis')
+    def test_identical_concurrent_requests_share_one_call(self, mock_request):
+        started, release = threading.Event(), threading.Event()
+
+        def fake_request(game_data, model, prompt):
+            started.set()
+            release.wait(5)
+            return "shared analysis"
+
+        mock_request.side_effect = fake_request
+        engines = [AnalysisEngine(cache=AnalysisCache(path=None), preanalyze=False) for _ in range(3)]
+        results = []
+        threads = [threading.Thread(target=lambda engine=engine: results.append(engine.analyze_one(self.games[0])))
+                   for engine in engines]
+        threads[0].start()
+        started.wait(5)
+        for thread in threads[1:]:
+            thread.start()
+        time.sleep(0.05)
+        release.set()
+        for thread in threads:
+            thread.join(5)
+        self.assertEqual(results, ["shared analysis"] * 3)
+        self.assertEqual(mock_request.call_count, 1)
@@ -0,0 +1,112 @@
+import os
+import time
+import tempfile
+import threading
+import unittest
+from unittest.mock import patch, MagicMock
+import http_client
+from archive_store import ArchiveStore, parse_archive_url, is_closed_period
+
+class TestArchiveStore(unittest.TestCase):
+    def setUp(self):
+        http_client.reset_session()
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.store = ArchiveStore(os.path.join(self.tmpdir.name, "archives.db"), ttl=60)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_parse_archive_url(self):
+        self.assertEqual(
+            parse_archive_url("https://api.chess.com/pub/player/Test_User/games/2024/01"),
+            ("test_user", "2024/01")
+        )
+        self.assertEqual(
+            parse_archive_url("https://api.chess.com/pub/player/test_user/games/archives"),
+            ("test_user", "archives")
+        )
+        self.assertIsNone(parse_archive_url("https://api.chess.com/pub/player/test_user"))
+
+    def test_is_closed_period(self):
+        # 2024-03-15 UTC
+        now = 1710460800
+        self.assertTrue(is_closed_period("2024/02", now))
+        self.assertFalse(is_closed_period("2024/03", now))
+        self.assertFalse(is_closed_period("archives", now))
+
+    @patch('requests.Session.get')
+    def test_closed_month_served_from_disk(self, mock_get):
+        response = MagicMock(status_code=200, headers={"ETag": '"v1"'})
+        response.json.return_value = {"games": [{"url": "x"}]}
+        mock_get.return_value = response
+
+        url = "https://api.chess.com/pub/player/test_user/games/2020/01"
+        self.assertEqual(self.store.fetch_json(url), {"games": [{"url": "x"}]})
+        # A fresh store on the same file still has it, without touching the network
+        reopened = ArchiveStore(self.store.path, ttl=0)
+        self.assertEqual(reopened.fetch_json(url), {"games": [{"url": "x"}]})
+        self.assertEqual(mock_get.call_count, 1)
+
+    @patch('requests.Session.get')
+    def test_month_fetched_before_it_closed_is_revalidated_once(self, mock_get):
+        updated = MagicMock(status_code=200, headers={"ETag": '"v2"'})
+        updated.json.return_value = {"games": [{"url": "x"}, {"url": "y"}]}
+        mock_get.return_value = updated
+
+        url = "https://api.chess.com/pub/player/test_user/games/2024/01"
+        # Fetched on 2024-01-31 23:50 UTC, looked at on 2024-02-10
+        jan_31, feb_10 = 1706745000, 1707523200
+        self.store.put(url, {"games": [{"url": "x"}]}, etag='"v1"')
+        self.store._connection().execute("UPDATE archives SET fetched_at = ?", (jan_31,))
+        entry = self.store.get(url)
+        self.assertFalse(self.store.is_fresh(entry, now=feb_10))
+
+        self.assertEqual(len(self.store.fetch_json(url)["games"]), 2)
+        self.assertEqual(mock_get.call_args.kwargs["headers"]["If-None-Match"], '"v1"')
+        # Refetched after the month closed: kept for good
+        self.assertTrue(self.store.is_fresh(self.store.get(url), now=feb_10 + 10 ** 8))
+        self.store.fetch_json(url)
+        self.assertEqual(mock_get.call_count, 1)
+
+    @patch('requests.Session.get')
+    def test_current_month_revalidated_after_ttl(self, mock_get):
+        first = MagicMock(status_code=200, headers={"ETag": '"v1"'})
+        first.json.return_value = {"games": []}
+        not_modified = MagicMock(status_code=304, headers={})
+        mock_get.side_effect = [first, not_modified]
+
+        now = time.gmtime()
+        url = f"https://api.chess.com/pub/player/test_user/games/{now.tm_year}/{now.tm_mon:02d}"
+        self.store.fetch_json(url)
+        # Still within the TTL
+        self.store.fetch_json(url)
+        self.assertEqual(mock_get.call_count, 1)
+
+        self.store.ttl = 0
+        self.assertEqual(self.store.fetch_json(url), {"games": []})
+        self.assertEqual(mock_get.call_count, 2)
+        self.assertEqual(mock_get.call_args.kwargs["headers"]["If-None-Match"], '"v1"')
+
+    @patch('requests.Session.get')
+    def test_concurrent_fetches_share_one_download(self, mock_get):
+        release = threading.Event()
+        response = MagicMock(status_code=200, headers={})
+        response.json.return_value = {"games": []}
+
+        def slow_get(*args, **kwargs):
+            release.wait(5)
+            return response
+
+        mock_get.side_effect = slow_get
+        url = "https://api.chess.com/pub/player/test_user/games/2020/01"
+        results = []
+        threads = [threading.Thread(target=lambda u=u: results.append(self.store.fetch_json(u)))
+                   for u in (url, url, url.replace("test_user", "Test_User"))]
+        for thread in threads:
+            thread.start()
+        time.sleep(0.05)
+        release.set()
+        for thread in threads:
+            thread.join(5)
+        self.assertEqual(results, [{"games": []}] * 3)
+        self.assertEqual(mock_get.call_count, 1)
@@ -0,0 +1,88 @@
+import os
+import tempfile
+import datetime
+import threading
+import unittest
+from unittest.mock import patch
+from analysis_cache import AnalysisCache
+from analysis_engine import AnalysisEngine
+from batch import BatchRun, Checkpoint, format_summary, read_usernames
+
+def game(end_time, white, black):
+    return {
+        'end_time': end_time, 'white_player': white, 'black_player': black,
+        'white_rating': 1500, 'black_rating': 1500, 'result': 'win', 'time_control': '180',
+        'pgn': f'1. e4 e5 2. Nf3 Nc6 {end_time}'
+    }
+
+class TestBatch(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.checkpoint = Checkpoint("2024-01-01..2024-01-02", os.path.join(self.tmpdir.name, "checkpoint.db"))
+        self.games = {
+            'alice': [game(1, 'alice', 'bob'), game(2, 'alice', 'carol')],
+            'bob': [game(1, 'alice', 'bob'), game(3, 'dave', 'bob')]
+        }
+        self.start, self.end = datetime.datetime(2024, 1, 1), datetime.datetime(2024, 1, 2)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def run_batch(self):
+        engine = AnalysisEngine(cache=self.cache, preanalyze=False, max_retries=0)
+        batch = BatchRun(self.start, self.end, engine, self.checkpoint)
+        with patch.object(BatchRun, '_fetch', side_effect=lambda name: self.games[name]):
+            return batch.run(['alice', 'bob'])
+
+    def test_read_usernames(self):
+        path = os.path.join(self.tmpdir.name, "roster.txt")
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write("# club roster\nalice\n\nBob\nALICE\n")
+        self.assertEqual(read_usernames(path), ['alice', 'Bob'])
+
+    @patch('main.save_game_analyses', side_effect=lambda pairs: len(list(pairs)))
+    @patch('ai_model.request_analysis')
+    def test_resumes_after_failures(self, mock_request, mock_save):
+        self.cache = AnalysisCache(path=None)
+        def flaky_request(game_data, model, prompt):
+            if game_data['end_time'] == 3:
+                raise Exception("busy")
+            return f"• Game {game_data['end_time']}"
+
+        mock_request.side_effect = flaky_request
+        totals = self.run_batch()
+        # The game alice and bob played each other is analyzed once
+        self.assertEqual((totals['games'], totals['duplicates']), (3, 1))
+        self.assertEqual((totals['players'], totals['failed']), (1, 1))
+        self.assertEqual(self.checkpoint.finished(), {'alice'})
+        self.assertIn("games/s", format_summary(totals))
+
+        # The rerun skips alice and retries only bob's games
+        mock_request.reset_mock()
+        mock_request.side_effect = lambda game_data, model, prompt: f"• Game {game_data['end_time']}"
+        totals = self.run_batch()
+        self.assertEqual((totals['skipped'], totals['players'], totals['failed']), (1, 1, 0))
+        self.assertEqual(self.checkpoint.finished(), {'alice', 'bob'})
+        self.assertEqual(mock_request.call_count, 1)
+        self.assertEqual(totals['cache_hit_rate'], 0.5)
+
+    @patch('main.save_game_analyses', side_effect=lambda pairs: len(list(pairs)))
+    @patch('ai_model.request_analysis')
+    def test_players_are_analyzed_concurrently(self, mock_request, mock_save):
+        # One game in flight per player: the barrier only opens if both players are analyzed at once
+        both_players = threading.Barrier(2, timeout=5)
+        def request(game_data, model, prompt):
+            if game_data['end_time'] in (1, 3):
+                both_players.wait()
+            return f"• Game {game_data['end_time']}"
+
+        mock_request.side_effect = request
+        engine = AnalysisEngine(cache=AnalysisCache(path=None), preanalyze=False, max_retries=0, max_workers=1)
+        batch = BatchRun(self.start, self.end, engine, self.checkpoint, player_workers=2)
+        with patch.object(BatchRun, '_fetch', side_effect=lambda name: self.games[name]):
+            totals = batch.run(['alice', 'bob'])
+        self.assertEqual((totals['players'], totals['games'], totals['saved']), (2, 3, 3))
+        self.assertEqual(self.checkpoint.finished(), {'alice', 'bob'})
+
+if __name__ == '__main__':
+    unittest.main()
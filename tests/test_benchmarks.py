@@ -0,0 +1,78 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+import requests
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+
+import ai_model
+from fake_servers import FakeChessCom, FakeLLM
+from fixtures import synthetic_archive
+from main import ChessComAnalyzer
+from pgn_parser import parse_pgn
+
+class TestBenchmarks(unittest.TestCase):
+    def test_synthetic_archive(self):
+        archive = synthetic_archive('bench', 12, 2024, 2)
+        self.assertEqual(archive, synthetic_archive('bench', 12, 2024, 2))
+        games = archive['games']
+        self.assertEqual(len(games), 12)
+        self.assertEqual([g['end_time'] for g in games], sorted(g['end_time'] for g in games))
+        self.assertEqual(len({g['url'] for g in games}), 12)
+
+        game_data = ChessComAnalyzer('bench')._build_game_data(games[0])
+        self.assertEqual(game_data['white_player'], 'bench')
+        self.assertIsNotNone(game_data['opening'])
+        parsed = parse_pgn(games[0]['pgn'])
+        self.assertEqual(len(parsed), 33)
+        self.assertIsNotNone(parsed.clock(0))
+
+    def test_fake_chesscom(self):
+        with FakeChessCom({'Bench': {'2024/01': synthetic_archive('bench', 3, 2024, 1)}}) as server:
+            archives = requests.get(f'{server.url}/pub/player/bench/games/archives').json()['archives']
+            self.assertEqual(archives, [f'{server.url}/pub/player/bench/games/2024/01'])
+            response = requests.get(archives[0])
+            self.assertEqual(len(response.json()['games']), 3)
+            not_modified = requests.get(archives[0], headers={'If-None-Match': response.headers['ETag']})
+            self.assertEqual(not_modified.status_code, 304)
+            self.assertEqual(requests.get(f'{server.url}/pub/player/nobody/games/archives').status_code, 404)
+            self.assertEqual(server.stats()['requests'], {'archives': 1, 'archive': 1, 'not_modified': 1, 'not_found': 1})
+
+    def test_fake_llm(self):
+        games = [{'white_player': 'alice', 'white_rating': 1500, 'black_player': 'bob', 'black_rating': 1400,
+                  'result': 'win', 'pgn': '1. e4 e5 2. Nf3 Nc6 1-0'}] * 2
+        with FakeLLM() as server:
+            url = f'{server.url}/v1/chat/completions'
+            single = requests.post(url, json={'messages': [{'content': ai_model.build_prompt(games[0])}]}).json()
+            text = single['choices'][0]['message']['content']
+            self.assertTrue(text.startswith('• Opening:'))
+            self.assertIn('alice', text)
+            batch = requests.post(url, json={'messages': [{'content': ai_model.build_batch_prompt(games)}]}).json()
+            analyses = ai_model.parse_batch_response(batch['choices'][0]['message']['content'], 2)
+            self.assertEqual(len(analyses), 2)
+            server.error_rate = 1.0
+            self.assertEqual(requests.post(url, json={'messages': [{'content': 'x'}]}).status_code, 500)
+            self.assertEqual(server.stats()['requests'], {'completion': 2, 'error': 1})
+
+    def test_pipeline_counts_requests(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            report_path = os.path.join(tmp, 'report.json')
+            subprocess.run([sys.executable, 'benchmarks/pipeline.py', '--sizes', '10', '--llm-latency', '0',
+                            '--no-memory', '--json', report_path],
+                           cwd=ROOT, capture_output=True, text=True, check=True)
+            with open(report_path) as f:
+                cold, warm = json.load(f)['results']
+        self.assertEqual((cold['games'], cold['analyzed']), (10, 10))
+        self.assertEqual(cold['stages']['fetch']['chesscom_requests'], 2)
+        self.assertEqual(cold['stages']['analyze']['llm_requests'], 10)
+        # The closed month and every analysis come from the caches the cold run filled
+        self.assertEqual(warm['stages']['fetch']['chesscom_requests'], 0)
+        self.assertEqual(warm['stages']['analyze']['llm_requests'], 0)
+        self.assertEqual(warm['cache_hits'], 10)
+
+if __name__ == '__main__':
+    unittest.main()
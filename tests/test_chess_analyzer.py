@@ -1,12 +1,45 @@
+import os
+import tempfile
 import unittest
+import requests
 from unittest.mock import patch, MagicMock
-from main import ChessComAnalyzer
+import http_client
+from archive_store import ArchiveStore
+from game_store import GameStore
+from providers import AnalysisError
+import datetime
+from main import ChessComAnalyzer, GameFilter, archive_urls_in_range
+
+def make_game(game_id, end_time):
+    """An archive game test_user won with White"""
+    return {
+        "url": f"https://www.chess.com/game/live/{game_id}",
+        "end_time": end_time,
+        "white": {"username": "test_user", "rating": 1500, "result": "win"},
+        "black": {"username": "opponent", "rating": 1600, "result": "checkmated"},
+        "time_control": "600",
+        "pgn": "1. e4 e5"
+    }
+
+def serve_json(bodies, response_headers=None):
+    """requests.Session.get side effect answering each URL with its body from bodies"""
+    def get(url, headers=None, timeout=None):
+        response = MagicMock(status_code=200, headers=dict(response_headers or {}))
+        response.json.return_value = bodies[url]
+        return response
+    return get
 
 class TestChessComAnalyzer(unittest.TestCase):
     def setUp(self):
-        self.analyzer = ChessComAnalyzer("test_user")
+        http_client.reset_session()
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.store = ArchiveStore(os.path.join(self.tmpdir.name, "archives.db"))
+        self.analyzer = ChessComAnalyzer("test_user", archive_store=self.store)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
         
-    @patch('requests.get')
+    @patch('requests.Session.get')
     def test_get_player_info_success(self, mock_get):
         # Mock successful API response
         mock_response = MagicMock()
@@ -21,7 +54,7 @@ class TestChessComAnalyzer(unittest.TestCase):
         result = self.analyzer.get_player_info()
         self.assertEqual(result["username"], "test_user")
         
-    @patch('requests.get')
+    @patch('requests.Session.get')
     def test_get_player_info_failure(self, mock_get):
         # Mock failed API response
         mock_get.side_effect = Exception("API Error")
@@ -29,7 +62,7 @@ class TestChessComAnalyzer(unittest.TestCase):
         result = self.analyzer.get_player_info()
         self.assertIn("error", result)
         
-    @patch('requests.get')
+    @patch('requests.Session.get')
     def test_get_all_games(self, mock_get):
         # Mock successful archives response
         mock_archives_response = MagicMock()
@@ -51,7 +84,7 @@ class TestChessComAnalyzer(unittest.TestCase):
         }
         
         # Configure mock to return different responses for different URLs
-        def mock_get_side_effect(url, headers):
+        def mock_get_side_effect(url, headers=None, timeout=None):
             if url.endswith("archives"):
                 return mock_archives_response
             return mock_games_response
@@ -62,6 +95,125 @@ class TestChessComAnalyzer(unittest.TestCase):
         self.assertEqual(len(games), 1)
         self.assertEqual(games[0]["white_player"], "test_user")
 
+    @patch('requests.Session.get')
+    def test_get_all_games_skips_player_info(self, mock_get):
+        mock_archives_response = MagicMock(status_code=200, headers={})
+        mock_archives_response.json.return_value = {"archives": []}
+        mock_get.return_value = mock_archives_response
+
+        self.assertEqual(self.analyzer.get_all_games(), [])
+        # Only the archives list is requested
+        self.assertEqual(mock_get.call_count, 1)
+        self.assertTrue(mock_get.call_args.args[0].endswith("/games/archives"))
+
+    @patch('requests.Session.get')
+    def test_get_all_games_unknown_player(self, mock_get):
+        mock_response = MagicMock(status_code=404, headers={})
+        mock_response.raise_for_status.side_effect = requests.exceptions.HTTPError(response=mock_response)
+        mock_get.return_value = mock_response
+
+        result = self.analyzer.get_all_games()
+        self.assertIn("not found", result["error"])
+
+    def test_archive_urls_in_range(self):
+        base = "https://api.chess.com/pub/player/test_user/games"
+        urls = [f"{base}/2023/12", f"{base}/2024/01", f"{base}/2024/02", f"{base}/2024/03"]
+        utc = datetime.timezone.utc
+        start = datetime.datetime(2024, 1, 20, tzinfo=utc)
+        end = datetime.datetime(2024, 2, 10, tzinfo=utc)
+        self.assertEqual(archive_urls_in_range(urls, start, end), [f"{base}/2024/01", f"{base}/2024/02"])
+
+    @patch('requests.Session.get')
+    def test_get_games_in_range_spans_months(self, mock_get):
+        base = "https://api.chess.com/pub/player/test_user/games"
+
+        bodies = {
+            f"{base}/archives": {"archives": [f"{base}/2023/12", f"{base}/2024/01", f"{base}/2024/02"]},
+            f"{base}/2024/01": {"games": [make_game(3, 1706000000), make_game(2, 1705000000), make_game(1, 1704000000)]},
+            f"{base}/2024/02": {"games": [make_game(4, 1707000000)]}
+        }
+
+        mock_get.side_effect = serve_json(bodies)
+
+        utc = datetime.timezone.utc
+        games = self.analyzer.get_games_in_range(
+            datetime.datetime(2024, 1, 5, tzinfo=utc),
+            datetime.datetime(2024, 2, 29, tzinfo=utc)
+        )
+        # Game 1 ended before the window; the rest come back in end_time order
+        self.assertEqual([g["game_id"] for g in games], ["2", "3", "4"])
+        # The December archive was never requested
+        requested = [call.args[0] for call in mock_get.call_args_list]
+        self.assertNotIn(f"{base}/2023/12", requested)
+
+    @patch('requests.Session.get')
+    def test_sync_fetches_only_new_games(self, mock_get):
+        base = "https://api.chess.com/pub/player/test_user/games"
+
+        bodies = {
+            f"{base}/archives": {"archives": [f"{base}/2024/01"]},
+            f"{base}/2024/01": {"games": [make_game(2, 1704200000), make_game(1, 1704100000)]}
+        }
+
+        mock_get.side_effect = serve_json(bodies, {"ETag": '"jan"'})
+        game_store = GameStore(os.path.join(self.tmpdir.name, "games.db"))
+
+        # First sync: the second game's analysis failed, so the watermark stops after the first
+        sync = self.analyzer.fetch_new_games(game_store)
+        self.assertEqual([g["game_id"] for g in sync["games"]], ["1", "2"])
+        self.assertEqual(self.analyzer.save_synced_games(sync, ["• Opening: A", AnalysisError("busy")], game_store), 1)
+        self.assertEqual(game_store.get_watermark("test_user")["last_end_time"], 1704100000)
+
+        sync = self.analyzer.fetch_new_games(game_store)
+        self.assertEqual([g["game_id"] for g in sync["games"]], ["2"])
+        self.analyzer.save_synced_games(sync, ["• Opening: B"], game_store)
+        self.assertEqual(game_store.get_watermark("test_user")["etag"], '"jan"')
+        self.assertEqual(len(game_store.player_games("test_user")), 2)
+
+        # Nothing new: the unchanged archive is not even decoded
+        with patch.object(self.store, 'fetch_json', wraps=self.store.fetch_json) as fetch_json:
+            sync = self.analyzer.fetch_new_games(game_store)
+        self.assertEqual(sync["games"], [])
+        self.assertNotIn(f"{base}/2024/01", [call.args[0] for call in fetch_json.call_args_list])
+
+    def test_game_filter(self):
+        utc = datetime.timezone.utc
+        game = {
+            "end_time": 1704067200,
+            "time_control": "180+2",
+            "time_class": "blitz",
+            "white": {"result": "win"},
+            "black": {"result": "resigned"}
+        }
+        self.assertTrue(GameFilter().matches(game))
+        self.assertTrue(GameFilter(start=datetime.datetime(2023, 12, 31, tzinfo=utc)).matches(game))
+        self.assertFalse(GameFilter(start=datetime.datetime(2024, 1, 2, tzinfo=utc)).matches(game))
+        self.assertFalse(GameFilter(end=datetime.datetime(2023, 12, 31, tzinfo=utc)).matches(game))
+        self.assertTrue(GameFilter(time_controls=["blitz"]).matches(game))
+        self.assertTrue(GameFilter(time_controls=["180+2"]).matches(game))
+        self.assertFalse(GameFilter(time_controls=["bullet"]).matches(game))
+        self.assertTrue(GameFilter(results=["win"]).matches(game))
+        self.assertFalse(GameFilter(results=["draw"]).matches(game))
+
+    @patch('main.ChessComAnalyzer._build_game_data')
+    @patch('requests.Session.get')
+    def test_get_all_games_only_builds_matching_games(self, mock_get, mock_build):
+        base = "https://api.chess.com/pub/player/test_user/games"
+        bodies = {
+            f"{base}/archives": {"archives": [f"{base}/2024/01"]},
+            f"{base}/2024/01": {"games": [
+                {"end_time": 1704067200 + i, "time_class": "bullet" if i % 2 else "blitz"}
+                for i in range(10)
+            ]}
+        }
+
+        mock_get.side_effect = serve_json(bodies)
+        mock_build.side_effect = lambda game: {"end_time": game["end_time"]}
+
+        games = self.analyzer.get_all_games(GameFilter(time_controls=["blitz"]))
+        self.assertEqual(len(games), 5)
+        self.assertEqual(mock_build.call_count, 5)
+
     def test_get_result(self):
         # Test win result
         game_data = {"white": {"result": "win"}}
@@ -0,0 +1,76 @@
+import os
+import csv
+import tempfile
+import unittest
+from game_store import GameStore, build_row, make_game_id
+
+class TestGameStore(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.store = GameStore(os.path.join(self.tmpdir.name, "games.db"))
+        self.game_data = {
+            'end_time': 1704067200,
+            'white_player': 'player1',
+            'white_rating': 1500,
+            'black_player': 'player2',
+            'black_rating': 1600,
+            'result': 'win',
+            'time_control': '600',
+            'pgn': '1. e4 e5 2. Nf3 Nc6'
+        }
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_make_game_id_matches_csv_format(self):
+        self.assertEqual(make_game_id(self.game_data), "1704067200_player1_player2")
+
+    def test_save_is_an_upsert(self):
+        self.store.save_game(build_row(self.game_data, "first analysis"))
+        self.store.save_game(build_row(self.game_data, "second analysis"))
+        self.assertEqual(self.store.count(), 1)
+        self.assertEqual(self.store.get_game("1704067200_player1_player2")["analysis"], "second analysis")
+
+    def test_save_games_in_batches(self):
+        rows = []
+        for i in range(1200):
+            game = dict(self.game_data, end_time=1704067200 + i)
+            rows.append(build_row(game, f"analysis {i}"))
+        self.assertEqual(self.store.save_games(rows), 1200)
+        self.assertEqual(self.store.count(), 1200)
+        self.assertTrue(self.store.has_game("1704067300_player1_player2"))
+
+    def test_import_csv(self):
+        csv_path = os.path.join(self.tmpdir.name, "chessdb.csv")
+        fields = ['game_id', 'date', 'white_player', 'white_rating', 'black_player',
+                  'black_rating', 'result', 'time_control', 'analysis', 'pgn']
+        with open(csv_path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=fields)
+            writer.writeheader()
+            writer.writerow({
+                'game_id': '1704067200_player1_player2', 'date': '2024-01-01 00:00:00',
+                'white_player': 'player1', 'white_rating': 1500, 'black_player': 'player2',
+                'black_rating': 1600, 'result': 'win', 'time_control': '600',
+                'analysis': '• Opening: Italian Game', 'pgn': '1. e4 e5'
+            })
+
+        self.assertEqual(self.store.import_csv(csv_path), 1)
+        game = self.store.get_game('1704067200_player1_player2')
+        self.assertEqual(game['end_time'], 1704067200)
+        self.assertEqual(game['analysis'], '• Opening: Italian Game')
+
+    def test_player_games_newest_first(self):
+        self.store.save_game(build_row(self.game_data, "as white"))
+        self.store.save_game(build_row(dict(self.game_data, end_time=1704067300, white_player='player3',
+                                            black_player='Player1'), "as black"))
+        self.store.save_game(build_row(dict(self.game_data, white_player='player3'), "not played"))
+        games = self.store.player_games('PLAYER1')
+        self.assertEqual([game['analysis'] for game in games], ["as black", "as white"])
+        self.assertEqual(len(self.store.player_games('player1', limit=1)), 1)
+
+    def test_sync_watermark(self):
+        self.assertIsNone(self.store.get_watermark('player1'))
+        self.store.set_watermark('Player1', 1704067200, 'https://api.chess.com/pub/player/player1/games/2024/01', '"abc"')
+        self.store.set_watermark('player1', 1704067300)
+        watermark = self.store.get_watermark('PLAYER1')
+        self.assertEqual((watermark['last_end_time'], watermark['etag']), (1704067300, None))
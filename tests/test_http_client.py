@@ -0,0 +1,61 @@
+import unittest
+from unittest.mock import patch, MagicMock
+import http_client
+
+class TestHttpClient(unittest.TestCase):
+    def setUp(self):
+        http_client.reset_session()
+
+    def tearDown(self):
+        http_client.reset_session()
+
+    def test_session_is_shared(self):
+        self.assertIs(http_client.get_session(), http_client.get_session())
+
+    @patch('requests.Session.get')
+    def test_conditional_get_sends_validators(self, mock_get):
+        mock_get.return_value = MagicMock(status_code=304, headers={})
+
+        url = "https://api.chess.com/pub/player/test_user/games/archives"
+        result = http_client.conditional_get(url, etag='"abc"', last_modified="Mon, 01 Jan 2024 00:00:00 GMT")
+        self.assertTrue(result["not_modified"])
+        self.assertEqual(result["etag"], '"abc"')
+
+        sent_headers = mock_get.call_args.kwargs["headers"]
+        self.assertEqual(sent_headers["If-None-Match"], '"abc"')
+        self.assertEqual(sent_headers["If-Modified-Since"], "Mon, 01 Jan 2024 00:00:00 GMT")
+        mock_get.return_value.json.assert_not_called()
+
+    @patch('requests.Session.get')
+    def test_get_json_sends_no_validators(self, mock_get):
+        response = MagicMock(status_code=200, headers={"ETag": '"abc"'})
+        response.json.return_value = {"username": "test_user"}
+        mock_get.return_value = response
+
+        url = "https://api.chess.com/pub/player/test_user"
+        http_client.get_json(url)
+        http_client.get_json(url)
+        self.assertNotIn("If-None-Match", mock_get.call_args.kwargs["headers"] or {})
+
+    @patch('time.sleep')
+    @patch('requests.Session.get')
+    def test_get_retries_after_429(self, mock_get, mock_sleep):
+        throttled = MagicMock(status_code=429, headers={"Retry-After": "2"})
+        ok = MagicMock(status_code=200, headers={})
+        ok.json.return_value = {"username": "test_user"}
+        mock_get.side_effect = [throttled, ok]
+
+        result = http_client.get_json("https://api.chess.com/pub/player/test_user")
+        self.assertEqual(result, {"username": "test_user"})
+        self.assertEqual(mock_get.call_count, 2)
+        mock_sleep.assert_any_call(2.0)
+
+    def test_retry_after_is_clamped(self):
+        def wait(value):
+            return http_client._retry_after(MagicMock(headers={"Retry-After": value}), 0)
+
+        with patch.object(http_client, 'RETRY_AFTER_CAP', 15.0):
+            self.assertEqual(wait("3600"), 15.0)
+            self.assertEqual(wait("-5"), 0.0)
+            self.assertEqual(wait("2.5"), 2.5)
+            self.assertLessEqual(wait("inf"), 15.0)
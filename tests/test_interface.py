@@ -1,7 +1,11 @@
 import unittest
 from unittest.mock import patch, MagicMock
 import gradio as gr
-from interface import format_results_as_html, analyze_and_format
+from interface import format_results_as_html, analyze_and_format, iter_analysis_updates, show_statistics, \
+    submit_analysis_job, job_results, format_stats_as_html, BUSY_MESSAGE
+from jobs import get_job_queue
+from providers import AnalysisError
+from stats import player_stats
 
 class TestInterface(unittest.TestCase):
     def setUp(self):
@@ -40,4 +44,78 @@ class TestInterface(unittest.TestCase):
         
         status, results = analyze_and_format('test_user', 'All')
         self.assertIn('No games found', status)
-        self.assertEqual(results, '') 
\ No newline at end of file
+        self.assertEqual(results, '')
+
+    @patch('interface.AnalysisEngine')
+    @patch('main.ChessComAnalyzer')
+    def test_iter_analysis_updates_streams_each_game(self, mock_analyzer, mock_engine):
+        mock_analyzer.return_value.get_all_games.return_value = [
+            {'end_time': 1704067200, 'white_player': 'player1', 'black_player': 'player2', 'result': 'win'},
+            {'end_time': 1704153600, 'white_player': 'player3', 'black_player': 'player4', 'result': 'win'}
+        ]
+        mock_engine.return_value.iter_analyses.return_value = iter([(1, '• Opening: French'), (0, AnalysisError('quota'))])
+
+        updates = list(iter_analysis_updates('test_user', 'All'))
+        statuses = [status for status, _ in updates]
+        self.assertIn('Analyzed 1 of 2 games...', statuses)
+        self.assertIn('Analyzed 2 of 2 games...', statuses)
+        # The first game shows up before the second one is done
+        partial = updates[statuses.index('Analyzed 1 of 2 games...')][1]
+        self.assertIn('player3', partial)
+        self.assertNotIn('player1', partial)
+        self.assertEqual(updates[-1][0], '')
+        self.assertIn('player1', updates[-1][1])
+        self.assertIn(BUSY_MESSAGE, updates[-1][1])
+
+    @patch('main.save_game_analyses')
+    @patch('interface.AnalysisEngine')
+    @patch('main.ChessComAnalyzer')
+    def test_job_results_returns_analyses(self, mock_analyzer, mock_engine, mock_save):
+        mock_analyzer.return_value.get_all_games.return_value = [
+            {'end_time': 1704067200, 'white_player': 'player1', 'black_player': 'player2', 'result': 'win'},
+            {'end_time': 1704153600, 'white_player': 'player3', 'black_player': 'player4', 'result': 'draw'}
+        ]
+        mock_engine.return_value.iter_analyses.return_value = iter([(0, '• Opening: Sicilian'), (1, AnalysisError('quota'))])
+
+        job_id = submit_analysis_job('results_user', 'All')
+        list(get_job_queue().follow(job_id, timeout=5))
+        results = job_results(job_id)
+        self.assertEqual(results['status'], 'done')
+        self.assertEqual([game['white_player'] for game in results['games']], ['player3', 'player1'])
+        self.assertEqual(results['games'][1]['game_id'], '1704067200_player1_player2')
+        self.assertEqual(results['games'][1]['analysis'], '• Opening: Sicilian')
+        self.assertEqual((results['games'][0]['analysis'], results['games'][0]['error']), (None, BUSY_MESSAGE))
+        mock_save.assert_called_once()
+        self.assertEqual(len(list(mock_save.call_args[0][0])), 1)
+        self.assertIn('error', job_results('missing'))
+
+    @patch('main.ChessComAnalyzer')
+    def test_show_statistics(self, mock_analyzer):
+        mock_analyzer.return_value.get_games_in_range.return_value = [{
+            'end_time': 1704067200, 'white_player': 'test_user', 'black_player': 'player2',
+            'white_rating': 1500, 'black_rating': 1400, 'result': 'win', 'time_control': '180',
+            'pgn': '[Result "1-0"]\n\n1. e4 e5 1-0'
+        }]
+
+        status, html = show_statistics('test_user', 'Last 30 days', False)
+        self.assertEqual(status, 'Games: 1')
+        self.assertIn('By time control', html)
+        self.assertIn('100%', html)
+
+        with patch('interface.summarize_with_llm', side_effect=AnalysisError('quota')):
+            status, html = show_statistics('test_user', 'Last 30 days', True)
+        self.assertIn(BUSY_MESSAGE, html)
+
+    def test_stats_html_escapes_text(self):
+        stats = player_stats('<b>me</b>', [{
+            'end_time': 1704067200, 'white_player': '<b>me</b>', 'black_player': 'player2',
+            'white_rating': 1500, 'black_rating': 1400, 'result': 'win', 'time_control': '180',
+            'eco': 'C20', 'opening': "King's Pawn <script>", 'pgn': '[Result "1-0"]\n\n1. e4 e5 1-0'
+        }])
+        html = format_stats_as_html(stats, '• Plays <i>e4</i>')
+        self.assertNotIn('<b>', html)
+        self.assertNotIn('<script>', html)
+        self.assertNotIn('<i>', html)
+        self.assertIn('&lt;b&gt;me&lt;/b&gt;', html)
+        self.assertIn('class="summary"', html)
+        self.assertNotIn('style=', html)
@@ -0,0 +1,73 @@
+import threading
+import unittest
+from jobs import DONE, DRAFT, FAILED, JobQueue
+
+class TestJobs(unittest.TestCase):
+    def setUp(self):
+        self.queue = JobQueue(max_workers=2)
+
+    def test_progress_and_results(self):
+        def work(job, count):
+            job.total = count
+            for index in range(count):
+                job.report(f"Step {index + 1}", index * 10)
+            job.report("")
+
+        job_id = self.queue.submit('a', work, 3)
+        events = list(self.queue.follow(job_id))
+        self.assertEqual(events[0], ('Queued...', None))
+        self.assertEqual(events[1:], [('Step 1', 0), ('Step 2', 10), ('Step 3', 20), ('', None)])
+        self.assertEqual(self.queue.results(job_id), [0, 10, 20])
+        status = self.queue.status(job_id)
+        self.assertEqual((status['status'], status['total'], status['completed']), (DONE, 3, 3))
+
+    def test_identical_jobs_are_deduplicated(self):
+        release = threading.Event()
+        calls = []
+
+        def work(job):
+            calls.append(1)
+            release.wait(5)
+
+        first = self.queue.submit(('user', 'All'), work)
+        second = self.queue.submit(('user', 'All'), work)
+        other = self.queue.submit(('user', 'Today'), work)
+        self.assertEqual(first, second)
+        self.assertNotEqual(first, other)
+        release.set()
+        list(self.queue.follow(first))
+        list(self.queue.follow(other))
+        self.assertEqual(len(calls), 2)
+        # A finished job is not reused
+        self.assertNotEqual(self.queue.submit(('user', 'All'), lambda job: None), first)
+
+    def test_drafts_are_replaced_by_results(self):
+        def work(job):
+            job.report("Analyzing...")
+            job.report_draft(0, "• Open")
+            job.report_draft(0, "• Opening: French")
+            job.report("Analyzed 1 of 1 games...", "• Opening: French Defense", slot=0)
+
+        job_id = self.queue.submit('c', work)
+        list(self.queue.follow(job_id))
+        self.assertNotIn(DRAFT, [result for _, result in self.queue.follow(job_id)])
+        events = list(self.queue.follow(job_id, drafts=True))
+        self.assertEqual(events[2:], [('Analyzing...', DRAFT), ('Analyzing...', DRAFT),
+                                      ('Analyzed 1 of 1 games...', '• Opening: French Defense')])
+        self.assertEqual(self.queue.get(job_id).draft_snapshot(), {})
+
+    def test_failed_job(self):
+        def work(job):
+            raise RuntimeError('boom')
+
+        job_id = self.queue.submit('b', work)
+        events = list(self.queue.follow(job_id))
+        self.assertEqual(events[-1], ('Error: boom', None))
+        self.assertEqual(self.queue.status(job_id)['status'], FAILED)
+
+    def test_unknown_job(self):
+        self.assertIn('error', self.queue.status('missing'))
+        self.assertEqual(list(self.queue.follow('missing')), [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,47 @@
+import os
+import json
+import tempfile
+import unittest
+from metrics import Metrics, get_metrics, write_snapshot
+from providers import ProviderRouter
+from test_providers import FakeProvider
+
+class TestMetrics(unittest.TestCase):
+    def test_counters_and_timers(self):
+        metrics = Metrics()
+        metrics.incr("http.requests")
+        metrics.incr("http.bytes", 2048)
+        for seconds in (0.1, 0.2, 0.3):
+            metrics.observe("http.latency", seconds)
+        with self.assertRaises(ValueError):
+            with metrics.timer("stage.fetch"):
+                raise ValueError("failed stages are timed too")
+        snapshot = metrics.snapshot()
+        self.assertEqual(snapshot["counters"], {"http.bytes": 2048, "http.requests": 1})
+        latency = snapshot["timers"]["http.latency"]
+        self.assertEqual((latency["count"], latency["p50_ms"], latency["max_ms"]), (3, 200.0, 300.0))
+        self.assertEqual(snapshot["timers"]["stage.fetch"]["count"], 1)
+        metrics.reset()
+        self.assertEqual(metrics.snapshot()["counters"], {})
+
+    def test_provider_calls_are_counted(self):
+        before = get_metrics().snapshot()["counters"]
+        router = ProviderRouter([FakeProvider("gemini", [Exception("down")]), FakeProvider("gpt-4o", [])])
+        router.complete("x" * 400)
+        after = get_metrics().snapshot()
+        self.assertEqual(after["counters"]["llm.calls"] - before.get("llm.calls", 0), 2)
+        self.assertEqual(after["counters"]["llm.gemini.errors"] - before.get("llm.gemini.errors", 0), 1)
+        self.assertIn("llm.gpt-4o.latency", after["timers"])
+
+    def test_write_snapshot_appends_json_lines(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "metrics.jsonl")
+            write_snapshot(path)
+            write_snapshot(path)
+            with open(path, encoding="utf-8") as f:
+                lines = [json.loads(line) for line in f]
+        self.assertEqual(len(lines), 2)
+        self.assertIn("timers", lines[0])
+
+if __name__ == '__main__':
+    unittest.main()
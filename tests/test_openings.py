@@ -0,0 +1,42 @@
+import os
+import tempfile
+import unittest
+from openings import OpeningClassifier, classify_pgn, san_moves
+from main import GameFilter
+
+class TestOpenings(unittest.TestCase):
+    def test_san_moves_strips_pgn_markup(self):
+        pgn = '[Event "Live Chess"]\n\n1. e4 {[%clk 0:02:59.9]} 1... c5 {[%clk 0:02:59]} 2. Nf3!? $1 d6 1-0'
+        self.assertEqual(san_moves(pgn), ['e4', 'c5', 'Nf3', 'd6'])
+        self.assertEqual(san_moves(pgn, limit=2), ['e4', 'c5'])
+
+    def test_longest_prefix_wins(self):
+        self.assertEqual(classify_pgn('1. e4 e5 2. Nf3 Nc6 3. Bc4 Bc5 4. Nc3'),
+                         {'eco': 'C50', 'name': 'Giuoco Piano'})
+        self.assertEqual(classify_pgn('1. e4 c5 2. Nf3 d6 3. d4 cxd4 4. Nxd4 Nf6 5. Nc3 a6 6. Be3')['eco'], 'B90')
+        # Leaves the table after 2...Nc6, so the deepest opening reached is used
+        self.assertEqual(classify_pgn('1. e4 e5 2. Nf3 Nc6 3. h3')['name'], "King's Pawn Game: Normal Variation")
+
+    def test_header_fallback(self):
+        pgn = ('[ECO "A00"]\n[ECOUrl "https://www.chess.com/openings/Kadas-Opening"]\n\n'
+               '1. h4 d5 2. g3 e5 1-0')
+        self.assertEqual(classify_pgn(pgn), {'eco': 'A00', 'name': 'Kadas Opening'})
+        self.assertIsNone(classify_pgn('1. h4 d5'))
+
+    def test_custom_table(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'eco.tsv')
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write('# eco\tname\tmoves\nZ00\tTest Opening\t1. a4 a5\n')
+            classifier = OpeningClassifier(path)
+        self.assertEqual(classifier.classify_moves(['a4', 'a5', 'b4'])['eco'], 'Z00')
+        self.assertIsNone(classifier.classify_moves(['a4']))
+
+    def test_game_filter_by_eco(self):
+        game = {'end_time': 1, 'pgn': '1. e4 c5 2. Nf3 d6', 'white': {}, 'black': {}}
+        self.assertTrue(GameFilter(ecos=['B']).matches(game))
+        self.assertTrue(GameFilter(ecos=['B50']).matches(game))
+        self.assertFalse(GameFilter(ecos=['C5']).matches(game))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,49 @@
+import unittest
+from pgn_parser import NO_CLOCK, format_clock, iter_parsed, parse_headers, parse_pgn
+
+PGN = ('[Event "Live Chess"]\n[Site "Chess.com"]\n[White "player1"]\n[Black "player2"]\n[Result "1-0"]\n\n'
+       '1. e4 {[%clk 0:02:59.9]} 1... e5 {[%clk 0:02:58]} 2. Qh5 {[%clk 0:02:57.1]} 2... Nc6 {[%clk 0:02:50]} '
+       '3. Bc4 {[%clk 0:02:56]} 3... Nf6?? {[%clk 0:02:40]} 4. Qxf7# {[%clk 0:02:55]} 1-0\n')
+
+class TestPgnParser(unittest.TestCase):
+    def test_parses_headers_moves_and_clocks(self):
+        game = parse_pgn(PGN)
+        self.assertEqual(game.header('White'), 'player1')
+        self.assertEqual(game.result, '1-0')
+        self.assertEqual(len(game), 7)
+        self.assertEqual(game.san(), ['e4', 'e5', 'Qh5', 'Nc6', 'Bc4', 'Nf6', 'Qxf7#'])
+        self.assertEqual(game.clocks.tolist(), [1799, 1780, 1771, 1700, 1760, 1600, 1750])
+        self.assertEqual(game.clock(0), 179.9)
+        self.assertEqual(game.move_label(5), '3...')
+
+    def test_moves_share_san_table(self):
+        first, second = parse_pgn(PGN), parse_pgn('1. e4 c5')
+        self.assertEqual(first.moves[0], second.moves[0])
+        self.assertEqual(first.moves.itemsize, 4)
+
+    def test_movetext(self):
+        game = parse_pgn(PGN)
+        self.assertEqual(game.movetext(stop=4), '1. e4 e5 2. Qh5 Nc6')
+        self.assertEqual(game.movetext(clocks=[5]),
+                         '1. e4 e5 2. Qh5 Nc6 3. Bc4 Nf6 {[%clk 0:02:40]} 4. Qxf7#')
+        self.assertEqual(format_clock(1799), '0:02:59.9')
+
+    def test_max_plies_and_missing_clocks(self):
+        game = parse_pgn('1. d4 d5 2. c4 e6 3. Nc3', max_plies=3)
+        self.assertEqual(game.san(), ['d4', 'd5', 'c4'])
+        self.assertIsNone(game.clock(0))
+        self.assertEqual(game.clocks[2], NO_CLOCK)
+
+    def test_skips_variations_and_black_start(self):
+        game = parse_pgn('[SetUp "1"]\n\n5... Nf6 (5... Nc6 6. d4) 6. d4 $1 ; comment\n*')
+        self.assertEqual(game.san(), ['Nf6', 'd4'])
+        self.assertEqual(game.movetext(), '5... Nf6 6. d4')
+        self.assertEqual(game.result, '*')
+
+    def test_iter_parsed_and_headers(self):
+        games = list(iter_parsed([{'pgn': PGN}, {'url': 'no-pgn'}]))
+        self.assertEqual(len(games), 1)
+        self.assertEqual(parse_headers(PGN)['Site'], 'Chess.com')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,50 @@
+import unittest
+import chess
+from preanalysis import analyze_pgn, evaluate, format_moment, quiet_game_analysis
+
+class TestPreanalysis(unittest.TestCase):
+    def test_evaluate_counts_material(self):
+        # White is a queen up
+        board = chess.Board("4k3/8/8/8/8/8/8/3QK3 w - - 0 1")
+        self.assertGreater(evaluate(board, depth=1), 800)
+        self.assertLess(evaluate(board.mirror(), depth=1), -800)
+
+    def test_finds_blunder(self):
+        pgn = '[Event "Live Chess"]\n\n1. e4 {[%clk 0:02:59.9]} 1... e5 {[%clk 0:02:59]} 2. Qh5 Nc6 3. Bc4 Nf6 4. Qxf7# 1-0'
+        result = analyze_pgn(pgn, depth=1)
+        self.assertEqual(result["opening_moves"], "1. e4 e5 2. Qh5 Nc6 3. Bc4 Nf6 4. Qxf7#")
+        moves = [moment["move"] for moment in result["moments"]]
+        self.assertIn("3... Nf6", moves)
+        blunder = result["moments"][moves.index("3... Nf6")]
+        self.assertEqual(blunder["kind"], "blunder")
+        self.assertIn("3... Nf6 (blunder", format_moment(blunder))
+
+    def test_quiet_game_has_no_moments(self):
+        self.assertEqual(analyze_pgn('1. e4 e5 2. Nf3 Nc6', depth=1)["moments"], [])
+        closed_ruy_lopez = (
+            '1. e4 e5 2. Nf3 Nc6 3. Bb5 a6 4. Ba4 Nf6 5. O-O Be7 6. Re1 b5 7. Bb3 d6 8. c3 O-O 9. h3 Nb8 '
+            '10. d4 Nbd7 11. Nbd2 Bb7 12. Bc2 Re8 13. Nf1 Bf8 14. Ng3 g6 15. a4 c5 16. d5 c4 17. Bg5 h6 '
+            '18. Be3 Nc5 19. Qd2 h5 20. Bg5 Be7 21. Ra3 Nh7 22. Bxe7 Qxe7 23. axb5 axb5 24. Rxa8 Rxa8 1/2-1/2'
+        )
+        self.assertEqual(analyze_pgn(closed_ruy_lopez, depth=1)["moments"], [])
+
+    def test_forced_moves_are_not_flagged(self):
+        # Every reply to the queen trade is a recapture
+        self.assertEqual(analyze_pgn('1. d4 d5 2. c4 dxc4 3. Qa4+ Qd7 4. Qxd7+ Nxd7 *', depth=1)["moments"], [])
+        opera_game = (
+            '1. e4 e5 2. Nf3 d6 3. d4 Bg4 4. dxe5 Bxf3 5. Qxf3 dxe5 6. Bc4 Nf6 7. Qb3 Qe7 8. Nc3 c6 9. Bg5 b5 '
+            '10. Nxb5 cxb5 11. Bxb5+ Nbd7 12. O-O-O Rd8 13. Rxd7 Rxd7 14. Rd1 Qe6 15. Bxd7+ Nxd7 16. Qb8+ Nxb8 '
+            '17. Rd8# 1-0'
+        )
+        moves = [moment["move"] for moment in analyze_pgn(opera_game, depth=1)["moments"]]
+        # The queen sacrifice mates, and the only legal reply cannot be a mistake
+        self.assertNotIn("16. Qb8+", moves)
+        self.assertNotIn("16... Nxb8", moves)
+
+    def test_unreadable_pgn(self):
+        self.assertIsNone(analyze_pgn(''))
+
+    def test_quiet_game_analysis_format(self):
+        analysis = quiet_game_analysis({'result': 'draw', 'opening_moves': '1. e4 e5'})
+        self.assertTrue(analysis.startswith('• Opening: 1. e4 e5'))
+        self.assertIn('• Final Outcome: draw', analysis)
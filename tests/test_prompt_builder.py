@@ -0,0 +1,50 @@
+import unittest
+from ai_model import build_game_details, build_prompt, estimate_game_tokens, prompt_version
+from prompt_builder import critical_plies, format_moves, moment_clocks
+from pgn_parser import parse_pgn
+
+PGN = ('[Event "Live Chess"]\n[Site "Chess.com"]\n[Result "1-0"]\n[TimeControl "180"]\n\n'
+       '1. e4 {[%clk 0:02:59.9]} 1... e5 {[%clk 0:02:58]} 2. Qh5 {[%clk 0:02:57.1]} 2... Nc6 {[%clk 0:02:50]} '
+       '3. Bc4 {[%clk 0:02:56]} 3... Nf6 {[%clk 0:02:20]} 4. Qxf7# {[%clk 0:02:55]} 1-0\n')
+
+class TestPromptBuilder(unittest.TestCase):
+    def setUp(self):
+        self.game_data = {
+            'white_player': 'player1', 'white_rating': 1500,
+            'black_player': 'player2', 'black_rating': 1600,
+            'result': 'player1 won', 'pgn': PGN
+        }
+
+    def test_detail_levels(self):
+        self.assertEqual(format_moves(PGN, 'moves'), '1. e4 e5 2. Qh5 Nc6 3. Bc4 Nf6 4. Qxf7# 1-0')
+        self.assertEqual(format_moves(PGN, 'full'), PGN)
+        self.assertIn('3... Nf6 {[%clk 0:02:20]}', format_moves(PGN, 'clocks'))
+        with self.assertRaises(ValueError):
+            format_moves(PGN, 'everything')
+
+    def test_longest_thinks_are_critical(self):
+        # Black spent 30s on 3...Nf6 and 8s on 2...Nc6
+        game = parse_pgn(PGN)
+        self.assertEqual(game.time_spent()[5], 300)
+        self.assertIn(5, critical_plies(game))
+        self.assertEqual(moment_clocks(PGN, ['3...']), {'3...': '0:02:20'})
+
+    def test_prompt_shrinks_with_detail(self):
+        tokens = estimate_game_tokens(self.game_data)
+        self.assertLess(tokens['moves'], tokens['clocks'])
+        self.assertLess(tokens['clocks'], tokens['full'])
+        self.assertNotIn('[Site', build_prompt(self.game_data, 'moves'))
+        self.assertIn('[Site', build_prompt(self.game_data, 'full'))
+
+    def test_critical_moment_clocks(self):
+        moment = {'move': '3... Nf6', 'fen': 'fen', 'eval_before': 0, 'eval_after': -900, 'loss': 900, 'kind': 'blunder'}
+        game_data = dict(self.game_data, critical_moments=[moment], opening_moves='1. e4 e5')
+        self.assertIn('Clock: 0:02:20', build_game_details(game_data, 'clocks'))
+        self.assertNotIn('Clock:', build_game_details(game_data, 'moves'))
+
+    def test_prompt_version_depends_on_detail(self):
+        self.assertNotEqual(prompt_version(False, 'moves'), prompt_version(False, 'full'))
+        self.assertNotEqual(prompt_version(True, 'moves'), prompt_version(False, 'moves'))
+
+if __name__ == '__main__':
+    unittest.main()
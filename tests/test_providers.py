@@ -0,0 +1,108 @@
+import unittest
+from unittest.mock import patch
+import providers
+from providers import Provider, ProviderRouter, NoProviderAvailable, NoProviderConfigured, UnsupportedModelError
+
+
+class FakeProvider(Provider):
+    """Provider answering from a list of canned results (exceptions are raised)"""
+    api_key_env = "FAKE_API_KEY"
+
+    def __init__(self, name, results):
+        self.name = name
+        super().__init__()
+        self.results = list(results)
+        self.calls = 0
+
+    def configured(self):
+        return True
+
+    def create_client(self):
+        return None
+
+    def send(self, client, prompt):
+        self.calls += 1
+        result = self.results.pop(0) if self.results else "• Opening: Italian Game"
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+
+class TestProviders(unittest.TestCase):
+    def test_fails_over_to_next_provider(self):
+        first = FakeProvider("gemini", [Exception("quota exceeded")])
+        second = FakeProvider("gpt-4o", ["• Opening: Sicilian"])
+        router = ProviderRouter([first, second])
+        self.assertEqual(router.complete("prompt", "gemini"), "• Opening: Sicilian")
+        self.assertEqual((first.calls, second.calls), (1, 1))
+        self.assertEqual(router.health()["gemini"]["consecutive_failures"], 1)
+
+    def test_empty_response_counts_as_failure(self):
+        router = ProviderRouter([FakeProvider("gemini", [""]), FakeProvider("gpt-4o", [])])
+        self.assertEqual(router.complete("prompt"), "• Opening: Italian Game")
+        self.assertGreater(router.health()["gemini"]["error_rate"], 0)
+
+    def test_every_provider_failing_raises(self):
+        router = ProviderRouter([FakeProvider("gemini", [Exception("down")]),
+                                 FakeProvider("gpt-4o", [Exception("down")])])
+        with self.assertRaises(NoProviderAvailable) as raised:
+            router.complete("prompt")
+        self.assertEqual(len(raised.exception.errors), 2)
+
+    def test_no_configured_provider_raises(self):
+        unconfigured = FakeProvider("gemini", [])
+        unconfigured.configured = lambda: False
+        with self.assertRaises(NoProviderConfigured):
+            ProviderRouter([unconfigured]).complete("prompt")
+        self.assertEqual(unconfigured.calls, 0)
+
+    def test_unknown_model_is_rejected(self):
+        router = ProviderRouter([FakeProvider("gemini", [])])
+        with self.assertRaises(UnsupportedModelError):
+            router.complete("prompt", "unknown-model")
+
+    def test_auto_prefers_the_faster_provider(self):
+        slow, fast = FakeProvider("gemini", []), FakeProvider("gpt-4o", [])
+        slow.health.record(5.0, ok=True)
+        fast.health.record(0.5, ok=True)
+        router = ProviderRouter([slow, fast])
+        self.assertEqual([p.name for p in router.candidates()], ["gpt-4o", "gemini"])
+        # A named model is still tried first
+        self.assertEqual([p.name for p in router.candidates("gemini")], ["gemini", "gpt-4o"])
+
+    def test_stream_fails_over_before_first_chunk(self):
+        first = FakeProvider("gemini", [Exception("quota exceeded")])
+        second = FakeProvider("gpt-4o", ["• Opening: Sicilian"])
+        router = ProviderRouter([first, second])
+        self.assertEqual("".join(router.stream("prompt", "gemini")), "• Opening: Sicilian")
+        self.assertEqual(router.health()["gpt-4o"]["calls"], 1)
+
+    def test_stream_broken_midway_is_not_retried_elsewhere(self):
+        class BrokenStream(FakeProvider):
+            def send_stream(self, client, prompt):
+                yield "• Opening: "
+                raise ConnectionError("reset")
+
+        backup = FakeProvider("gpt-4o", [])
+        router = ProviderRouter([BrokenStream("gemini", []), backup])
+        chunks = []
+        with self.assertRaises(providers.ProviderError):
+            for chunk in router.stream("prompt", "gemini"):
+                chunks.append(chunk)
+        self.assertEqual(chunks, ["• Opening: "])
+        self.assertEqual(backup.calls, 0)
+
+    @patch.object(providers, "PROVIDER_FAILURE_THRESHOLD", 2)
+    def test_repeated_failures_open_the_circuit(self):
+        flaky = FakeProvider("gemini", [Exception("down"), Exception("down")])
+        backup = FakeProvider("gpt-4o", [])
+        router = ProviderRouter([flaky, backup])
+        router.complete("prompt", "gemini")
+        router.complete("prompt", "gemini")
+        self.assertFalse(flaky.health.available())
+        # While cooling down the provider is skipped even when asked for by name
+        router.complete("prompt", "gemini")
+        self.assertEqual((flaky.calls, backup.calls), (2, 3))
+
+if __name__ == '__main__':
+    unittest.main()
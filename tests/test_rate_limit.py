@@ -0,0 +1,30 @@
+import unittest
+from unittest.mock import patch
+from rate_limit import RateLimiter, backoff_delay
+
+class TestRateLimit(unittest.TestCase):
+    def test_burst_within_capacity_does_not_wait(self):
+        limiter = RateLimiter(rate=1, capacity=3)
+        with patch('time.sleep') as mock_sleep:
+            for _ in range(3):
+                limiter.acquire()
+            mock_sleep.assert_not_called()
+
+    def test_acquire_waits_when_empty(self):
+        limiter = RateLimiter(rate=100, capacity=1)
+        limiter.acquire()
+        with patch('time.sleep', wraps=lambda seconds: None) as mock_sleep:
+            # The patched sleep returns immediately, so refill happens in real time
+            limiter.acquire()
+        self.assertTrue(mock_sleep.called)
+
+    def test_zero_rate_disables_limiting(self):
+        limiter = RateLimiter(rate=0)
+        with patch('time.sleep') as mock_sleep:
+            for _ in range(100):
+                limiter.acquire()
+            mock_sleep.assert_not_called()
+
+    def test_backoff_delay_is_capped(self):
+        for attempt in range(10):
+            self.assertLessEqual(backoff_delay(attempt, base=1, cap=5), 5)
@@ -0,0 +1,47 @@
+import unittest
+from renderer import format_analysis, page_count, render_game, render_results
+
+def row(index, analysis='• Opening: Sicilian Defense [Move 12]'):
+    return {
+        'date': f'2024-01-01 12:00:{index:02d}',
+        'white_player': f'white{index}',
+        'black_player': 'black',
+        'result': 'win',
+        'analysis': analysis
+    }
+
+class TestRenderer(unittest.TestCase):
+    def test_format_analysis(self):
+        html = format_analysis('• Mistake <b>: [Move 12] Nxe5\n  - Better: Nc3\nAnalysis by: gemini')
+        self.assertIn('<span class="bullet">•</span> Mistake &lt;b&gt;', html)
+        self.assertIn('<span class="move">Move 12</span>', html)
+        self.assertIn('<span class="sub-bullet">-</span> Better', html)
+        self.assertIn('<em>Analysis by:</em>', html)
+
+    def test_rows_use_classes_not_inline_styles(self):
+        html = render_results([row(0)])
+        self.assertIn('white0', html)
+        self.assertNotIn('style=', html)
+
+    def test_pagination(self):
+        games = [row(index) for index in range(7)]
+        self.assertEqual(page_count(7, 3), 3)
+        html = render_results(games, page=3, page_size=3)
+        self.assertIn('white6', html)
+        self.assertNotIn('white5', html)
+        self.assertIn('Games 7-7 of 7', html)
+        # Out of range pages are clamped
+        self.assertIn('white0', render_results(games, page=0, page_size=3))
+        self.assertNotIn('class="pages"', render_results(games[:2], page_size=3))
+
+    def test_fragments_are_cached_except_drafts(self):
+        render_game.cache_clear()
+        games = [row(index) for index in range(3)]
+        render_results(games)
+        render_results(games)
+        self.assertEqual((render_game.cache_info().hits, render_game.cache_info().misses), (3, 3))
+        render_results([dict(row(9, '• Open'), draft=True)])
+        self.assertEqual(render_game.cache_info().currsize, 3)
+
+if __name__ == '__main__':
+    unittest.main()
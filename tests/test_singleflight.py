@@ -0,0 +1,44 @@
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from singleflight import SingleFlight
+
+class TestSingleFlight(unittest.TestCase):
+    def test_concurrent_calls_share_one_execution(self):
+        flight = SingleFlight()
+        started, release = threading.Event(), threading.Event()
+        calls = []
+
+        def slow(value):
+            calls.append(value)
+            started.set()
+            release.wait(5)
+            return value * 2
+
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            leader = executor.submit(flight.do, 'key', slow, 21)
+            started.wait(5)
+            followers = [executor.submit(flight.do, 'key', slow, 21) for _ in range(3)]
+            while flight.shared < 3:
+                threading.Event().wait(0.01)
+            release.set()
+            results = [leader.result()] + [future.result() for future in followers]
+
+        self.assertEqual(results, [42] * 4)
+        self.assertEqual(calls, [21])
+        self.assertFalse(flight.in_flight('key'))
+        # Once finished, the next call runs again
+        self.assertEqual(flight.do('key', slow, 1), 2)
+
+    def test_exception_is_shared_and_released(self):
+        flight = SingleFlight()
+
+        def fail():
+            raise RuntimeError('boom')
+
+        with self.assertRaises(RuntimeError):
+            flight.do('key', fail)
+        self.assertFalse(flight.in_flight('key'))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,28 @@
+import os
+import subprocess
+import sys
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+class TestStartup(unittest.TestCase):
+    def loaded_after_import(self, module, heavy_modules):
+        code = f"import sys, {module}; print(','.join(m for m in {heavy_modules!r} if m in sys.modules))"
+        output = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True)
+        return output.stdout.strip()
+
+    def test_importing_modules_skips_heavy_dependencies(self):
+        heavy = ['gradio', 'openai', 'google.generativeai']
+        self.assertEqual(self.loaded_after_import('interface', heavy), '')
+        self.assertEqual(self.loaded_after_import('ai_model', heavy), '')
+        self.assertEqual(self.loaded_after_import('main', heavy + ['ai_model']), '')
+
+    def test_provider_registry(self):
+        import ai_model
+        import providers
+        self.assertEqual(set(providers.get_router().names()), {'auto', 'gpt-4o', 'gemini'})
+        with self.assertRaises(ValueError):
+            ai_model.complete('prompt', 'unknown-model')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,59 @@
+import unittest
+from unittest.mock import patch
+from stats import PlayerStats, player_stats, summarize_with_llm
+from providers import AnalysisError
+
+def game(end_time, white, black, result, time_control='180', white_rating=1500, black_rating=1500, opening=None):
+    return {
+        'end_time': end_time, 'white_player': white, 'black_player': black,
+        'white_rating': white_rating, 'black_rating': black_rating, 'result': 'win',
+        'time_control': time_control, 'eco': 'B20' if opening else None, 'opening': opening,
+        'pgn': f'[Result "{result}"]\n\n1. e4 c5 {result}'
+    }
+
+class TestStats(unittest.TestCase):
+    def setUp(self):
+        self.games = [
+            game(1704153600, 'me', 'opp1', '0-1', white_rating=1510),
+            game(1704067200, 'me', 'opp2', '1-0', white_rating=1500, opening='Sicilian Defense'),
+            game(1704240000, 'opp3', 'ME', '0-1', black_rating=1495, time_control='600'),
+            game(1704326400, 'opp4', 'me', '1/2-1/2', black_rating=1498, time_control='600'),
+            game(1704326400, 'someone', 'else', '1-0')
+        ]
+
+    def test_columns_are_player_centric(self):
+        stats = PlayerStats('me', self.games)
+        self.assertEqual(len(stats), 4)
+        self.assertEqual(stats.end_time.tolist(), sorted(stats.end_time.tolist()))
+        self.assertEqual(stats.score.tolist(), [1.0, 0.0, 1.0, 0.5])
+        self.assertEqual(stats.is_white.tolist(), [True, True, False, False])
+
+    def test_aggregates(self):
+        stats = player_stats('me', self.games)
+        self.assertEqual(stats['summary']['games'], 4)
+        self.assertEqual((stats['summary']['wins'], stats['summary']['draws'], stats['summary']['losses']), (2, 1, 1))
+        self.assertEqual(stats['by_color']['black']['wins'], 1)
+        by_time_control = {row['name']: row for row in stats['by_time_control']}
+        self.assertEqual(by_time_control['600']['win_rate'], 0.5)
+        self.assertEqual(by_time_control['180']['losses'], 1)
+        self.assertIn('B20 Sicilian Defense', [row['name'] for row in stats['by_opening']])
+        blitz = next(entry for entry in stats['rating_history'] if entry['time_control'] == '180')
+        self.assertEqual((blitz['first'], blitz['last'], blitz['change']), (1500, 1510, 10))
+
+    def test_no_games(self):
+        stats = player_stats('nobody', self.games)
+        self.assertEqual(stats['summary']['games'], 0)
+        self.assertIsNone(stats['summary']['win_rate'])
+        self.assertEqual(stats['by_time_control'], [])
+
+    @patch('ai_model.complete')
+    def test_summary_is_one_call(self, mock_complete):
+        mock_complete.return_value = '• Strong with White'
+        self.assertEqual(summarize_with_llm(player_stats('me', self.games)), '• Strong with White')
+        self.assertEqual(mock_complete.call_count, 1)
+        mock_complete.side_effect = AnalysisError('quota')
+        with self.assertRaises(AnalysisError):
+            summarize_with_llm(player_stats('me', self.games))
+
+if __name__ == '__main__':
+    unittest.main()